@@ -1,24 +1,57 @@
 from __future__ import annotations
 
+import os
 import re
 import shutil
 import subprocess
 import sys
 from pathlib import Path
-import tkinter as tk
-from tkinter import messagebox
-
-import requests
 
 
 REPO = "linhermx/barcodes_from_csv_ean13"
 LATEST_API = f"https://api.github.com/repos/{REPO}/releases/latest"
+# Para probar contra un servidor local (scripts/release_stub_server.py)
+LATEST_API_ENV = "BARCODE_TOOL_LATEST_API"
 
 ASSET_NAME = "barcode_tool_windows.exe"   # <- nombre fijo del asset en Releases
+CHECKSUM_SUFFIX = ".sha256"               # asset opcional "<ASSET_NAME>.sha256" (formato sha256sum)
+
+# Descargas: por tramos en paralelo si el servidor acepta Range, reanudables entre corridas
+DOWNLOAD_CHUNK = 1024 * 256
+DOWNLOAD_SEGMENTS = 4
+MIN_SEGMENT_BYTES = 4 * 1024 * 1024
+DOWNLOAD_RETRIES = 5
+STATE_SAVE_INTERVAL_S = 1.0
 
 APP_EXE_PREFIX = "barcode_tool_v"
 APP_EXE_SUFFIX = ".exe"
 
+# Tk y requests se cargan solo si hacen falta: abrir la app ya instalada no debe esperarlos
+_tk_root = None
+
+
+def tk_root():
+    """
+    Ventana raíz de Tk (oculta); se crea con el primer diálogo o ventana.
+    """
+    global _tk_root
+    import tkinter as tk
+
+    if _tk_root is None:
+        _tk_root = tk.Tk()
+        _tk_root.withdraw()
+    return _tk_root
+
+
+def dialogs():
+    """
+    messagebox de Tk.
+    """
+    from tkinter import messagebox
+
+    tk_root()
+    return messagebox
+
 
 def base_dir() -> Path:
     if getattr(sys, "frozen", False):
@@ -63,11 +96,17 @@ def find_installed_app(app_dir: Path) -> tuple[tuple[int, int, int], Path] | Non
     return candidates[0]
 
 
-def get_latest_release() -> tuple[tuple[int, int, int], str, str]:
+def get_latest_release() -> tuple[tuple[int, int, int], str, str, str | None]:
     """
-    Returns: (version_tuple, tag_name, asset_download_url)
+    Returns: (version_tuple, tag_name, asset_download_url, checksum)
+
+    checksum es "sha256:<hex>" (campo digest de GitHub), la URL del asset
+    "<ASSET_NAME>.sha256" o None; published_sha256 lo resuelve solo si hay que
+    descargar, así abrir la versión instalada no hace otra solicitud.
     """
-    r = requests.get(LATEST_API, timeout=20)
+    import requests
+
+    r = requests.get(os.environ.get(LATEST_API_ENV, LATEST_API), timeout=20)
     r.raise_for_status()
     data = r.json()
 
@@ -88,16 +127,340 @@ def get_latest_release() -> tuple[tuple[int, int, int], str, str]:
     if not url:
         raise RuntimeError("Asset sin browser_download_url")
 
-    return v, tag, url
+    checksum = None
+    digest = asset.get("digest") or ""
+    if digest.startswith("sha256:"):
+        checksum = digest
+    else:
+        sidecar = next((a for a in assets if a.get("name") == ASSET_NAME + CHECKSUM_SUFFIX), None)
+        if sidecar and sidecar.get("browser_download_url"):
+            checksum = sidecar["browser_download_url"]
+
+    return v, tag, url, checksum
+
+
+def published_sha256(checksum: str | None) -> str | None:
+    """
+    SHA-256 publicado (hex) a partir del checksum de get_latest_release.
+    """
+    if not checksum:
+        return None
+    if checksum.startswith("sha256:"):
+        value = checksum.split(":", 1)[1]
+    else:
+        import requests
+
+        r = requests.get(checksum, timeout=20)
+        r.raise_for_status()
+        # "<hex>  nombre" (sha256sum) o solo el hash
+        value = (r.text.split() or [""])[0]
+    if not re.fullmatch(r"[0-9a-fA-F]{64}", value):
+        raise RuntimeError(f"Checksum publicado inválido: {value[:80]!r}")
+    return value.lower()
+
+
+class DownloadCancelled(Exception):
+    pass
 
 
-def download_file(url: str, dst: Path) -> None:
+class _RemoteChanged(Exception):
+    # El servidor respondió el archivo completo a una solicitud de tramo: cambió desde la última vez
+    # (o no respeta el validador If-Range)
+    def __init__(self, url: str) -> None:
+        super().__init__(f"El servidor respondió el archivo completo a una solicitud por tramos: {url}")
+
+
+def _probe(url: str) -> tuple[int | None, bool, str]:
+    """
+    (tamaño, acepta Range, validador ETag/Last-Modified) con una solicitud HEAD.
+    """
+    import requests
+
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=30)
+        r.raise_for_status()
+    except requests.RequestException:
+        # Sin HEAD: descarga simple, sin reanudar
+        return None, False, ""
+    length = r.headers.get("Content-Length")
+    size = int(length) if length and length.isdigit() else None
+    ranges = r.headers.get("Accept-Ranges", "").lower() == "bytes" and bool(size)
+    etag = r.headers.get("ETag") or ""
+    if etag.startswith("W/"):
+        # If-Range no admite ETag débiles (RFC 9110): el servidor respondería siempre 200
+        etag = ""
+    return size, ranges, etag or r.headers.get("Last-Modified") or ""
+
+
+def _plan_segments(size: int, segments: int) -> list[list[int]]:
+    # [inicio, fin (exclusivo), bytes ya descargados]; tramos de al menos MIN_SEGMENT_BYTES
+    n = max(1, min(segments, size // MIN_SEGMENT_BYTES))
+    bounds = [size * i // n for i in range(n + 1)]
+    return [[bounds[i], bounds[i + 1], 0] for i in range(n)]
+
+
+def _sha256_file(path: Path) -> str:
+    import hashlib
+
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def download_file(
+    url: str,
+    dst: Path,
+    *,
+    sha256: str | None = None,
+    segments: int = DOWNLOAD_SEGMENTS,
+    on_progress=None,
+    cancel=None,
+) -> None:
+    """
+    Descarga `url` en `dst`.
+
+    Si el servidor acepta Range, baja en `segments` tramos paralelos y es
+    reanudable: lo descargado queda en `<dst>.part` y el avance por tramo en
+    `<dst>.part.json`, así una conexión caída (o el launcher cerrado) sigue
+    desde ahí en vez de empezar de cero. Cada tramo reintenta DOWNLOAD_RETRIES
+    veces. Con `sha256` el archivo se verifica antes de quedar en `dst`; si no
+    coincide se descarta.
+
+    on_progress(bytes_hechos, total_o_None) se llama desde los hilos de
+    descarga; `cancel` (threading.Event) detiene y conserva lo descargado.
+    """
+    part = dst.with_name(dst.name + ".part")
+    state_path = dst.with_name(dst.name + ".part.json")
+
+    size, ranges, validator = _probe(url)
+    try:
+        if ranges:
+            _download_ranges(url, part, state_path, size, validator, segments, on_progress, cancel)
+        else:
+            _download_stream(url, part, on_progress, cancel)
+    except _RemoteChanged:
+        # Lo guardado es de otra versión del archivo: se empieza de cero una vez, con el tamaño
+        # y validador actuales
+        state_path.unlink(missing_ok=True)
+        part.unlink(missing_ok=True)
+        size, ranges, validator = _probe(url)
+        try:
+            if not ranges:
+                raise _RemoteChanged(url)
+            _download_ranges(url, part, state_path, size, validator, segments, on_progress, cancel)
+        except _RemoteChanged:
+            # Sigue respondiendo 200 a los tramos: descarga simple, sin reanudar
+            state_path.unlink(missing_ok=True)
+            _download_stream(url, part, on_progress, cancel)
+
+    if sha256:
+        digest = _sha256_file(part)
+        if digest != sha256.lower():
+            part.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            raise RuntimeError(
+                f"La descarga no coincide con el SHA-256 publicado y se descartó.\n"
+                f"Esperado: {sha256.lower()}\nObtenido: {digest}"
+            )
+    os.replace(part, dst)
+    state_path.unlink(missing_ok=True)
+
+
+def _download_stream(url: str, part: Path, on_progress, cancel) -> None:
+    import requests
+
     with requests.get(url, stream=True, timeout=60) as r:
         r.raise_for_status()
-        with dst.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 256):
+        length = r.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        done = 0
+        with part.open("wb") as f:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                if cancel is not None and cancel.is_set():
+                    raise DownloadCancelled("Descarga cancelada")
                 if chunk:
                     f.write(chunk)
+                    done += len(chunk)
+                    if on_progress is not None:
+                        on_progress(done, total)
+    if total is not None and done != total:
+        raise RuntimeError(f"Descarga incompleta: {done} de {total} bytes")
+
+
+def _download_ranges(url, part: Path, state_path: Path, size: int, validator: str, segments: int, on_progress, cancel) -> None:
+    import json
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    state = None
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+    same = (
+        isinstance(state, dict)
+        and (state.get("url"), state.get("size"), state.get("validator")) == (url, size, validator)
+        and part.exists()
+        and part.stat().st_size == size
+    )
+    if not same:
+        state = {"url": url, "size": size, "validator": validator, "segments": _plan_segments(size, segments)}
+        with part.open("wb") as f:
+            f.truncate(size)
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    last_save = [0.0]
+
+    def save(force: bool = False) -> None:
+        # Solo se registra lo que ya se escribió (flush previo en cada hilo)
+        with lock:
+            now = time.monotonic()
+            if not force and now - last_save[0] < STATE_SAVE_INTERVAL_S:
+                return
+            last_save[0] = now
+            tmp = state_path.with_name(state_path.name + ".tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, state_path)
+
+    def report() -> None:
+        if on_progress is not None:
+            on_progress(sum(seg[2] for seg in state["segments"]), size)
+
+    def fetch(seg: list[int]) -> None:
+        start, end = seg[0], seg[1]
+        failures = 0
+        with part.open("r+b") as f:
+            while seg[2] < end - start:
+                if stop.is_set() or (cancel is not None and cancel.is_set()):
+                    return
+                pos = start + seg[2]
+                before = seg[2]
+                headers = {"Range": f"bytes={pos}-{end - 1}"}
+                if validator:
+                    headers["If-Range"] = validator
+                try:
+                    with requests.get(url, headers=headers, stream=True, timeout=60) as r:
+                        if r.status_code == 200:
+                            raise _RemoteChanged(url)
+                        r.raise_for_status()
+                        f.seek(pos)
+                        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                            if stop.is_set() or (cancel is not None and cancel.is_set()):
+                                return
+                            chunk = chunk[:end - start - seg[2]]
+                            if not chunk:
+                                continue
+                            f.write(chunk)
+                            f.flush()
+                            with lock:
+                                seg[2] += len(chunk)
+                            failures = 0
+                            report()
+                            save()
+                    if seg[2] == before:
+                        # Respuesta cortada sin datos: cuenta como intento fallido
+                        raise requests.ConnectionError(f"Sin datos para el tramo desde el byte {pos}")
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    failures += 1
+                    if failures > DOWNLOAD_RETRIES:
+                        raise
+                    time.sleep(min(2 ** failures, 30))
+
+    pending = [seg for seg in state["segments"] if seg[2] < seg[1] - seg[0]]
+    report()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            futures = [pool.submit(fetch, seg) for seg in pending]
+            error = None
+            for fut in futures:
+                try:
+                    fut.result()
+                except BaseException as e:
+                    # Un tramo falló: los demás paran y lo hecho queda guardado
+                    stop.set()
+                    error = error or e
+            if error is not None:
+                raise error
+    finally:
+        save(force=True)
+
+    if cancel is not None and cancel.is_set():
+        raise DownloadCancelled("Descarga cancelada: se continuará desde aquí la próxima vez")
+
+
+def download_with_progress(url: str, dst: Path, *, sha256: str | None, title: str) -> None:
+    """
+    download_file en un hilo con una ventana de progreso cancelable.
+    """
+    import threading
+    import time
+    import tkinter as tk
+    from tkinter import ttk
+
+    root = tk_root()
+    win = tk.Toplevel(root)
+    win.title(title)
+    win.resizable(False, False)
+    label = ttk.Label(win, text="Conectando...", width=52)
+    label.pack(padx=16, pady=(14, 6))
+    bar = ttk.Progressbar(win, length=380, maximum=1000)
+    bar.pack(padx=16)
+    cancel = threading.Event()
+    ttk.Button(win, text="Cancelar", command=cancel.set).pack(pady=12)
+    win.protocol("WM_DELETE_WINDOW", cancel.set)
+
+    progress: dict = {}
+    outcome: dict = {}
+    started = time.monotonic()
+
+    def on_progress(done: int, total: int | None) -> None:
+        progress.setdefault("first", done)  # lo ya descargado antes no cuenta para la velocidad
+        progress["last"] = (done, total)
+
+    def work() -> None:
+        try:
+            download_file(url, dst, sha256=sha256, on_progress=on_progress, cancel=cancel)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            outcome["finished"] = True
+
+    def poll() -> None:
+        if outcome.get("finished"):
+            win.destroy()
+            root.quit()
+            return
+        if "last" in progress:
+            done, total = progress["last"]
+            mb = 1024 * 1024
+            rate = (done - progress["first"]) / mb / max(time.monotonic() - started, 1e-6)
+            if total:
+                bar["value"] = 1000 * done / total
+                text = f"{done / mb:.1f} de {total / mb:.1f} MB · {rate:.1f} MB/s"
+                if done >= total:
+                    text = "Verificando..." if sha256 else "Instalando..."
+            else:
+                if str(bar["mode"]) != "indeterminate":
+                    # Sin tamaño conocido: solo se anima
+                    bar.configure(mode="indeterminate")
+                    bar.start(20)
+                text = f"{done / mb:.1f} MB · {rate:.1f} MB/s"
+            label["text"] = text
+        if cancel.is_set():
+            label["text"] = "Cancelando..."
+        win.after(150, poll)
+
+    threading.Thread(target=work, daemon=True).start()
+    win.after(150, poll)
+    root.mainloop()
+    if "error" in outcome:
+        raise outcome["error"]
 
 
 def run_app(exe_path: Path) -> None:
@@ -109,22 +472,19 @@ def main() -> None:
     root = base_dir()
     dirs = ensure_dirs(root)
 
-    tk_root = tk.Tk()
-    tk_root.withdraw()
-
     installed = find_installed_app(dirs["app"])
     installed_version = installed[0] if installed else None
     installed_exe = installed[1] if installed else None
 
     # 1) Consultar latest
     try:
-        latest_version, latest_tag, asset_url = get_latest_release()
+        latest_version, latest_tag, asset_url, checksum = get_latest_release()
     except Exception as e:
         # Si falla internet/API, seguimos con la instalada si existe
         if installed_exe:
-            messagebox.showwarning("Actualización no disponible", f"No se pudo verificar update:\n{e}\n\nSe abrirá la versión instalada.")
+            dialogs().showwarning("Actualización no disponible", f"No se pudo verificar update:\n{e}\n\nSe abrirá la versión instalada.")
             run_app(installed_exe)
-        messagebox.showerror("No hay app instalada", f"No se pudo verificar update y no existe app instalada.\n\nDetalle:\n{e}")
+        dialogs().showerror("No hay app instalada", f"No se pudo verificar update y no existe app instalada.\n\nDetalle:\n{e}")
         return
 
     # 2) Si no hay instalada, forzamos instalar
@@ -137,23 +497,23 @@ def main() -> None:
             f"Instalada: {'ninguna' if installed_version is None else 'v' + '.'.join(map(str, installed_version))}\n\n"
             "¿Deseas actualizar ahora?"
         )
-        if needs_install or messagebox.askyesno("Actualización disponible", msg):
+        if needs_install or dialogs().askyesno("Actualización disponible", msg):
             tmp = dirs["downloads"] / ASSET_NAME
             try:
-                download_file(asset_url, tmp)
+                download_with_progress(asset_url, tmp, sha256=published_sha256(checksum), title=f"Descargando {latest_tag}")
                 target = dirs["app"] / f"{APP_EXE_PREFIX}{latest_version[0]}.{latest_version[1]}.{latest_version[2]}{APP_EXE_SUFFIX}"
                 shutil.move(str(tmp), str(target))
                 installed_exe = target
             except Exception as e:
                 if installed_exe:
-                    messagebox.showwarning("Update falló", f"No se pudo actualizar:\n{e}\n\nSe abrirá la versión instalada.")
+                    dialogs().showwarning("Update falló", f"No se pudo actualizar:\n{e}\n\nSe abrirá la versión instalada.")
                 else:
-                    messagebox.showerror("Update falló", f"No se pudo descargar/instalar:\n{e}")
+                    dialogs().showerror("Update falló", f"No se pudo descargar/instalar:\n{e}")
                     return
 
     # 3) Ejecutar
     if not installed_exe:
-        messagebox.showerror("No se encontró la app", "No hay ejecutable para abrir.")
+        dialogs().showerror("No se encontró la app", "No hay ejecutable para abrir.")
         return
 
     run_app(installed_exe)
@@ -1,5 +1,6 @@
 import argparse
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 
@@ -9,40 +10,285 @@ SRC = ROOT / "src"
 if SRC.exists() and str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from barcode_tool.core import generate_barcodes_from_csv
+from barcode_tool.core import (
+    DEFAULT_ENGINE,
+    DEFAULT_MAX_ERRORS,
+    ENGINES,
+    OUTPUT_FORMATS,
+    PNG_MODES,
+    PngProfile,
+    check_csv,
+    generate_barcodes_from_csv,
+    merge_shards,
+    parse_output_spec,
+)
+from barcode_tool.pipeline import DEFAULT_QUEUE_DEPTH
+from barcode_tool.profiling import profile_run
+from barcode_tool.shards import parse_shard
+from barcode_tool.sheets import PAGE_SIZES, SheetLayout, SheetSink
+from barcode_tool.sinks import DirectorySink, open_archive_sink
+from barcode_tool.timing import write_timings_json
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Genera códigos de barras EAN-13 (PNG) desde un CSV. El nombre del archivo sale de 'Clave'."
     )
-    parser.add_argument("--csv", required=True, help="Ruta al archivo CSV")
+    parser.add_argument("--csv", default=None, help="Ruta al archivo CSV (obligatorio salvo con --serve)")
     parser.add_argument("--outdir", default="salida", help="Carpeta de salida (default: salida)")
-    parser.add_argument("--delimiter", default=None, help="Delimitador del CSV (ej: ',' o '|' ). Si se omite, se intenta detectar.")
-    parser.add_argument("--encoding", default="utf-8-sig", help="Encoding (default: utf-8-sig)")
-    parser.add_argument("--width", type=int, default=450, help="Ancho final en px (default: 450)")
-    parser.add_argument("--height", type=int, default=300, help="Alto final en px (default: 300)")
+    parser.add_argument("--delimiter", default=None, help="Delimitador del CSV (',', '|', ';' o 'tab'). Si se omite, se detecta.")
+    parser.add_argument("--encoding", default="auto", help="Encoding (default: auto = utf-8-sig o cp1252 según el archivo)")
+    parser.add_argument("--width", type=int, default=None, help="Ancho final en px (default: 450; con --sheet, el ancho de la etiqueta)")
+    parser.add_argument("--height", type=int, default=None, help="Alto final en px (default: 300; con --sheet, el alto de la etiqueta)")
     parser.add_argument("--no-text", action="store_true", help="No imprimir el número debajo del código")
     parser.add_argument("--overwrite", action="store_true", help="Sobrescribir si el PNG ya existe (si no, crea _2, _3...)")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de render en paralelo (default: 1; 0 = todos los núcleos)")
+    parser.add_argument("--pipeline", action="store_true", help="Leer, rendir, codificar y escribir en hilos separados (solapa CPU y disco)")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_QUEUE_DEPTH, help=f"Lotes en espera entre etapas con --pipeline (default: {DEFAULT_QUEUE_DEPTH})")
+    parser.add_argument("--cache-dir", default=None, help="Carpeta de caché de renders (reutiliza PNG idénticos entre filas y corridas)")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Tamaño máximo de la caché en MB (default: 512)")
+    parser.add_argument("--resume", "--incremental", dest="resume", action="store_true", help="Reanuda/incremental: omite filas cuyo PNG ya es válido según logs/manifest.csv")
+    parser.add_argument("--max-errors", type=int, default=DEFAULT_MAX_ERRORS, help=f"Errores que se conservan en memoria/pantalla; todos van a errors.csv (default: {DEFAULT_MAX_ERRORS}; 0 = sin límite)")
+    parser.add_argument("--check", action="store_true", help="Solo validar el CSV (columnas, checksums, Claves, duplicados) sin generar imágenes")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="png", help="Formato de salida (default: png; svg/pdf = vectorial, geometría exacta al tamaño físico --width/--height a 300 DPI)")
+    parser.add_argument("--png-mode", choices=PNG_MODES, default="rgb", help="Tipo de PNG: rgb (original), gray, 1bit o palette (blanco/negro, mucho más chicos y rápidos)")
+    parser.add_argument("--png-level", type=int, default=6, choices=range(10), metavar="0-9", help="Nivel de compresión zlib (default: 6; con optimize se usa el máximo)")
+    parser.add_argument("--png-no-optimize", action="store_true", help="No usar optimize al guardar el PNG (mucho más rápido, archivos algo más grandes)")
+    parser.add_argument("--output", action="append", default=None, metavar="SPEC", help="Salida extra por fila, repetible: ANCHOxALTO[:subcarpeta][:png|jpeg|webp][:notext], p. ej. 150x100:thumb:jpeg. La primera decide el nombre; reemplaza --width/--height/--no-text")
+    parser.add_argument("--archive", default=None, help="Escribir los PNG en un solo archivo .zip/.tar/.tar.gz en vez de la carpeta barcodes/")
+    parser.add_argument("--sheet", default=None, help="Componer hojas de etiquetas listas para imprimir (.pdf o .tif/.tiff) en vez de PNG sueltos")
+    parser.add_argument("--sheet-page", choices=list(PAGE_SIZES), default="A4", help="Tamaño de hoja (default: A4)")
+    parser.add_argument("--sheet-landscape", action="store_true", help="Hoja en horizontal")
+    parser.add_argument("--sheet-rows", type=int, default=8, help="Filas de etiquetas por hoja (default: 8)")
+    parser.add_argument("--sheet-cols", type=int, default=3, help="Columnas de etiquetas por hoja (default: 3)")
+    parser.add_argument("--sheet-margin-mm", type=float, default=10.0, help="Margen de la hoja en mm (default: 10)")
+    parser.add_argument("--sheet-gap-mm", type=float, default=2.0, help="Separación entre etiquetas en mm (default: 2)")
+    parser.add_argument("--sheet-dpi", type=int, default=300, help="Resolución de la hoja (default: 300)")
+    parser.add_argument("--timings-json", default=None, metavar="PATH", help="Exportar los tiempos por etapa (total, p50/p95/máx por fila) a un JSON")
+    parser.add_argument("--profile", action="store_true", help="Perfilar la corrida (cProfile + tracemalloc): deja profile.pstats, profile.txt y memory.txt en logs/")
+    parser.add_argument("--serve", action="store_true", help="Servidor HTTP local de render bajo demanda (GET /ean13/<código>, POST /batch -> ZIP) en vez de procesar un CSV")
+    parser.add_argument("--host", default=None, help="Interfaz del servidor (default: 127.0.0.1; sin autenticación, no exponer a la red)")
+    parser.add_argument("--port", type=int, default=None, help="Puerto del servidor (default: 8765)")
+    parser.add_argument("--lru-mb", type=int, default=64, help="Memoria para renders recientes del servidor en MB (default: 64)")
+    parser.add_argument("--watch", default=None, metavar="CARPETA", help="Vigilar una carpeta: cada CSV que aparezca se procesa en --outdir/<fecha>_<nombre>/ y pasa a done/ o failed/ (Ctrl+C para detener)")
+    parser.add_argument("--watch-concurrency", type=int, default=1, help="CSV procesados a la vez con --watch (default: 1)")
+    parser.add_argument("--watch-interval", type=float, default=2.0, help="Segundos entre revisiones de la carpeta con --watch (default: 2)")
+    parser.add_argument("--shard", default=None, metavar="K/N", help="Procesar solo el fragmento K de N del CSV (p. ej. 3/8) para repartir un CSV enorme entre máquinas; conserva los line_no originales")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="CARPETA", help="Unir en --outdir las salidas de todos los fragmentos (--shard) en un solo resultado, resolviendo nombres repetidos entre fragmentos")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE, help=f"Motor de render (default: {DEFAULT_ENGINE}; 'python-barcode' = método original)")
 
     args = parser.parse_args()
 
-    result = generate_barcodes_from_csv(
-        csv_path=Path(args.csv),
-        outdir=Path(args.outdir),
-        delimiter=args.delimiter,
-        encoding=args.encoding,
-        width=args.width,
-        height=args.height,
-        no_text=args.no_text,
-        overwrite=args.overwrite,
-    )
+    delimiter = "\t" if args.delimiter in ("tab", "\\t") else args.delimiter
+
+    if args.serve:
+        # http.server solo se importa en este modo (arranque del CLI)
+        from barcode_tool.server import DEFAULT_HOST, DEFAULT_PORT, serve
+
+        serve(args.host or DEFAULT_HOST, args.port or DEFAULT_PORT, workers=args.workers, engine=args.engine, lru_max_bytes=args.lru_mb * 1024 * 1024)
+        return
+    if args.merge:
+        try:
+            merged = merge_shards([Path(d) for d in args.merge], Path(args.outdir), overwrite=args.overwrite)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Listo. {merged.shards} fragmentos unidos en {merged.outdir}")
+        print(f"Filas generadas: {merged.generated} | Errores: {merged.error_count} | Renombrados por colisión: {merged.renamed}")
+        for category, count in merged.error_summary.items():
+            print(f"- {category}: {count}")
+        if merged.errors_csv:
+            print(f"Errores: {merged.errors_csv}")
+        print(f"Log: {merged.log_file}")
+        return
+    if not args.csv and not args.watch:
+        parser.error("--csv es obligatorio (salvo con --serve, --watch o --merge)")
+
+    shard = None
+    if args.shard:
+        if args.watch or args.archive or args.sheet:
+            parser.error("--shard escribe a carpeta para unir con --merge: no se combina con --watch, --archive ni --sheet")
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.check and args.watch:
+        parser.error("--check revisa un solo CSV: no se combina con --watch")
+    if args.check:
+        check = check_csv(
+            csv_path=Path(args.csv),
+            outdir=Path(args.outdir),
+            delimiter=delimiter,
+            encoding=args.encoding,
+            max_errors=(args.max_errors or None),
+        )
+        print(f"Filas: {check.rows} | Válidas: {check.valid} | Errores: {check.error_count} | Duplicados: {check.duplicates}")
+        for category, count in check.error_summary.items():
+            print(f"- {category}: {count}")
+        if check.errors_csv:
+            print(f"Errores: {check.errors_csv}")
+        if check.duplicates_csv:
+            print(f"Duplicados: {check.duplicates_csv}")
+        print("CSV OK." if check.ok else "El CSV tiene problemas.")
+        sys.exit(0 if check.ok else 1)
+
+    if args.archive and args.sheet:
+        parser.error("--archive y --sheet no se pueden combinar")
+    if (args.archive or args.sheet) and args.resume:
+        parser.error("--resume solo funciona con salida a carpeta (sin --archive ni --sheet)")
+
+    png = PngProfile(mode=args.png_mode, compress_level=args.png_level, optimize=not args.png_no_optimize)
+    outputs = None
+    if args.sheet and args.format in ("svg", "pdf"):
+        parser.error("--sheet compone imágenes raster: usa --format png, jpeg o webp")
+    if args.output:
+        if args.sheet:
+            parser.error("--output no se puede combinar con --sheet")
+        try:
+            outputs = [parse_output_spec(spec, png=png) for spec in args.output]
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.queue_depth < 1:
+        parser.error("--queue-depth debe ser >= 1")
+
+    width, height = args.width or 450, args.height or 300
+
+    if args.watch:
+        if args.archive or args.sheet or args.resume:
+            parser.error("--watch escribe una carpeta por CSV: no se combina con --archive, --sheet ni --resume")
+        if args.watch_concurrency < 1:
+            parser.error("--watch-concurrency debe ser >= 1")
+        from barcode_tool.watch import FolderWatcher
+
+        watcher = FolderWatcher(
+            Path(args.watch),
+            Path(args.outdir),
+            concurrency=args.watch_concurrency,
+            interval=args.watch_interval,
+            workers=args.workers,
+            options=dict(
+                delimiter=delimiter,
+                encoding=args.encoding,
+                width=width,
+                height=height,
+                no_text=args.no_text,
+                overwrite=args.overwrite,
+                engine=args.engine,
+                cache_dir=(Path(args.cache_dir) if args.cache_dir else None),
+                cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                max_errors=(args.max_errors or None),
+                png=png,
+                format=args.format,
+                outputs=outputs,
+                pipeline=args.pipeline,
+                queue_depth=args.queue_depth,
+            ),
+        )
+        watcher.run()
+        return
+    if args.sheet:
+        try:
+            layout = SheetLayout(
+                page=args.sheet_page,
+                rows=args.sheet_rows,
+                cols=args.sheet_cols,
+                margin_mm=args.sheet_margin_mm,
+                gap_mm=args.sheet_gap_mm,
+                dpi=args.sheet_dpi,
+                landscape=args.sheet_landscape,
+            )
+            sink = SheetSink(Path(args.sheet), layout)
+        except ValueError as e:
+            parser.error(str(e))
+        # Render directo al tamaño de la celda: sin reescalar al componer
+        cell_w, cell_h = layout.cell_size_px
+        width, height = args.width or cell_w, args.height or cell_h
+    elif args.archive:
+        try:
+            sink = open_archive_sink(Path(args.archive))
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        sink = DirectorySink(Path(args.outdir) / "barcodes")
+
+    profiler = nullcontext()
+    if args.profile:
+        profiler = profile_run(
+            Path(args.outdir) / "logs",
+            context={
+                "Comando": " ".join(sys.argv[1:]),
+                "Motor": args.engine,
+                "Workers": args.workers,
+                "Pipeline": args.pipeline,
+            },
+        )
+
+    with sink, profiler as prof:
+        result = generate_barcodes_from_csv(
+            csv_path=Path(args.csv),
+            outdir=Path(args.outdir),
+            delimiter=delimiter,
+            encoding=args.encoding,
+            width=width,
+            height=height,
+            no_text=args.no_text,
+            overwrite=args.overwrite,
+            engine=args.engine,
+            workers=args.workers,
+            cache_dir=(Path(args.cache_dir) if args.cache_dir else None),
+            cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+            resume=args.resume,
+            max_errors=(args.max_errors or None),
+            png=png,
+            format=args.format,
+            outputs=outputs,
+            sink=sink,
+            pipeline=args.pipeline,
+            queue_depth=args.queue_depth,
+            shard=shard,
+        )
 
     print(f"Listo. Filas válidas: {result.generated}")
+    print(f"CSV: delimitador {result.delimiter!r}, encoding {result.encoding}")
+    # Las hojas no codifican etiquetas sueltas: se reporta el archivo compuesto
+    written = sink.path.stat().st_size if args.sheet else result.bytes_written
+    print(f"Destino: {result.output} ({written:,} bytes escritos)")
+    print(f"Tiempo: {result.elapsed:.2f} s (detalle por etapa en {result.log_file})")
+    if args.timings_json:
+        write_timings_json(
+            Path(args.timings_json),
+            result.timings,
+            extra={
+                "csv": str(Path(args.csv)),
+                "rows": result.generated + result.skipped + result.error_count,
+                "generated": result.generated,
+                "elapsed_s": round(result.elapsed, 6),
+                "engine": args.engine,
+                "workers": args.workers,
+                "pipeline": args.pipeline,
+            },
+        )
+        print(f"Tiempos: {args.timings_json}")
+    if args.profile:
+        print(f"Perfil: {', '.join(str(p) for p in prof.files)}")
+    if args.sheet:
+        print(f"Hojas: {sink.pages} ({sink.labels} etiquetas, {layout.cols}x{layout.rows} por hoja)")
+    if args.resume:
+        print(f"Sin cambios (omitidos): {result.skipped}")
+    if args.cache_dir and args.sheet:
+        print("Caché: no se usa al componer hojas")
+    elif args.cache_dir:
+        print(f"Caché: {result.cache_hits} aciertos / {result.cache_misses} fallos")
     if result.errors:
         print("\nErrores (línea CSV | Clave | EAN-13 | motivo):")
         for e in result.errors:
             print(f"- {e.line_no} | {e.clave} | {e.ean13} | {e.message}")
+        if result.errors_truncated:
+            print(f"... y {result.error_count - len(result.errors)} más (ver {result.errors_csv})")
+        print("\nErrores por tipo:")
+        for category, count in result.error_summary.items():
+            print(f"- {category}: {count}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,389 @@
+"""
+Benchmark de generate_barcodes_from_csv con catálogos sintéticos.
+
+Genera CSV de 1k/100k/1M filas (con errores, Claves repetidas y ambos
+delimitadores), corre cada combinación de opciones en un proceso aparte y
+reporta filas/s y pico de memoria (RSS). Además calcula un hash de los
+píxeles de todas las imágenes y lo compara contra scripts/benchmark_golden.json:
+las opciones que solo afectan la velocidad (procesos, pipeline, caché, nivel
+de compresión) deben dar exactamente los mismos píxeles.
+
+Uso:
+    python scripts/benchmark.py                         # 1k filas, todas las combinaciones
+    python scripts/benchmark.py --sizes 1k,100k --combos base,workers,pipeline
+    python scripts/benchmark.py --sizes 1m --no-pixels  # sin verificar píxeles (lento en 1M)
+    python scripts/benchmark.py --update-golden         # regenerar las referencias
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+# Importar desde /src sin configurar PYTHONPATH
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if SRC.exists() and str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+GOLDEN = Path(__file__).resolve().parent / "benchmark_golden.json"
+
+# Combinaciones de opciones de generate_barcodes_from_csv. "workers" usa todos los
+# núcleos; "cache-caliente" reutiliza la caché que deja "cache-frio".
+COMBOS = {
+    "base": {},
+    "workers": {"workers": 0},
+    "pipeline": {"pipeline": True},
+    "cache-frio": {"cache": "cold"},
+    "cache-caliente": {"cache": "warm"},
+    "png-rapido": {"png": {"compress_level": 1, "optimize": False}},
+    "png-1bit": {"png": {"mode": "1bit", "optimize": False}},
+    "python-barcode": {"engine": "python-barcode"},
+    "svg": {"format": "svg"},
+}
+
+# Cada delimitador con el encoding con que suele llegar: Excel en español exporta ';' + cp1252
+DELIMITERS = {",": "utf-8-sig", ";": "cp1252"}
+
+_DESCRIPTIONS = [
+    "THERMOFIT 1/8 NEGRO FIBRA VIDRIO ML",
+    "CABLE CALIBRE 12 AWG ROJO (100 m)",
+    "TORNILLO CABEZA PLANA 3/16\" x 1\"",
+    "CINTA AISLANTE 19 mm × 20 m",
+    "ABRAZADERA SEÑALIZACIÓN ACERO INOX",
+    "CODO 90° PVC 1/2\"",
+    "EMPAQUE NEOPRENO ÓXIDO",
+]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    mult = 1
+    if text.endswith("k"):
+        text, mult = text[:-1], 1_000
+    elif text.endswith("m"):
+        text, mult = text[:-1], 1_000_000
+    try:
+        n = int(float(text) * mult)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamaño inválido: '{text}' (usa 1000, 1k, 100k, 1m)")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"Tamaño inválido: {n}")
+    return n
+
+
+def size_label(n: int) -> str:
+    if n % 1_000_000 == 0:
+        return f"{n // 1_000_000}m"
+    if n % 1_000 == 0:
+        return f"{n // 1_000}k"
+    return str(n)
+
+
+def _check_digit(code12: str) -> int:
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(code12))
+    return (10 - total % 10) % 10
+
+
+def synthetic_rows(n: int, *, seed: int, error_rate: float, dup_rate: float):
+    """
+    Filas (Clave, Secuencial, EAN-13, Descripción) deterministas para `seed`:
+    el mismo catálogo con ',' o ';' tiene exactamente los mismos datos.
+    """
+    rnd = random.Random(seed)
+    recent = []  # últimas filas válidas, de donde salen las Claves/EAN repetidos
+    for i in range(n):
+        desc = rnd.choice(_DESCRIPTIONS)
+        if recent and rnd.random() < dup_rate:
+            clave, ean = rnd.choice(recent)
+            if rnd.random() < 0.5:
+                # Misma Clave con otro EAN: termina en _2, _3...
+                code12 = f"{rnd.randrange(10 ** 12):012d}"
+                ean = code12 + str(_check_digit(code12))
+        else:
+            clave = f"{rnd.choice(('TNF', 'CAB', 'TOR', 'CIN'))}{i:07d}"
+            if rnd.random() < 0.1:
+                clave += "-1/8"  # '/' se sanea al nombrar el archivo
+            code12 = f"{rnd.randrange(10 ** 12):012d}"
+            ean = code12 + str(_check_digit(code12))
+
+        if rnd.random() < error_rate:
+            kind = rnd.randrange(4)
+            if kind == 0:
+                ean = ean[:12] + str((int(ean[12]) + 1) % 10)  # checksum incorrecto
+            elif kind == 1:
+                ean = ean[:rnd.randrange(1, 12)]  # longitud
+            elif kind == 2:
+                ean = ean[:6] + "AB" + ean[8:]  # caracteres no numéricos
+            else:
+                ean = ""
+        else:
+            recent.append((clave, ean))
+            if len(recent) > 1000:
+                recent.pop(0)
+
+        yield clave, ean[:12], ean, desc
+
+
+def write_catalog(path: Path, n: int, *, delimiter: str, seed: int, error_rate: float, dup_rate: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding=DELIMITERS[delimiter], newline="") as f:
+        w = csv.writer(f, delimiter=delimiter)
+        w.writerow(["Clave", "Secuencial", "EAN-13", "Descripción"])
+        w.writerows(synthetic_rows(n, seed=seed, error_rate=error_rate, dup_rate=dup_rate))
+    os.replace(tmp, path)
+
+
+# ---- Medición (en un proceso hijo por corrida) ----
+
+def _pixel_hash(path: Path) -> str:
+    """
+    Hash de los píxeles en escala de gris (no del archivo): PNG con otro nivel de
+    compresión u optimize dan el mismo hash; svg/pdf se comparan por bytes.
+    """
+    from PIL import Image
+
+    if path.suffix.lower() in (".svg", ".pdf"):
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    with Image.open(path) as im:
+        im = im.convert("L")
+        h = hashlib.sha256(f"{im.size[0]}x{im.size[1]}\n".encode("ascii"))
+        h.update(im.tobytes())
+    return h.hexdigest()
+
+
+def output_digest(outdir: Path) -> str:
+    """
+    Un solo hash por corrida: cada fila generada (línea, Clave, píxeles) y cada
+    error (línea, motivo), en orden de línea.
+    """
+    from barcode_tool.core import load_manifest
+
+    h = hashlib.sha256()
+    entries = sorted(load_manifest(outdir / "logs" / "manifest.csv").values(), key=lambda e: e.line_no)
+    for e in entries:
+        pixels = ",".join(_pixel_hash(outdir / file) for file in e.files)
+        h.update(f"{e.line_no}\t{e.clave}\t{pixels}\n".encode("utf-8"))
+
+    errors_csv = outdir / "errors.csv"
+    if errors_csv.exists():
+        with errors_csv.open("r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                h.update(f"E\t{row['line_no']}\t{row['motivo']}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def render_key(options: dict, width: int, height: int) -> str:
+    """
+    Opciones que cambian los píxeles; las demás (procesos, pipeline, caché,
+    compresión) no deben cambiarlos y comparten referencia.
+    """
+    engine = options.get("engine", "native")
+    fmt = options.get("format", "png")
+    key = f"{engine} {width}x{height} {fmt}"
+    if fmt == "png":
+        key += " " + options.get("png", {}).get("mode", "rgb")
+    return key
+
+
+def run_child(spec: dict) -> dict:
+    from barcode_tool.core import PngProfile, generate_barcodes_from_csv
+    from barcode_tool.profiling import peak_rss
+
+    options = spec["options"]
+    cache_dir = Path(spec["cache_dir"]) if options.get("cache") else None
+    if options.get("cache") == "cold" and cache_dir is not None and cache_dir.exists():
+        shutil.rmtree(cache_dir)
+
+    t0 = time.perf_counter()
+    result = generate_barcodes_from_csv(
+        Path(spec["csv"]),
+        Path(spec["outdir"]),
+        width=spec["width"],
+        height=spec["height"],
+        engine=options.get("engine", "native"),
+        workers=options.get("workers"),
+        pipeline=options.get("pipeline", False),
+        cache_dir=cache_dir,
+        png=PngProfile(**options.get("png", {})),
+        format=options.get("format", "png"),
+    )
+    elapsed = time.perf_counter() - t0
+
+    out = {
+        "rows": result.generated + result.skipped + result.error_count,
+        "generated": result.generated,
+        "errors": result.error_count,
+        "cache_hits": result.cache_hits,
+        "bytes_written": result.bytes_written,
+        "elapsed": elapsed,
+        "rows_per_s": (result.generated + result.skipped + result.error_count) / elapsed if elapsed else 0.0,
+        "rss_main": peak_rss(),
+        "rss_workers": peak_rss(children=True),
+        "stages": {stage: st.as_dict() for stage, st in result.timings.items()},
+    }
+    if spec["pixels"]:
+        out["digest"] = output_digest(Path(spec["outdir"]))
+    return out
+
+
+# ---- Orquestación ----
+
+def _mb(n) -> str:
+    return "n/d" if n is None else f"{n / 1024 / 1024:.0f}"
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "_child":
+        print(json.dumps(run_child(json.loads(sys.argv[2]))))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark con catálogos sintéticos y verificación de píxeles.")
+    parser.add_argument("--sizes", default="1k", help="Filas por catálogo, separadas por coma (default: 1k; p. ej. 1k,100k,1m)")
+    parser.add_argument("--combos", default=",".join(COMBOS), help=f"Combinaciones a correr (default: todas: {', '.join(COMBOS)})")
+    parser.add_argument("--delimiters", default=",;", help="Delimitadores a probar (default: ',;')")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fracción de filas con EAN inválido (default: 0.02)")
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="Fracción de filas con Clave repetida (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla del catálogo (default: 1)")
+    parser.add_argument("--width", type=int, default=450, help="Ancho en px (default: 450)")
+    parser.add_argument("--height", type=int, default=300, help="Alto en px (default: 300)")
+    parser.add_argument("--workdir", default=None, help="Carpeta de trabajo (default: temporal, se borra al terminar)")
+    parser.add_argument("--no-pixels", action="store_true", help="No verificar píxeles (más rápido con catálogos grandes)")
+    parser.add_argument("--golden", default=str(GOLDEN), help="Archivo de referencias de píxeles")
+    parser.add_argument("--update-golden", action="store_true", help="Guardar los hashes de esta corrida como referencia")
+    parser.add_argument("--json", default=None, help="Guardar los resultados completos en este JSON")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    combos = [c.strip() for c in args.combos.split(",") if c.strip()]
+    unknown = [c for c in combos if c not in COMBOS]
+    if unknown:
+        parser.error(f"Combinación desconocida: {', '.join(unknown)} (usa {', '.join(COMBOS)})")
+    delimiters = [d for d in args.delimiters if d in DELIMITERS]
+    if not delimiters:
+        parser.error(f"Delimitadores soportados: {', '.join(DELIMITERS)}")
+    if args.update_golden and args.no_pixels:
+        parser.error("--update-golden requiere verificar píxeles (quita --no-pixels)")
+
+    golden_path = Path(args.golden)
+    golden = json.loads(golden_path.read_text(encoding="utf-8")) if golden_path.exists() else {}
+
+    own_workdir = args.workdir is None
+    workdir = Path(tempfile.mkdtemp(prefix="barcode_bench_")) if own_workdir else Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    import barcode
+    import PIL
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "python_barcode": barcode.version,
+        "results": [],
+    }
+    seen: dict = {}  # (catálogo, render_key) -> (digest, combo) de la primera corrida
+    crashed = 0  # corridas hijas que terminaron con error
+    mismatches = 0  # píxeles distintos entre combinaciones o de la referencia
+
+    print(f"{'filas':>7} {'delim':>5} {'combinación':<15} {'s':>8} {'filas/s':>9} {'RSS MB':>7} {'workers MB':>10}  píxeles")
+    try:
+        for n in sizes:
+            catalog = f"{size_label(n)}-s{args.seed}-e{args.error_rate:g}-d{args.dup_rate:g}"
+            for delim in delimiters:
+                tag = "coma" if delim == "," else "pyc"
+                csv_path = workdir / "catalogos" / f"{catalog}-{tag}.csv"
+                if not csv_path.exists():
+                    write_catalog(csv_path, n, delimiter=delim, seed=args.seed,
+                                  error_rate=args.error_rate, dup_rate=args.dup_rate)
+
+                for combo in combos:
+                    options = COMBOS[combo]
+                    outdir = workdir / "salida" / f"{catalog}-{tag}-{combo}"
+                    if outdir.exists():
+                        shutil.rmtree(outdir)
+                    spec = {
+                        "csv": str(csv_path),
+                        "outdir": str(outdir),
+                        "cache_dir": str(workdir / "cache" / f"{catalog}-{tag}"),
+                        "width": args.width,
+                        "height": args.height,
+                        "options": options,
+                        "pixels": not args.no_pixels,
+                    }
+                    proc = subprocess.run(
+                        [sys.executable, str(Path(__file__).resolve()), "_child", json.dumps(spec)],
+                        capture_output=True, text=True,
+                    )
+                    shutil.rmtree(outdir, ignore_errors=True)
+                    if proc.returncode != 0:
+                        print(f"{n:>7} {delim!r:>5} {combo:<15} falló:\n{proc.stderr}", file=sys.stderr)
+                        crashed += 1
+                        continue
+                    res = json.loads(proc.stdout.strip().splitlines()[-1])
+
+                    status = "-"
+                    key = render_key(options, args.width, args.height)
+                    digest = res.get("digest")
+                    if digest is not None:
+                        first = seen.setdefault((catalog, key), (digest, f"{combo} {delim!r}"))
+                        expected = golden.get(catalog, {}).get(key)
+                        if first[0] != digest:
+                            status = f"DIFERENTE de {first[1]}"
+                        elif expected is None:
+                            status = "sin referencia"
+                        elif expected != digest:
+                            status = "DIFERENTE de la referencia"
+                        else:
+                            status = "ok"
+                        if status.startswith("DIFERENTE"):
+                            mismatches += 1
+
+                    res.update({"catalog": catalog, "delimiter": delim, "combo": combo,
+                                "render_key": key, "pixels": status})
+                    report["results"].append(res)
+                    print(
+                        f"{res['rows']:>7} {delim!r:>5} {combo:<15} {res['elapsed']:>8.2f} {res['rows_per_s']:>9.0f} "
+                        f"{_mb(res['rss_main']):>7} {_mb(res['rss_workers']):>10}  {status}"
+                    )
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Resultados: {args.json}")
+
+    if args.update_golden:
+        # Solo se guardan referencias si todas las combinaciones coincidieron entre sí
+        mismatched = [r for r in report["results"] if r["pixels"].startswith("DIFERENTE de ")
+                      and not r["pixels"].endswith("referencia")]
+        if mismatched:
+            print("No se actualizan las referencias: hay combinaciones con píxeles distintos.", file=sys.stderr)
+        else:
+            for (catalog, key), (digest, _) in seen.items():
+                golden.setdefault(catalog, {})[key] = digest
+            golden_path.write_text(json.dumps(golden, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            print(f"Referencias actualizadas: {golden_path}")
+            # Las diferencias con la referencia anterior ya quedaron resueltas; las corridas que fallaron no
+            mismatches = 0
+
+    if crashed or mismatches:
+        print(f"{crashed + mismatches} corrida(s) con fallas o píxeles distintos.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,10 @@ python -m pip install --upgrade pip
 pip install -r requirements.txt
 pip install -r requirements-dev.txt
 
+# Arranque liviano: ninguna dependencia pesada al importar y tiempos dentro del presupuesto
+python scripts\check_import_time.py
+if ($LASTEXITCODE -ne 0) { throw "Importación demasiado lenta o con dependencias pesadas (ver arriba)" }
+
 # Limpieza selectiva solo del launcher
 if (Test-Path ".\dist\launcher") { Remove-Item ".\dist\launcher" -Recurse -Force }
 
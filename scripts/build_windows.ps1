@@ -16,6 +16,10 @@ python -m pip install --upgrade pip
 pip install -r requirements.txt
 pip install -r requirements-dev.txt
 
+# Arranque liviano: ninguna dependencia pesada al importar y tiempos dentro del presupuesto
+python scripts\check_import_time.py
+if ($LASTEXITCODE -ne 0) { throw "Importación demasiado lenta o con dependencias pesadas (ver arriba)" }
+
 # Limpiar builds previos
 if (Test-Path ".\build") { Remove-Item ".\build" -Recurse -Force }
 if (Test-Path ".\dist") { Remove-Item ".\dist" -Recurse -Force }
@@ -40,4 +44,9 @@ Write-Host "EXE generado en: dist\barcode_tool_windows.exe"
 if ($Release) {
   Copy-Item ".\dist\barcode_tool_windows.exe" -Destination ".\dist\barcode_tool.exe" -Force
   Write-Host "Alias listo: dist\barcode_tool.exe"
+
+  # Checksum que el launcher verifica antes de instalar (subir junto al .exe en el Release)
+  $hash = (Get-FileHash ".\dist\barcode_tool_windows.exe" -Algorithm SHA256).Hash.ToLower()
+  Set-Content -Path ".\dist\barcode_tool_windows.exe.sha256" -Value "$hash  barcode_tool_windows.exe" -Encoding ascii -NoNewline
+  Write-Host "Checksum listo: dist\barcode_tool_windows.exe.sha256"
 }
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Verifica que validate_ean13_batch dé el mismo resultado que validar fila por
+fila con clean_digits + validate_ean13 (estado y mensaje), con y sin NumPy.
+
+Mezcla EAN válidos, checksums incorrectos, longitudes inválidas, dígitos
+Unicode decimales (arábigos, de ancho completo) y caracteres que pasan
+isdigit() pero no son decimales ('²', '①'), que no deben interrumpir el lote.
+
+Uso:
+    python scripts/check_ean_batch.py
+    python scripts/check_ean_batch.py --rows 200000 --seed 7
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+# Casos fijos: cada uno falló o podría fallar si la ruta por lotes diverge
+REGRESSION = [
+    "4006381333931",
+    "4006381333932",
+    " 400-638-133-3931 ",
+    "75010312345²",           # '²' pasa isdigit() pero no es decimal
+    "7501031234567²",
+    "①234567890128",
+    "٤٠٠٦٣٨١٣٣٣٩٣١",          # dígitos arábigo-índicos
+    "４００６３８１３３３９３１",  # ancho completo
+    "",
+    "abc",
+    "123",
+]
+
+_DIGIT_SETS = ["0123456789", "٠١٢٣٤٥٦٧٨٩", "０１２３４５６７８９"]
+_NOISE = ["", " ", "-", "²", "①", "x"]
+
+
+def random_values(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(n):
+        digits = rng.choice(_DIGIT_SETS) if rng.random() < 0.1 else _DIGIT_SETS[0]
+        length = 13 if rng.random() < 0.8 else rng.randint(0, 15)
+        s = "".join(rng.choice(digits) for _ in range(length))
+        if rng.random() < 0.1:
+            pos = rng.randint(0, len(s))
+            s = s[:pos] + rng.choice(_NOISE) + s[pos:]
+        values.append(s)
+    return values
+
+
+def serial(value: str) -> str:
+    from barcode_tool.core import clean_digits, validate_ean13
+
+    try:
+        validate_ean13(clean_digits(value))
+    except ValueError as e:
+        return str(e)
+    return ""
+
+
+def check(values: list[str]) -> int:
+    from barcode_tool.core import EAN_OK, validate_ean13_batch
+
+    batch = validate_ean13_batch(values)
+    failures = 0
+    for i, value in enumerate(values):
+        want = serial(value)
+        got = batch.message(i)
+        if want != got or (batch.status[i] == EAN_OK) != (want == ""):
+            failures += 1
+            if failures <= 10:
+                print(f"DIFERENTE {value!r}: fila por fila={want!r} lote={got!r} estado={batch.status[i]}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara la validación EAN-13 por lotes con la de fila por fila.")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-numpy", action="store_true", help="Solo la ruta sin NumPy (uso interno)")
+    args = parser.parse_args()
+
+    if args.no_numpy:
+        sys.modules["numpy"] = None  # la importación falla: validate_ean13_batch usa la ruta pura
+    else:
+        # La ruta sin NumPy se verifica en un intérprete aparte
+        proc = subprocess.run([sys.executable, __file__, "--rows", str(args.rows), "--seed", str(args.seed), "--no-numpy"])
+        if proc.returncode:
+            sys.exit(proc.returncode)
+
+    from barcode_tool.core import _numpy
+
+    label = "con NumPy" if _numpy() is not None else "sin NumPy"
+    failures = check(REGRESSION) + check(random_values(args.rows, args.seed))
+    if failures:
+        print(f"FALLA {label}: {failures} fila(s) distintas")
+        sys.exit(1)
+    print(f"OK  {label}: {len(REGRESSION) + args.rows} valores iguales fila por fila y por lotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Verifica que el arranque del CLI, la GUI y el launcher siga siendo liviano.
+
+Importa cada punto de entrada en un intérprete nuevo con `python -X importtime`
+y falla si:
+- carga alguna dependencia pesada que debe diferirse hasta su primer uso
+  (Pillow, python-barcode, NumPy, requests...), o
+- el tiempo de importación (mejor de varias corridas) supera su presupuesto.
+
+Uso:
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --scale 3   # máquina lenta / build congelado
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Punto de entrada -> (presupuesto en ms, paquetes que no deben cargarse al importar)
+ENTRIES = {
+    "barcodes_from_csv_ean13": (150, ("PIL", "barcode", "numpy", "requests", "tkinter")),
+    "barcode_tool.gui": (100, ("PIL", "barcode", "numpy", "requests", "barcode_tool.core")),
+    "barcode_tool_launcher": (50, ("requests", "tkinter", "urllib3", "certifi")),
+}
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """
+    Tiempo acumulado de importar `module` (ms, sin el arranque del intérprete)
+    y los módulos que se cargaron con él.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "src"), str(ROOT), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT), env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{proc.stderr}")
+
+    # importtime lista cada módulo después de sus dependencias, con sangría por
+    # nivel: el subárbol de `module` son las líneas más sangradas justo antes de
+    # la suya (lo anterior lo carga el arranque del intérprete, p. ej. site)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            rows.append((name, cumulative.strip()))
+
+    for i in range(len(rows) - 1, -1, -1):
+        name, cumulative = rows[i]
+        if name.strip() == module and not name.startswith("  "):
+            loaded = {module}
+            for child, _ in reversed(rows[:i]):
+                if not child.startswith("  "):
+                    break
+                loaded.add(child.strip())
+            return int(cumulative) / 1000, loaded
+    raise RuntimeError(f"importtime no reportó {module}")
+
+
+def _forbidden_hits(loaded: set[str], forbidden) -> list[str]:
+    return sorted(
+        name for name in loaded
+        if any(name == f or name.startswith(f + ".") for f in forbidden)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación del CLI, la GUI y el launcher.")
+    parser.add_argument("--runs", type=int, default=5, help="Corridas por punto de entrada; se toma la mejor (default: 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica los presupuestos (default: 1)")
+    args = parser.parse_args()
+
+    failures = 0
+    for module, (budget_ms, forbidden) in ENTRIES.items():
+        best = None
+        loaded: set[str] = set()
+        for _ in range(max(1, args.runs)):
+            ms, loaded = measure(module)
+            best = ms if best is None else min(best, ms)
+
+        budget = budget_ms * args.scale
+        hits = _forbidden_hits(loaded, forbidden)
+        ok = best <= budget and not hits
+        failures += not ok
+        print(f"{'OK ' if ok else 'MAL'} {module:<26} {best:7.1f} ms (presupuesto {budget:.0f} ms)")
+        if hits:
+            print(f"    carga al importar: {', '.join(hits[:10])}{' ...' if len(hits) > 10 else ''}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Verifica que reanudar (resume=True) después de una corrida cancelada no
+duplique archivos: una corrida completa, una reanudación cancelada tras el
+primer lote y otra reanudación completa deben dejar exactamente un archivo por
+fila, sin ningún _2, y el manifiesto con todas las filas.
+
+Uso:
+    python scripts/check_resume.py
+    python scripts/check_resume.py --rows 500
+"""
+
+import argparse
+import csv
+import sys
+import tempfile
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def write_csv(path: Path, rows: int) -> None:
+    from barcode_tool.core import ean13_check_digit
+
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Clave", "Secuencial", "EAN-13", "Descripción"])
+        for i in range(rows):
+            base = f"750{i:09d}"
+            w.writerow([f"K{i:05d}", i + 1, f"{base}{ean13_check_digit(base)}", f"Producto {i}"])
+
+
+def manifest_rows(outdir: Path) -> int:
+    with (outdir / "logs" / "manifest.csv").open("r", encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Comprueba cancelar y reanudar sin duplicar archivos.")
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+
+    from barcode_tool.core import CancelToken, generate_barcodes_from_csv
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "codes.csv"
+        outdir = Path(tmp) / "out"
+        write_csv(csv_path, args.rows)
+
+        generate_barcodes_from_csv(csv_path, outdir, width=200, height=120, workers=1)
+
+        # Cancelar en cuanto termina el primer lote
+        cancel = CancelToken()
+        result = generate_barcodes_from_csv(
+            csv_path, outdir, width=200, height=120, workers=1, resume=True,
+            cancel=cancel, on_progress=lambda p: cancel.cancel(),
+        )
+        if not result.cancelled:
+            failures.append("la reanudación no se canceló (¿CSV de un solo lote?)")
+        if manifest_rows(outdir) != args.rows:
+            failures.append(f"tras cancelar, el manifiesto tiene {manifest_rows(outdir)} filas (se esperaban {args.rows})")
+
+        result = generate_barcodes_from_csv(csv_path, outdir, width=200, height=120, workers=1, resume=True)
+        files = sorted(p.name for p in (outdir / "barcodes").iterdir())
+        duplicates = [name for name in files if "_" in Path(name).stem]
+        if len(files) != args.rows or duplicates:
+            failures.append(f"{len(files)} archivos en barcodes/ ({len(duplicates)} duplicados, p. ej. {duplicates[:3]})")
+        if result.generated:
+            failures.append(f"la última reanudación volvió a generar {result.generated} archivos")
+        if manifest_rows(outdir) != args.rows:
+            failures.append(f"el manifiesto final tiene {manifest_rows(outdir)} filas (se esperaban {args.rows})")
+
+    if failures:
+        for failure in failures:
+            print(f"FALLA {failure}")
+        sys.exit(1)
+    print(f"OK  {args.rows} filas: cancelar y reanudar no duplica archivos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Servidor local que imita la API de Releases de GitHub y la descarga del asset,
+para probar las actualizaciones del launcher sin publicar nada.
+
+Responde:
+- GET /releases/latest           JSON con tag_name y assets (como la API real)
+- GET/HEAD /download/<asset>     el archivo, con Range/If-Range (206) y ETag
+- GET /download/<asset>.sha256   checksum en formato sha256sum (con --no-digest)
+
+Uso:
+    python scripts/release_stub_server.py --file dist/barcode_tool_windows.exe --tag v9.9.9
+    set BARCODE_TOOL_LATEST_API=http://127.0.0.1:8766/releases/latest
+    python barcode_tool_launcher.py
+
+Para simular redes malas:
+    --rate 2          limita a 2 MB/s por conexión
+    --drop-after 3    corta cada respuesta tras 3 MB enviados (prueba reintentos/reanudación)
+    --no-ranges       sin Accept-Ranges: el launcher baja en una sola conexión
+    --no-digest       sin campo digest: el checksum va en un asset .sha256 aparte
+    --bad-checksum    publica un SHA-256 que no coincide (la descarga debe descartarse)
+    --weak-etag       ETag débil (W/"..."): If-Range debe usar Last-Modified
+    --full-on-range   anuncia Accept-Ranges pero responde 200 completo a todo Range
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+ASSET_NAME = "barcode_tool_windows.exe"
+CHUNK = 64 * 1024
+
+
+def make_handler(args: argparse.Namespace, data: bytes) -> type[BaseHTTPRequestHandler]:
+    digest = hashlib.sha256(data).hexdigest()
+    if args.bad_checksum:
+        digest = hashlib.sha256(data + b"x").hexdigest()
+    etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+    if args.weak_etag:
+        etag = "W/" + etag
+    last_modified = formatdate(args.file.stat().st_mtime, usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt: str, *a) -> None:
+            if not args.quiet:
+                super().log_message(fmt, *a)
+
+        def _base(self) -> str:
+            return f"http://{self.headers.get('Host', f'127.0.0.1:{args.port}')}"
+
+        def _send(self, status: int, body: bytes, content_type: str, extra: dict | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_HEAD(self) -> None:
+            self.do_GET()
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/releases/latest":
+                asset = {
+                    "name": ASSET_NAME,
+                    "size": len(data),
+                    "browser_download_url": f"{self._base()}/download/{args.tag}/{ASSET_NAME}",
+                }
+                assets = [asset]
+                if args.no_digest:
+                    assets.append({
+                        "name": ASSET_NAME + ".sha256",
+                        "browser_download_url": f"{self._base()}/download/{args.tag}/{ASSET_NAME}.sha256",
+                    })
+                else:
+                    asset["digest"] = f"sha256:{digest}"
+                body = json.dumps({"tag_name": args.tag, "assets": assets}).encode("utf-8")
+                self._send(200, body, "application/json")
+            elif self.path == f"/download/{args.tag}/{ASSET_NAME}.sha256" and args.no_digest:
+                self._send(200, f"{digest}  {ASSET_NAME}\n".encode("ascii"), "text/plain")
+            elif self.path == f"/download/{args.tag}/{ASSET_NAME}":
+                self._asset()
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def _asset(self) -> None:
+            size = len(data)
+            start, end = 0, size - 1
+            status = 200
+            headers = {"ETag": etag, "Last-Modified": last_modified}
+            if not args.no_ranges:
+                headers["Accept-Ranges"] = "bytes"
+                m = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                # RFC 9110: If-Range solo con validador fuerte; uno débil o distinto = archivo completo
+                valid = if_range is None or (if_range in (etag, last_modified) and not if_range.startswith("W/"))
+                if m and valid and not args.full_on_range:
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+                    if start > end:
+                        self._send(416, b"", "text/plain", {"Content-Range": f"bytes */{size}"})
+                        return
+                    status = 206
+                    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(end - start + 1))
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+
+            sent = 0
+            limit = int(args.drop_after * 1024 * 1024) if args.drop_after else None
+            t0 = time.perf_counter()
+            pos = start
+            while pos <= end:
+                chunk = data[pos:min(pos + CHUNK, end + 1)]
+                if limit is not None and sent + len(chunk) > limit:
+                    # Conexión cortada a medias: el cliente debe reintentar desde donde quedó
+                    self.wfile.write(chunk[:max(0, limit - sent)])
+                    self.close_connection = True
+                    return
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                sent += len(chunk)
+                pos += len(chunk)
+                if args.rate:
+                    wait = sent / (args.rate * 1024 * 1024) - (time.perf_counter() - t0)
+                    if wait > 0:
+                        time.sleep(wait)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local de Releases para probar el launcher.")
+    parser.add_argument("--file", required=True, type=Path, help="Archivo que se sirve como asset")
+    parser.add_argument("--tag", default="v9.9.9", help="tag_name publicado (default: v9.9.9)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rate", type=float, default=0, help="MB/s por conexión (0 = sin límite)")
+    parser.add_argument("--drop-after", type=float, default=0, help="Cortar cada respuesta tras N MB")
+    parser.add_argument("--no-ranges", action="store_true", help="No aceptar Range")
+    parser.add_argument("--no-digest", action="store_true", help="Publicar el checksum como asset .sha256")
+    parser.add_argument("--bad-checksum", action="store_true", help="Publicar un SHA-256 incorrecto")
+    parser.add_argument("--weak-etag", action="store_true", help="Enviar un ETag débil (W/...)")
+    parser.add_argument("--full-on-range", action="store_true", help="Responder 200 completo a las solicitudes Range")
+    parser.add_argument("--quiet", action="store_true", help="No registrar cada solicitud")
+    args = parser.parse_args()
+
+    data = args.file.read_bytes()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, data))
+    print(f"Sirviendo {args.file} ({len(data)} bytes) como {args.tag}")
+    print(f"  set BARCODE_TOOL_LATEST_API=http://{args.host}:{args.port}/releases/latest", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
 from .version import __version__
 
-__all__ = ["core", "__version__"]
\ No newline at end of file
+__all__ = ["core", "cache", "sinks", "sheets", "vector", "pipeline", "profiling", "server", "shards", "timing", "watch", "__version__"]
\ No newline at end of file
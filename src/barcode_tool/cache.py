@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RenderCache:
+    """
+    Caché persistente de imágenes ya renderizadas, direccionada por contenido.
+
+    Cada entrada es un archivo `<root>/<ab>/<clave><sufijo>` donde la clave es un hash
+    de todo lo que influye en el resultado (EAN, tamaño, opciones, formato, versión
+    del motor) y el sufijo es el del formato (.png, .jpg, .svg...).
+    El mtime hace de marca LRU: un acierto lo actualiza y `prune()` borra los más viejos.
+    Los aciertos se enlazan (hardlink) o copian al destino, ver OutputSink.link.
+    """
+
+    root: Path
+    max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+
+    def path_for(self, key: str, suffix: str = ".png") -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def lookup(self, key: str, suffix: str = ".png") -> Optional[Path]:
+        """
+        Devuelve la ruta de la entrada si existe y la marca como usada (LRU).
+        """
+        path = self.path_for(key, suffix)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def store(self, key: str, data: bytes, suffix: str = ".png") -> None:
+        dst = self.path_for(key, suffix)
+        if dst.exists():
+            return
+        dst.parent.mkdir(parents=True, exist_ok=True)
+
+        # Escritura atómica: otros procesos nunca ven un archivo a medias. Cada
+        # escritura tiene su propio temporal (varios hilos pueden guardar la misma clave)
+        import tempfile
+
+        fd, name = tempfile.mkstemp(prefix=f"{dst.name}.", suffix=".tmp", dir=dst.parent)
+        tmp = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dst)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if not self.root.exists():
+            return entries
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                # Todo menos temporales: también entradas .png de formatos que antes se guardaban así
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def prune(self) -> int:
+        """
+        Desaloja las entradas menos usadas hasta quedar bajo `max_bytes`.
+        Devuelve cuántas entradas se borraron.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+class MemoryCache:
+    """
+    LRU en memoria de renders recientes (clave de render_cache_key -> bytes),
+    acotado por tamaño total. Seguro entre hilos; pensado para el servidor.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
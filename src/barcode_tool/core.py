@@ -1,18 +1,134 @@
 from __future__ import annotations
 
+import os
 import sys
 import csv
-from dataclasses import dataclass
+import codecs
+import hashlib
+import io
+import json
+import threading
+import time
+import unicodedata
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Callable, Generator, Iterator, Optional, List, Iterable, Sequence, Set, TextIO
 
-from barcode import get_barcode_class
-from barcode.writer import ImageWriter
-from PIL import Image
+from .cache import DEFAULT_CACHE_MAX_BYTES, RenderCache
+from .pipeline import DEFAULT_QUEUE_DEPTH, run_pipeline
+from .shards import SHARD_INFO, Shard, ShardReader, shard_range
+from .timing import StageStats, format_timings, new_timings
+from .sinks import DirectorySink, OutputSink
+from .vector import VECTOR_ENGINE_VERSION, VECTOR_FORMATS, render_ean13_pdf, render_ean13_svg
+
+# Pillow, python-barcode, NumPy y los procesos se importan al usarse por primera
+# vez: importar este módulo (CLI --help, GUI, launcher) no debe cargarlos
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image, ImageFont
 
 
 WINDOWS_FORBIDDEN = '<>:"\\|?*'
 REQUIRED_COLS = ["Clave", "Secuencial", "EAN-13", "Descripción"]
+ERRORS_CSV_COLS = ["line_no", "Clave", "EAN-13", "motivo"]
+
+# Errores que se conservan en RunResult.errors; el resto solo va a disco
+DEFAULT_MAX_ERRORS = 1000
+
+# Motores de render disponibles: "native" dibuja el patrón directo al lienzo final,
+# "python-barcode" usa ImageWriter + redimensionado (comportamiento original).
+ENGINES = ("native", "python-barcode")
+DEFAULT_ENGINE = "native"
+NATIVE_ENGINE_VERSION = "1"
+
+# Modos de PNG: "rgb" = 24 bits (original); "gray" = 8 bits; "1bit" y "palette"
+# binarizan a blanco/negro (umbral 50 %) y guardan 1 bit por píxel.
+PNG_MODES = ("rgb", "gray", "1bit", "palette")
+
+
+@dataclass(frozen=True)
+class PngProfile:
+    """
+    Cómo se codifica cada PNG. Con engine="python-barcode", el default reproduce
+    la salida original byte a byte; el motor nativo (default) dibuja otros píxeles.
+    PngProfile("1bit", optimize=False) es ~15x más rápido y ~6x más chico.
+    """
+
+    mode: str = "rgb"
+    compress_level: int = 6
+    optimize: bool = True
+
+    def __post_init__(self) -> None:
+        if self.mode not in PNG_MODES:
+            raise ValueError(f"Modo PNG no soportado: '{self.mode}' (usa {', '.join(PNG_MODES)})")
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError(f"Nivel de compresión fuera de rango (0-9): {self.compress_level}")
+
+
+# Formatos de salida y su extensión; svg y pdf son vectoriales (no pasan por raster)
+OUTPUT_FORMATS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "svg": ".svg", "pdf": ".pdf"}
+
+
+@dataclass(frozen=True)
+class OutputSpec:
+    """
+    Una salida por fila: tamaño, formato, subcarpeta (dentro de barcodes/) y texto.
+    Con varias, el nombre lo decide la primera y las demás lo reutilizan.
+    """
+
+    width: int = 450
+    height: int = 300
+    no_text: bool = False
+    format: str = "png"
+    subdir: str = ""
+    png: PngProfile = PngProfile()
+
+    def __post_init__(self) -> None:
+        if self.format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato no soportado: '{self.format}' (usa {', '.join(OUTPUT_FORMATS)})")
+        if self.width < 1 or self.height < 1:
+            raise ValueError(f"Tamaño inválido: {self.width}x{self.height}")
+        sub = Path(self.subdir)
+        if sub.is_absolute() or ".." in sub.parts:
+            raise ValueError(f"La subcarpeta debe ser relativa y sin '..': '{self.subdir}'")
+
+    @property
+    def suffix(self) -> str:
+        return OUTPUT_FORMATS[self.format]
+
+    def name_for(self, stem: str) -> str:
+        """
+        Nombre relativo a la carpeta/archivo de salida, p. ej. 'thumb/K1.jpg'.
+        """
+        return (Path(self.subdir) / f"{stem}{self.suffix}").as_posix()
+
+
+def parse_output_spec(text: str, *, png: PngProfile = PngProfile()) -> OutputSpec:
+    """
+    Lee una salida tipo "ANCHOxALTO[:opción...]"; las opciones pueden ser un formato
+    (png, jpeg, webp), "notext"/"text" o el nombre de una subcarpeta.
+    Ej.: "450x300", "150x100:thumb:jpeg", "900x600:2x:notext".
+    """
+    size, *options = [part.strip() for part in str(text).split(":")]
+    try:
+        width, height = (int(v) for v in size.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Salida inválida '{text}': se esperaba ANCHOxALTO, p. ej. 450x300") from None
+
+    fields: dict = {"width": width, "height": height, "png": png}
+    for option in options:
+        if option.lower() in OUTPUT_FORMATS:
+            fields["format"] = option.lower()
+        elif option.lower() in ("notext", "no-text"):
+            fields["no_text"] = True
+        elif option.lower() == "text":
+            fields["no_text"] = False
+        elif option:
+            fields["subdir"] = option
+    return OutputSpec(**fields)
 
 
 @dataclass
@@ -21,6 +137,7 @@ class RowError:
     clave: str
     ean13: str
     message: str
+    category: str = "Otro"
 
 
 @dataclass
@@ -32,6 +149,22 @@ class RunResult:
     barcodes_dir: Path
     log_file: Path
     errors_csv: Path | None
+    cache_hits: int = 0
+    cache_misses: int = 0
+    skipped: int = 0
+    manifest: Path | None = None
+    cancelled: bool = False
+    output: str = ""  # destino de las imágenes (carpeta o archivo), ver OutputSink.describe
+    bytes_written: int = 0  # PNG entregados al destino en esta corrida (sin contar omitidos; 0 al componer hojas)
+    elapsed: float = 0.0  # segundos de la corrida completa
+    timings: dict[str, StageStats] = field(default_factory=dict)  # por etapa, ver timing.STAGES
+    encoding: str = ""
+    error_count: int = 0
+    error_summary: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def errors_truncated(self) -> bool:
+        return self.error_count > len(self.errors)
 
 def resource_path(*parts: str) -> Path:
     """
@@ -68,13 +201,97 @@ def unique_path(path: Path) -> Path:
         i += 1
 
 
+# Sin una carpeta que probar: Windows (NTFS) y macOS (APFS/HFS+) no distinguen mayúsculas por defecto
+CASE_INSENSITIVE_DEFAULT = os.name == "nt" or sys.platform == "darwin"
+
+
+def is_case_insensitive(directory: Path) -> bool:
+    """
+    Prueba una vez, con un archivo temporal, si "A.png" y "a.png" serían el
+    mismo archivo en `directory` (o en su carpeta existente más cercana).
+    Si no se puede escribir ahí, CASE_INSENSITIVE_DEFAULT.
+    """
+    import tempfile
+
+    directory = Path(directory)
+    while not directory.exists() and directory.parent != directory:
+        directory = directory.parent
+    try:
+        fd, name = tempfile.mkstemp(prefix=".case_probe_", suffix=".tmp", dir=directory)
+    except OSError:
+        return CASE_INSENSITIVE_DEFAULT
+    os.close(fd)
+    try:
+        probe = Path(name)
+        return (probe.parent / probe.name.swapcase()).exists()
+    finally:
+        os.unlink(name)
+
+
+class NameIndex:
+    """
+    Índice en memoria de los nombres ocupados en una carpeta de salida.
+
+    Se llena con un solo escaneo del directorio y asigna `<stem>.png`, `<stem>_2.png`...
+    con las mismas reglas que unique_path, pero sin consultar el disco por fila:
+    cada stem recuerda desde qué sufijo seguir buscando. Si la carpeta no
+    distingue mayúsculas (Windows, macOS), "A.png" y "a.png" cuentan como el
+    mismo nombre; se prueba una vez al escanear.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        suffix: str = ".png",
+        scan: bool = True,
+        case_insensitive: Optional[bool] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.suffix = suffix
+        if case_insensitive is None:
+            # Sin carpeta real (ZIP, memoria) se sigue la regla de la plataforma
+            case_insensitive = is_case_insensitive(self.directory) if scan else CASE_INSENSITIVE_DEFAULT
+        self.case_insensitive = case_insensitive
+        self._taken: Set[str] = set()
+        self._next: dict[str, int] = {}
+        if scan and self.directory.exists():
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    self._taken.add(self._key(entry.name))
+
+    def _key(self, name: str) -> str:
+        return name.casefold() if self.case_insensitive else name
+
+    def reserve(self, path: Path) -> None:
+        path = Path(path)
+        if path.parent == self.directory:
+            self._taken.add(self._key(path.name))
+
+    def allocate(self, stem: str) -> Path:
+        name = f"{stem}{self.suffix}"
+        if self._key(name) not in self._taken:
+            self._taken.add(self._key(name))
+            return self.directory / name
+
+        # Los nombres nunca se liberan durante la corrida, así que retomar desde
+        # el último sufijo usado da el mismo resultado que buscar desde _2
+        i = self._next.get(stem, 2)
+        while self._key(f"{stem}_{i}{self.suffix}") in self._taken:
+            i += 1
+        name = f"{stem}_{i}{self.suffix}"
+        self._taken.add(self._key(name))
+        self._next[stem] = i + 1
+        return self.directory / name
+
+
 def clean_digits(value: str) -> str:
     s = "" if value is None else str(value).strip()
     return "".join(ch for ch in s if ch.isdigit())
 
 
 def ean13_check_digit(code12: str) -> int:
-    if len(code12) != 12 or not code12.isdigit():
+    if len(code12) != 12 or not code12.isdecimal():
         raise ValueError("Para checksum se requieren exactamente 12 dígitos")
 
     digits = [int(c) for c in code12]
@@ -85,7 +302,8 @@ def ean13_check_digit(code12: str) -> int:
 
 
 def validate_ean13(code13: str) -> str:
-    if len(code13) != 13 or not code13.isdigit():
+    # isdecimal y no isdigit: '²' o '①' pasan clean_digits pero no son dígitos decimales
+    if len(code13) != 13 or not code13.isdecimal():
         raise ValueError(f"EAN-13 inválido: se esperaban 13 dígitos, llegó: '{code13}'")
 
     base12 = code13[:12]
@@ -98,45 +316,361 @@ def validate_ean13(code13: str) -> str:
     return base12
 
 
+# ---- Validación por lotes ----
+
+EAN_OK = "ok"
+EAN_BAD_LENGTH = "length"
+EAN_BAD_CHECKSUM = "checksum"
+
+_ASCII_NON_DIGITS = bytes(b for b in range(128) if not (48 <= b <= 57))
+_EAN_WEIGHTS = (1, 3) * 6
+
+
+@dataclass
+class EanBatchResult:
+    digits: List[str]  # como clean_digits
+    status: List[str]  # EAN_OK | EAN_BAD_LENGTH | EAN_BAD_CHECKSUM
+    expected: List[int]  # dígito de control esperado (-1 si la longitud es inválida)
+
+    def message(self, i: int) -> str:
+        """
+        Mismo texto que levantaría validate_ean13 para la fila i ("" si es válida).
+        """
+        status = self.status[i]
+        if status == EAN_BAD_LENGTH:
+            return f"EAN-13 inválido: se esperaban 13 dígitos, llegó: '{self.digits[i]}'"
+        if status == EAN_BAD_CHECKSUM:
+            return f"Checksum incorrecto: esperado {self.expected[i]}, recibido {unicodedata.decimal(self.digits[i][-1])}"
+        return ""
+
+
+def _clean_digits_fast(value) -> str:
+    s = "" if value is None else str(value)
+    if s.isascii():
+        return s.encode("ascii").translate(None, _ASCII_NON_DIGITS).decode("ascii")
+    return clean_digits(s)
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    NumPy si está instalado (opcional: acelera la validación por lotes), si no None.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - depende del entorno
+        return None
+    return numpy
+
+
+def validate_ean13_batch(values: Iterable[str]) -> EanBatchResult:
+    """
+    Limpia y valida una columna (o un trozo) de EAN-13 en una sola pasada.
+    Con NumPy el checksum se calcula vectorizado; sin NumPy, fila por fila.
+    """
+    digits = [_clean_digits_fast(v) for v in values]
+    status = [EAN_BAD_LENGTH] * len(digits)
+    expected = [-1] * len(digits)
+
+    idx = []
+    codes = []
+    for i, d in enumerate(digits):
+        if len(d) != 13:
+            continue
+        if not d.isascii():
+            # Dígitos Unicode (p. ej. arábigos) se normalizan a ASCII solo para el cálculo;
+            # '²' o '①' pasan clean_digits pero no son decimales: longitud inválida, como validate_ean13
+            values = [unicodedata.decimal(ch, None) for ch in d]
+            if None in values:
+                continue
+            d = "".join(map(str, values))
+        idx.append(i)
+        codes.append(d)
+    if not idx:
+        return EanBatchResult(digits, status, expected)
+
+    np = _numpy()
+    if np is not None:
+        arr = np.frombuffer("".join(codes).encode("ascii"), dtype=np.uint8).reshape(-1, 13) - 48
+        totals = arr[:, :12].astype(np.int32) @ np.array(_EAN_WEIGHTS, dtype=np.int32)
+        exp = (10 - totals % 10) % 10
+        ok = exp == arr[:, 12]
+        exp_list = exp.tolist()
+        ok_list = ok.tolist()
+    else:
+        exp_list = [ean13_check_digit(c[:12]) for c in codes]
+        ok_list = [e == int(c[12]) for e, c in zip(exp_list, codes)]
+
+    for i, e, good in zip(idx, exp_list, ok_list):
+        expected[i] = e
+        status[i] = EAN_OK if good else EAN_BAD_CHECKSUM
+
+    return EanBatchResult(digits, status, expected)
+
+
+# ---- Motor nativo EAN-13 ----
+
+# Tablas de módulos por dígito (1 = barra, 0 = espacio)
+_EAN_L = ("0001101", "0011001", "0010011", "0111101", "0100011",
+          "0110001", "0101111", "0111011", "0110111", "0001011")
+_EAN_G = ("0100111", "0110011", "0011011", "0100001", "0011101",
+          "0111001", "0000101", "0010001", "0001001", "0010111")
+_EAN_R = ("1110010", "1100110", "1101100", "1000010", "1011100",
+          "1001110", "1010000", "1000100", "1001000", "1110100")
+# Paridad L/G de los 6 dígitos izquierdos según el primer dígito
+_EAN_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+               "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")
+
+_EAN_EDGE = b"\xff\x00\xff"
+_EAN_MIDDLE = b"\x00\xff\x00\xff\x00"
+
+# 3 + 6x7 + 5 + 6x7 + 3: también el ancho mínimo en px del motor nativo
+EAN13_MODULES = 95
+
+
+def _module_bytes(pattern: str) -> bytes:
+    return bytes(255 if ch == "1" else 0 for ch in pattern)
+
+
+# Precalculadas como máscara de 8 bits (255 = tinta) para pegarlas directo con Pillow
+_EAN_TABLES = {
+    "L": tuple(_module_bytes(p) for p in _EAN_L),
+    "G": tuple(_module_bytes(p) for p in _EAN_G),
+    "R": tuple(_module_bytes(p) for p in _EAN_R),
+}
+
+
+def ean13_modules(code13: str) -> bytes:
+    """
+    Devuelve los 95 módulos del EAN-13 como máscara (255 = barra, 0 = espacio).
+    """
+    if len(code13) != 13 or not code13.isdecimal():
+        raise ValueError(f"EAN-13 inválido: se esperaban 13 dígitos, llegó: '{code13}'")
+
+    parity = _EAN_PARITY[int(code13[0])]
+    parts = [_EAN_EDGE]
+    for table, digit in zip(parity, code13[1:7]):
+        parts.append(_EAN_TABLES[table][int(digit)])
+    parts.append(_EAN_MIDDLE)
+    for digit in code13[7:]:
+        parts.append(_EAN_TABLES["R"][int(digit)])
+    parts.append(_EAN_EDGE)
+    return b"".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _ean13_class():
+    from barcode import get_barcode_class
+
+    return get_barcode_class("ean13")
+
+
+_thread_state = threading.local()
+
+
+def _image_writer():
+    # ImageWriter guarda la imagen en curso en sí mismo: uno por hilo, reutilizado entre códigos
+    writer = getattr(_thread_state, "image_writer", None)
+    if writer is None:
+        from barcode.writer import ImageWriter
+
+        writer = _thread_state.image_writer = ImageWriter()
+    return writer
+
+
+@lru_cache(maxsize=32)
+def _load_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    from PIL import ImageFont
+
+    return ImageFont.truetype(font_path, size)
+
+
+def render_ean13_native(
+    code13: str,
+    width: int,
+    height: int,
+    writer_options: dict,
+    *,
+    modules: Optional[bytes] = None,
+) -> Image.Image:
+    """
+    Dibuja el EAN-13 directamente en un lienzo de width x height con módulos
+    de ancho entero. Respeta las mismas opciones que ImageWriter (mm @ dpi).
+    `modules` permite reutilizar el patrón ya calculado para varios tamaños.
+    """
+    from PIL import Image, ImageDraw
+
+    if modules is None:
+        modules = ean13_modules(code13)
+
+    dpi = writer_options.get("dpi", 300)
+
+    def mm2px(mm: float) -> float:
+        return mm * dpi / 25.4
+
+    module_px = mm2px(writer_options["module_width"])
+    quiet_px = mm2px(writer_options["quiet_zone"])
+    bars_px = mm2px(writer_options["module_height"])
+    margin_px = mm2px(1.0)  # margin_top / margin_bottom de python-barcode
+
+    write_text = bool(writer_options.get("write_text", True)) and writer_options.get("font_path")
+    font_px = 0.0
+    text_block_px = 0.0
+    if write_text:
+        font_px = mm2px(writer_options["font_size"] * 0.352777)  # pt -> mm
+        text_block_px = mm2px(writer_options["text_distance"]) + font_px / 2
+
+    ref_w = 2 * quiet_px + len(modules) * module_px
+    ref_h = 2 * margin_px + bars_px + text_block_px
+    scale = min(width / ref_w, height / ref_h)
+
+    # Ancho de módulo entero: barras nítidas sin remuestreo
+    mw = max(1, int(module_px * scale))
+    bars_w = len(modules) * mw
+    if bars_w > width:
+        raise ValueError(f"Ancho insuficiente para EAN-13: se requieren al menos {len(modules)} px")
+    qz = min(int(round(quiet_px * scale)), (width - bars_w) // 2)
+
+    margin = int(round(margin_px * scale))
+    bar_h = max(1, int(round(bars_px * scale)))
+    text_dist = int(round(mm2px(writer_options.get("text_distance", 0)) * scale)) if write_text else 0
+    font_size = int(font_px * scale) if write_text else 0
+    text_h = (text_dist + font_size // 2) if write_text else 0
+
+    content_w = bars_w + 2 * qz
+    content_h = min(height, 2 * margin + bar_h + text_h)
+    x0 = (width - content_w) // 2 + qz
+    y0 = (height - content_h) // 2 + margin
+
+    canvas = Image.new("RGB", (width, height), writer_options.get("background", "white"))
+    foreground = writer_options.get("foreground", "black")
+
+    mask = Image.frombytes("L", (len(modules), 1), modules)
+    mask = mask.resize((bars_w, bar_h), Image.Resampling.NEAREST)
+    canvas.paste(foreground, (x0, y0, x0 + bars_w, y0 + bar_h), mask)
+
+    if write_text and font_size > 0:
+        font = _load_font(str(writer_options["font_path"]), font_size)
+        draw = ImageDraw.Draw(canvas)
+        draw.text(
+            (x0 + bars_w // 2, y0 + bar_h + text_dist),
+            code13,
+            font=font,
+            fill=foreground,
+            anchor="md",
+        )
+
+    return canvas
+
+
+def check_output(spec: OutputSpec, engine: str = DEFAULT_ENGINE) -> None:
+    """
+    ValueError si el render rechazaría esta salida con este motor, para
+    reportarlo al pedirla y no como error de render en cada fila.
+    """
+    # El motor nativo dibuja módulos de al menos 1 px; python-barcode y SVG/PDF escalan
+    if engine == "native" and spec.format not in VECTOR_FORMATS and spec.width < EAN13_MODULES:
+        raise ValueError(f"Ancho insuficiente para EAN-13: se requieren al menos {EAN13_MODULES} px, llegó: {spec.width}")
+
+
+def _fit_to_canvas(im: Image.Image, width: int, height: int) -> Image.Image:
+    from PIL import Image
+
+    im = im.convert("RGB")
+    im.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+    canvas = Image.new("RGB", (width, height), "white")
+    x = (width - im.size[0]) // 2
+    y = (height - im.size[1]) // 2
+    canvas.paste(im, (x, y))
+    return canvas
+
+
 def resize_and_pad_to_exact(src_png: Path, dst_png: Path, width: int, height: int) -> None:
+    from PIL import Image
+
     with Image.open(src_png) as im:
-        im = im.convert("RGB")
-        im.thumbnail((width, height), Image.Resampling.LANCZOS)
+        canvas = _fit_to_canvas(im, width, height)
+        canvas.save(dst_png, format="PNG", optimize=True)
 
-        canvas = Image.new("RGB", (width, height), "white")
-        x = (width - im.size[0]) // 2
-        y = (height - im.size[1]) // 2
-        canvas.paste(im, (x, y))
 
-        canvas.save(dst_png, format="PNG", optimize=True)
+# Sniffing acotado: nunca se lee más que este prefijo del CSV
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = (",", "|", ";", "\t")
+
+
+def _read_prefix(csv_path: Path) -> bytes:
+    with Path(csv_path).open("rb") as fb:
+        return fb.read(SNIFF_BYTES)
+
+
+def detect_encoding(csv_path: Path) -> str:
+    """
+    Detecta el encoding con el prefijo del archivo: UTF-8 (con o sin BOM de
+    Excel) si decodifica limpio; si no, cp1252 (CSV de Excel "ANSI" en Windows).
+    """
+    return detect_encoding_bytes(_read_prefix(csv_path))
+
+
+def detect_encoding_bytes(raw: bytes) -> str:
+    """
+    detect_encoding sobre bytes ya leídos (p. ej. el cuerpo de una solicitud).
+    """
+    if raw.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: un carácter cortado al final del prefijo no es error
+        codecs.getincrementaldecoder("utf-8")().decode(raw, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def _sample_lines(csv_path: Path, encoding: str) -> List[str]:
+    raw = _read_prefix(csv_path)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(raw, final=False)
+    lines = text.splitlines()
+    if len(raw) == SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # última línea posiblemente incompleta
+    return lines
 
 
 def detect_delimiter(csv_path: Path, *, encoding: str) -> str:
-    sample = csv_path.read_text(encoding=encoding, errors="ignore")[:2048]
-    return "|" if sample.count("|") > sample.count(",") else ","
+    """
+    Elige el delimitador que mejor separa el encabezado en las columnas
+    requeridas; si ninguno las encuentra, el más frecuente en el encabezado.
+    """
+    return detect_delimiter_lines(_sample_lines(csv_path, encoding))
 
 
-def generate_barcodes_from_csv(
-    csv_path: Path,
-    outdir: Path,
-    *,
-    delimiter: Optional[str] = None,
-    encoding: str = "utf-8-sig",
-    width: int = 450,
-    height: int = 300,
-    no_text: bool = False,
-    overwrite: bool = False,
-) -> RunResult:
-    csv_path = Path(csv_path)
-    outdir = Path(outdir)
-    outdir.mkdir(parents=True, exist_ok=True)
+def detect_delimiter_lines(lines: List[str]) -> str:
+    """
+    detect_delimiter sobre las primeras líneas ya decodificadas (encabezado primero).
+    """
+    header = lines[0] if lines else ""
 
-    barcodes_dir = outdir / "barcodes"
-    logs_dir = outdir / "logs"
+    best, best_hits = None, 0
+    for d in DELIMITERS:
+        cols = next(csv.reader([header], delimiter=d), [])
+        hits = sum(1 for c in cols if c.strip() in REQUIRED_COLS)
+        if hits > best_hits:
+            best, best_hits = d, hits
+    if best is not None:
+        return best
 
-    barcodes_dir.mkdir(parents=True, exist_ok=True)
-    logs_dir.mkdir(parents=True, exist_ok=True)
+    sample = "\n".join(lines)
+    counts = {d: header.count(d) or sample.count(d) for d in DELIMITERS}
+    top = max(DELIMITERS, key=lambda d: counts[d])
+    return top if counts[top] else ","
 
+
+def resolve_encoding(csv_path: Path, encoding: Optional[str]) -> str:
+    if encoding is None or encoding == "auto":
+        return detect_encoding(csv_path)
+    return encoding
+
+
+def build_writer_options(*, no_text: bool = False) -> dict:
     font_file = resource_path("resources", "fonts", "DejaVuSans.ttf")
 
     writer_options = {
@@ -160,17 +694,679 @@ def generate_barcodes_from_csv(
 
     # Solo si queremos texto
     if not no_text:
-        writer_options["font_path"] = str(font_file)                    
+        writer_options["font_path"] = str(font_file)
+
+    return writer_options
+
+
+def engine_version(engine: str) -> str:
+    import PIL
+
+    if engine == "native":
+        return f"native {NATIVE_ENGINE_VERSION} / Pillow {PIL.__version__}"
+    import barcode
+
+    return f"python-barcode {barcode.version} / Pillow {PIL.__version__}"
+
+
+@dataclass(frozen=True)
+class _RenderContext:
+    width: int
+    height: int
+    writer_options: dict
+    engine: str
+    png: PngProfile = PngProfile()
+    format: str = "png"
+    options_token: str = ""
+
+
+def _make_options_token(ctx: _RenderContext) -> str:
+    # Todo lo que cambia los bytes de salida, excepto el EAN (se agrega por fila)
+    options = {k: v for k, v in ctx.writer_options.items() if k != "font_path"}
+    if "font_path" in ctx.writer_options:
+        options["font"] = Path(ctx.writer_options["font_path"]).name
+    token = {
+        "width": ctx.width,
+        "height": ctx.height,
+        "no_text": not ctx.writer_options.get("write_text", True),
+        "writer_options": options,
+        "engine": engine_version(ctx.engine),
+    }
+    # Solo si no es el default: así la caché y los manifiestos previos siguen valiendo
+    if ctx.png != PngProfile():
+        token["png"] = [ctx.png.mode, ctx.png.compress_level, ctx.png.optimize]
+    if ctx.format != "png":
+        token["format"] = ctx.format
+    if ctx.format in VECTOR_FORMATS:
+        token["engine"] = f"vector {VECTOR_ENGINE_VERSION}"
+    return json.dumps(token, sort_keys=True)
+
+
+def _make_contexts(specs: Sequence[OutputSpec], engine: str) -> List[_RenderContext]:
+    ctxs: List[_RenderContext] = []
+    for spec in specs:
+        ctx = _RenderContext(
+            width=spec.width,
+            height=spec.height,
+            writer_options=build_writer_options(no_text=spec.no_text),
+            engine=engine,
+            png=spec.png,
+            format=spec.format,
+        )
+        ctxs.append(replace(ctx, options_token=_make_options_token(ctx)))
+    return ctxs
+
+
+def render_cache_key(code13: str, ctx: _RenderContext) -> str:
+    return hashlib.sha256(f"{code13}|{ctx.options_token}".encode("utf-8")).hexdigest()
+
+
+def _options_id(ctxs: Sequence[_RenderContext]) -> str:
+    # Con una sola salida coincide con el id de versiones anteriores del manifiesto
+    token = "\n".join(ctx.options_token for ctx in ctxs)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def _file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+# ---- Manifiesto de salida (logs/manifest.csv) ----
+
+MANIFEST_COLS = ["line_no", "Clave", "n", "EAN-13", "opciones", "archivo", "sha256"]
+# Con varias salidas por fila, "archivo" y "sha256" listan una por salida ("|" no
+# puede aparecer en un nombre: sanitize_filename lo quita)
+MANIFEST_SEP = "|"
+
+
+@dataclass
+class ManifestEntry:
+    line_no: int
+    clave: str
+    n: int  # ocurrencia de la Clave dentro del CSV (1, 2...)
+    ean13: str
+    options: str
+    file: str  # relativo a outdir
+    sha256: str
+
+    def row(self) -> list:
+        return [self.line_no, self.clave, self.n, self.ean13, self.options, self.file, self.sha256]
+
+    @property
+    def files(self) -> List[str]:
+        return self.file.split(MANIFEST_SEP)
+
+    @property
+    def sha256s(self) -> List[str]:
+        return self.sha256.split(MANIFEST_SEP)
+
+
+def load_manifest(path: Path) -> dict[tuple[str, int], ManifestEntry]:
+    """
+    Lee el manifiesto; si una (Clave, ocurrencia) aparece varias veces gana la última.
+    """
+    entries: dict[tuple[str, int], ManifestEntry] = {}
+    if not path.exists():
+        return entries
+
+    with path.open("r", encoding="utf-8", newline="") as mf:
+        for row in csv.DictReader(mf):
+            try:
+                entry = ManifestEntry(
+                    line_no=int(row["line_no"]),
+                    clave=row["Clave"],
+                    n=int(row["n"]),
+                    ean13=row["EAN-13"],
+                    options=row["opciones"],
+                    file=row["archivo"],
+                    sha256=row["sha256"],
+                )
+            except (KeyError, TypeError, ValueError):
+                # Renglón truncado por un corte a media escritura
+                continue
+            entries[(entry.clave, entry.n)] = entry
+    return entries
+
+
+def _write_manifest(path: Path, entries: Iterable[ManifestEntry]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as mf:
+        w = csv.writer(mf)
+        w.writerow(MANIFEST_COLS)
+        for entry in sorted(entries, key=lambda e: e.line_no):
+            w.writerow(entry.row())
+    os.replace(tmp, path)
+
+
+def _output_is_valid(path: Path, sha256: str) -> bool:
+    try:
+        return path.is_file() and _file_sha256(path) == sha256
+    except OSError:
+        return False
+
+
+def _encode_png(image: Image.Image, profile: PngProfile = PngProfile()) -> bytes:
+    from PIL import Image
+
+    if profile.mode == "gray":
+        image = image.convert("L")
+    elif profile.mode in ("1bit", "palette"):
+        # Sin tramado: las barras ya son blanco/negro puro, solo el texto tiene grises
+        image = image.convert("1", dither=Image.Dither.NONE)
+        if profile.mode == "palette":
+            # Índices 0/1 con paleta de 2 colores; cuantizar (ADAPTIVE) sería mucho más lento
+            image = image.convert("L").point([0] * 128 + [1] * 128).convert("P")
+            image.putpalette([0, 0, 0, 255, 255, 255])
+    else:
+        image = image.convert("RGB")
+
+    buf = io.BytesIO()
+    image.save(buf, format="PNG", compress_level=profile.compress_level, optimize=profile.optimize)
+    return buf.getvalue()
+
+
+def _encode_image(image: Image.Image, ctx: _RenderContext) -> bytes:
+    if ctx.format == "png":
+        return _encode_png(image, ctx.png)
+
+    buf = io.BytesIO()
+    if ctx.format == "jpeg":
+        image.convert("RGB").save(buf, format="JPEG", quality=90, optimize=True)
+    else:
+        # Sin pérdida: las barras no toleran artefactos de compresión
+        image.convert("RGB").save(buf, format="WEBP", lossless=True)
+    return buf.getvalue()
+
+
+def _rasterize(code13: str, ctxs: Sequence[_RenderContext]) -> list:
+    """
+    Primera mitad de render_outputs: una imagen (o bytes ya finales, para SVG/PDF) por salida.
+    """
+    modules = ean13_modules(code13)
+    sources: dict[bool, Image.Image] = {}
+    images: dict[tuple[int, int, bool], Image.Image] = {}
+    items: list = []
+
+    for ctx in ctxs:
+        # SVG/PDF: geometría exacta directo del patrón, sin imagen intermedia
+        if ctx.format == "svg":
+            items.append(render_ean13_svg(code13, modules, ctx.width, ctx.height, ctx.writer_options))
+            continue
+        if ctx.format == "pdf":
+            items.append(render_ean13_pdf(code13, modules, ctx.width, ctx.height, ctx.writer_options))
+            continue
+
+        text = bool(ctx.writer_options.get("write_text", True))
+        key = (ctx.width, ctx.height, text)
+        if key not in images:
+            if ctx.engine == "native":
+                images[key] = render_ean13_native(code13, ctx.width, ctx.height, ctx.writer_options, modules=modules)
+            else:
+                if text not in sources:
+                    barcode_obj = _ean13_class()(code13[:12], writer=_image_writer())
+                    sources[text] = barcode_obj.render(ctx.writer_options)
+                images[key] = _fit_to_canvas(sources[text], ctx.width, ctx.height)
+        items.append(images[key])
+    return items
+
+
+def _encode_items(items: list, ctxs: Sequence[_RenderContext]) -> List[bytes]:
+    return [item if isinstance(item, bytes) else _encode_image(item, ctx) for item, ctx in zip(items, ctxs)]
+
+
+def render_outputs(code13: str, ctxs: Sequence[_RenderContext]) -> List[bytes]:
+    """
+    Rinde un EAN-13 ya validado una sola vez y deriva cada salida pedida.
+
+    Con el motor nativo el patrón de módulos se calcula una vez y se dibuja a
+    cada tamaño con módulos enteros (nítido); con python-barcode se rinde una
+    vez por variante de texto y se ajusta a cada tamaño. SVG/PDF se generan
+    directo del patrón (ver vector.py), sin importar el motor. Salidas con el mismo
+    tamaño y texto comparten la imagen y solo difieren en la codificación.
+    """
+    return _encode_items(_rasterize(code13, ctxs), ctxs)
+
+
+# Los trabajos devuelven (salidas, error, ns de render, ns de codificación): los
+# tiempos se miden donde corre el trabajo (también dentro de los procesos)
+_Job = tuple  # (Optional[list], Optional[str], int, int)
+
+
+def _render_job(code13: str, ctxs: Sequence[_RenderContext]) -> _Job:
+    t0 = time.perf_counter_ns()
+    try:
+        items = _rasterize(code13, ctxs)
+    except Exception as e:
+        return None, str(e), time.perf_counter_ns() - t0, 0
+    t1 = time.perf_counter_ns()
+    try:
+        datas = _encode_items(items, ctxs)
+    except Exception as e:
+        return None, str(e), t1 - t0, time.perf_counter_ns() - t1
+    return datas, None, t1 - t0, time.perf_counter_ns() - t1
+
+
+def _rasterize_job(code13: str, ctxs: Sequence[_RenderContext]) -> _Job:
+    t0 = time.perf_counter_ns()
+    try:
+        return _rasterize(code13, ctxs), None, time.perf_counter_ns() - t0, 0
+    except Exception as e:
+        return None, str(e), time.perf_counter_ns() - t0, 0
+
+
+def _encode_job(job: _Job, ctxs: Sequence[_RenderContext]) -> _Job:
+    items, error, raster_ns, _ = job
+    if items is None:
+        return job
+    t0 = time.perf_counter_ns()
+    try:
+        return _encode_items(items, ctxs), None, raster_ns, time.perf_counter_ns() - t0
+    except Exception as e:
+        return None, str(e), raster_ns, time.perf_counter_ns() - t0
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """
+    None o 1 = serial; 0 = todos los núcleos; N = N procesos.
+    """
+    if workers is None:
+        return 1
+    if workers < 0:
+        raise ValueError(f"workers debe ser >= 0, llegó: {workers}")
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
 
-    EAN13 = get_barcode_class("ean13")
 
+def _render_codes(
+    codes: List[str],
+    ctxs: Sequence[_RenderContext],
+    pool: Optional[ProcessPoolExecutor],
+    job: Callable[..., _Job] = _render_job,
+) -> List[_Job]:
+    # job=_rasterize_job devuelve las imágenes sin codificar (destinos que las componen)
+    if pool is None or len(codes) <= 1:
+        return [job(code, ctxs) for code in codes]
+
+    workers = pool._max_workers  # type: ignore[attr-defined]
+    chunksize = max(1, min(256, len(codes) // (workers * 4)))
+    return list(pool.map(partial(job, ctxs=ctxs), codes, chunksize=chunksize))
+
+
+# EAN válido con el que se precalienta (Pillow, fuente, procesos) antes del primer render real
+_WARMUP_EAN = "4006381333931"
+
+
+@dataclass
+class RenderedCode:
+    ean13: str  # tal como llegó
+    clave: str
+    datas: Optional[List[bytes]]  # una por salida, en el orden de `outputs`; None si hubo error
+    message: str = ""
+    category: str = ""
+
+    @property
+    def data(self) -> Optional[bytes]:
+        return self.datas[0] if self.datas else None
+
+
+class BarcodeSession:
+    """
+    Preparación de render hecha una sola vez: opciones del writer, ruta de la
+    fuente, versión del motor y token de caché por salida. Pensada para quien
+    rinde muchos lotes chicos; generate_barcodes_from_csv arma una por corrida
+    o usa la que recibe en `session=`.
+
+    Se puede compartir entre hilos: solo guarda configuración inmutable, las
+    fuentes quedan en un caché del proceso y python-barcode usa un ImageWriter
+    por hilo.
+    """
+
+    def __init__(
+        self,
+        outputs: Optional[Sequence[OutputSpec]] = None,
+        *,
+        width: int = 450,
+        height: int = 300,
+        no_text: bool = False,
+        engine: str = DEFAULT_ENGINE,
+        png: PngProfile = PngProfile(),
+        format: str = "png",
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de render desconocido: {engine!r} (opciones: {', '.join(ENGINES)})")
+        self.engine = engine
+        self.specs: List[OutputSpec] = list(outputs) if outputs else [
+            OutputSpec(width=width, height=height, no_text=no_text, format=format, png=png)
+        ]
+        self.contexts = _make_contexts(self.specs, engine)
+        self.options_id = _options_id(self.contexts)
+
+    def warm_up(self, pool: Optional[ProcessPoolExecutor] = None) -> None:
+        """
+        Rinde un código de prueba (una vez por proceso de `pool`): el primer
+        render real no paga la importación de Pillow ni la carga de la fuente.
+        """
+        n = pool._max_workers if pool is not None else 1  # type: ignore[attr-defined]
+        self.render_jobs([_WARMUP_EAN] * n, pool)
+
+    def render_jobs(self, codes: Sequence[str], pool: Optional[ProcessPoolExecutor] = None) -> List[_Job]:
+        """
+        (salidas, error, ns de render, ns de codificación) por código ya
+        validado, en el mismo orden; con `pool` se reparten entre procesos.
+        """
+        return _render_codes(list(codes), self.contexts, pool)
+
+    def render(self, ean: str, clave: str = "") -> bytes:
+        """
+        Valida y rinde un EAN-13; devuelve la primera salida. ValueError con el
+        mismo mensaje que en errors.csv si el código no es válido.
+        """
+        result, = self.render_many([(ean, clave)])
+        if result.datas is None:
+            raise ValueError(f"{clave}: {result.message}" if clave else result.message)
+        return result.datas[0]
+
+    def render_many(
+        self,
+        rows: Iterable[str | tuple[str, str]],
+        *,
+        pool: Optional[ProcessPoolExecutor] = None,
+    ) -> List[RenderedCode]:
+        """
+        Valida y rinde filas (EAN-13, Clave) o EAN sueltos, en el mismo orden.
+        Los errores quedan en cada resultado en vez de interrumpir el lote y
+        los códigos repetidos se rinden una sola vez.
+        """
+        rows = [(row, "") if isinstance(row, str) else (str(row[0]), str(row[1])) for row in rows]
+        checked = validate_ean13_batch(ean for ean, _ in rows)
+        codes = list(dict.fromkeys(checked.digits[i] for i in range(len(rows)) if checked.status[i] == EAN_OK))
+        jobs = dict(zip(codes, self.render_jobs(codes, pool)))
+
+        results: List[RenderedCode] = []
+        for i, (ean, clave) in enumerate(rows):
+            if checked.status[i] != EAN_OK:
+                message = checked.message(i)
+                results.append(RenderedCode(ean, clave, None, message, error_category(message)))
+                continue
+            datas, error, _, _ = jobs[checked.digits[i]]
+            if datas is None:
+                results.append(RenderedCode(ean, clave, None, error or "", "Render"))
+            else:
+                results.append(RenderedCode(ean, clave, datas))
+        return results
+
+
+@dataclass
+class _PlannedRow:
+    line_no: int
+    clave: str
+    ean13: str
+    n: int
+    digits: str
+    out_path: Path  # salida principal (la primera OutputSpec)
+    cache_keys: List[str] = field(default_factory=list)
+    cache_paths: Optional[List[Path]] = None  # solo si todas las salidas están en caché
+
+
+@dataclass
+class _Batch:
+    """
+    Un lote de filas en su paso por las etapas plan -> render -> codificar -> escribir.
+    """
+
+    rows: List[tuple[int, dict]]
+    bytes_read: int  # posición en el CSV al leer el lote (para el progreso)
+    ready: List[RowResult] = field(default_factory=list)
+    planned: List[_PlannedRow] = field(default_factory=list)
+    to_render: dict[str, int] = field(default_factory=dict)  # EAN -> índice; cada EAN se rinde una vez por lote
+    rendered: list = field(default_factory=list)
+    encoded: bool = False
+    kept: List[ManifestEntry] = field(default_factory=list)  # filas sin cambios (resume)
+
+
+# ---- Registro de errores en disco ----
+
+def error_category(message: str) -> str:
+    if message.startswith("EAN-13 inválido"):
+        return "EAN inválido"
+    if message.startswith("Checksum incorrecto"):
+        return "Checksum"
+    return "Otro"
+
+
+class _ErrorSink:
+    """
+    Escribe cada error en errors.csv y en el log en cuanto ocurre. En memoria
+    solo guarda los primeros `max_in_memory` y un conteo por categoría.
+    """
+
+    def __init__(self, errors_csv: Path, log: TextIO, max_in_memory: Optional[int]) -> None:
+        self.errors_csv = errors_csv
+        self.log = log
+        self.max_in_memory = max_in_memory
+        self.errors: List[RowError] = []
+        self.count = 0
+        self.summary: dict[str, int] = {}
+        self._file: Optional[TextIO] = None
+        self._writer = None
+
+        # Un errors.csv de una corrida anterior no debe sobrevivir
+        if errors_csv.exists():
+            try:
+                errors_csv.unlink()
+            except Exception:
+                pass
+
+    def add(self, e: RowError) -> None:
+        if self._file is None:
+            self._file = self.errors_csv.open("w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(ERRORS_CSV_COLS)
+            self.log.write("Errores (line_no | Clave | EAN-13 | motivo):\n")
+
+        self._writer.writerow([e.line_no, e.clave, e.ean13, e.message])
+        self.log.write(f"{e.line_no} | {e.clave} | {e.ean13} | {e.message}\n")
+
+        self.count += 1
+        self.summary[e.category] = self.summary.get(e.category, 0) + 1
+        if self.max_in_memory is None or len(self.errors) < self.max_in_memory:
+            self.errors.append(e)
+
+    def flush(self) -> None:
+        self.log.flush()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ---- API por filas (streaming) ----
+
+@dataclass
+class RowResult:
+    line_no: int
+    clave: str
+    ean13: str
+    status: str  # "generated" | "skipped" | "error"
+    path: Optional[Path] = None
+    message: str = ""
+    cache_hit: Optional[bool] = None
+    category: str = ""
+
+
+@dataclass
+class Progress:
+    rows: int
+    generated: int
+    skipped: int
+    errors: int
+    bytes_read: int
+    total_bytes: int
+
+    @property
+    def fraction(self) -> float:
+        if self.total_bytes <= 0:
+            return 0.0
+        return min(1.0, self.bytes_read / self.total_bytes)
+
+
+class CancelToken:
+    """
+    Señal de cancelación compartible entre hilos (p. ej. GUI -> hilo de trabajo).
+    La corrida se detiene al terminar el lote en curso.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+def _batch_size(workers: int, *, pipeline: bool = False) -> int:
+    # Lotes chicos en serie (progreso/cancelación ágiles), grandes con procesos.
+    # En pipeline sin procesos las imágenes sin codificar esperan en cola: lotes más chicos
+    if workers > 1:
+        return 128 * workers
+    return 16 if pipeline else 64
+
+
+def iter_generate(
+    csv_path: Path,
+    outdir: Path,
+    *,
+    delimiter: Optional[str] = None,
+    encoding: Optional[str] = "auto",
+    width: int = 450,
+    height: int = 300,
+    no_text: bool = False,
+    overwrite: bool = False,
+    engine: str = DEFAULT_ENGINE,
+    workers: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    resume: bool = False,
+    max_errors: Optional[int] = DEFAULT_MAX_ERRORS,
+    png: PngProfile = PngProfile(),
+    format: str = "png",
+    outputs: Optional[Sequence[OutputSpec]] = None,
+    sink: Optional[OutputSink] = None,
+    pipeline: bool = False,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    pool: Optional[ProcessPoolExecutor] = None,
+    shard: Optional[Shard] = None,
+    session: Optional[BarcodeSession] = None,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Generator[RowResult, None, RunResult]:
+    """
+    Igual que generate_barcodes_from_csv, pero produce un RowResult por fila
+    (en orden del CSV) conforme se procesa. Al agotarse, el RunResult final
+    es el valor de retorno del generador (StopIteration.value).
+
+    `outputs` pide varias salidas por fila (tamaño, formato, subcarpeta, texto)
+    con un solo render; sin él se usa width/height/no_text/png/format.
+    `sink` decide dónde van las imágenes (default: DirectorySink en
+    outdir/barcodes). Un sink recibido no se cierra aquí.
+    Con `pipeline=True` lectura/plan, render, codificación y escritura corren en
+    hilos separados unidos por colas de `queue_depth` lotes.
+    `pool` reutiliza procesos de render ya abiertos (p. ej. entre trabajos del
+    modo vigilancia) en vez de crear `workers` nuevos; no se cierra aquí.
+    Con `shard` (p. ej. Shard(3, 8)) solo se procesa ese tramo del CSV, con
+    los line_no de la corrida completa, y se deja logs/shard.json para
+    merge_shards.
+    `session` reutiliza una BarcodeSession ya armada; sus salidas y motor
+    reemplazan width/height/no_text/png/format/outputs/engine.
+    """
+    if session is None:
+        session = BarcodeSession(
+            outputs, width=width, height=height, no_text=no_text, engine=engine, png=png, format=format,
+        )
+    specs, ctxs = session.specs, session.contexts
+
+    csv_path = Path(csv_path)
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    logs_dir = outdir / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    own_sink = sink is None
+    if sink is None:
+        sink = DirectorySink(outdir / "barcodes")
+    if resume and sink.directory is None:
+        raise ValueError("resume solo es compatible con salida a carpeta")
+    # Sin carpeta real (ZIP/TAR/memoria) los nombres siempre se desambiguan con _2, _3...
+    barcodes_dir = sink.directory or outdir / "barcodes"
+    overwrite = overwrite and sink.directory is not None
+
+    # Un destino que compone hojas recibe las imágenes tal cual: codificar cada
+    # etiqueta a PNG solo para decodificarla al pegarla era la mayor parte del tiempo
+    raw_images = sink.accepts_images and all(ctx.format not in VECTOR_FORMATS for ctx in ctxs)
+
+    # Sin bytes codificados no hay qué guardar en la caché
+    use_cache = cache_dir is not None and not raw_images
+    cache = RenderCache(Path(cache_dir), max_bytes=cache_max_bytes) if use_cache else None
+    options_id = session.options_id
+    n_workers = pool._max_workers if pool is not None else resolve_workers(workers)  # type: ignore[attr-defined]
+
+    # Detectados con un prefijo acotado; se reportan en RunResult para que
+    # corridas repetidas puedan pasarlos explícitos y saltarse la detección
+    encoding = resolve_encoding(csv_path, encoding)
     if delimiter is None:
         delimiter = detect_delimiter(csv_path, encoding=encoding)
 
+    part = shard_range(csv_path, shard) if shard is not None else None
+    total_bytes = part.size if part is not None else csv_path.stat().st_size
+    rows_done = 0
     generated = 0
-    errors: List[RowError] = []
+    skipped = 0
+    cache_hits = 0
+    cache_misses = 0
+    bytes_written = 0
+    cancelled = False
+    started = time.perf_counter()
+    # Cada etapa se actualiza desde un solo hilo (también con pipeline)
+    timings = new_timings()
+
+    # Con resume se reutiliza lo ya escrito según el manifiesto anterior
+    manifest_path = logs_dir / "manifest.csv"
+    previous = load_manifest(manifest_path) if resume else {}
+    manifest: dict[int, ManifestEntry] = {}
+    occurrences: dict[str, int] = {}
 
-    with csv_path.open("r", encoding=encoding, newline="") as f:
+    # Los nombres se asignan en orden del CSV (serial), así los _2, _3... son
+    # idénticos sin importar cuántos procesos rindan. Un solo escaneo de la carpeta
+    # reemplaza los exists() por fila. Al reanudar se escanea igual (un PNG que
+    # no está en el manifiesto, de una corrida anterior o copiado a mano, no se
+    # pisa: la fila nueva toma _2) y además se reservan los archivos del manifiesto,
+    # que cada fila sin cambios conserva.
+    # Con varias salidas el nombre lo decide la principal; las demás usan el mismo stem
+    primary_dir = barcodes_dir / specs[0].subdir
+    names = NameIndex(primary_dir, suffix=specs[0].suffix, scan=sink.directory is not None)
+    for e in previous.values():
+        names.reserve(outdir / e.files[0])
+    used: Set[Path] = set()
+
+    run_log = logs_dir / "run_log.txt"
+    errors_csv = outdir / "errors.csv"
+
+    with ExitStack() as stack:
+        if part is not None:
+            # Encabezado + solo los bytes del fragmento
+            f = stack.enter_context(io.TextIOWrapper(
+                io.BufferedReader(ShardReader(csv_path, part)), encoding=encoding, newline="",
+            ))
+        else:
+            f = stack.enter_context(csv_path.open("r", encoding=encoding, newline=""))
         reader = csv.DictReader(f, delimiter=delimiter)
 
         missing = [c for c in REQUIRED_COLS if c not in (reader.fieldnames or [])]
@@ -179,63 +1375,733 @@ def generate_barcodes_from_csv(
                 f"Faltan columnas: {missing}\nColumnas encontradas: {reader.fieldnames}"
             )
 
-        for line_no, row in enumerate(reader, start=2):
-            clave_raw = row.get("Clave", "")
-            ean13_raw = row.get("EAN-13", "")
+        # ---- Log de ejecución: encabezado, errores conforme ocurren y resumen al final ----
+        lf = stack.enter_context(run_log.open("w", encoding="utf-8"))
+        lf.write(f"CSV: {csv_path}\n")
+        lf.write(f"Salida: {outdir}\n")
+        lf.write(f"Delimitador: {delimiter!r}\n")
+        lf.write(f"Encoding: {encoding}\n")
+        lf.write(f"Motor: {session.engine}\n")
+        if part is not None:
+            last = f"-{part.first_line + part.rows - 1}" if part.rows else " (vacío)"
+            lf.write(f"Fragmento: {shard} (líneas {part.first_line}{last}, bytes {part.start}-{part.end})\n")
+        lf.write(f"Destino: {sink.describe()}\n\n")
+
+        errsink = _ErrorSink(errors_csv, lf, max_errors)
+        stack.callback(errsink.close)
+        if own_sink:
+            stack.callback(sink.close)
 
-            try:
-                clave = sanitize_filename(clave_raw)
-                ean13_digits = clean_digits(ean13_raw)
-                base12 = validate_ean13(ean13_digits)
+        # Cada fila escrita se agrega al manifiesto de inmediato para poder reanudar
+        mf = stack.enter_context(manifest_path.open("a" if resume else "w", encoding="utf-8", newline=""))
+        mw = csv.writer(mf)
+        if not resume or mf.tell() == 0:
+            mw.writerow(MANIFEST_COLS)
+
+        if pool is None and n_workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=n_workers))
+
+        rows = enumerate(reader, start=part.first_line if part is not None else 2)
+        batch_size = _batch_size(n_workers, pipeline=pipeline)
+
+        def read_batches() -> Iterator[_Batch]:
+            nonlocal cancelled
+            while True:
+                if cancel is not None and cancel.cancelled:
+                    cancelled = True
+                    return
+                t0 = time.perf_counter_ns()
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    return
+                timings["lectura"].add(time.perf_counter_ns() - t0, len(batch))
+                yield _Batch(batch, f.buffer.tell())
+
+        def plan_batch(b: _Batch) -> _Batch:
+            # Serial: validar, reservar nombres y consultar la caché
+            t0 = time.perf_counter_ns()
+            checked = validate_ean13_batch(row.get("EAN-13", "") for _, row in b.rows)
+
+            for i, (line_no, row) in enumerate(b.rows):
+                clave_raw = row.get("Clave", "")
+                ean13_raw = row.get("EAN-13", "")
+
+                try:
+                    clave = sanitize_filename(clave_raw)
+                    ean13_digits = checked.digits[i]
+                    if checked.status[i] != EAN_OK:
+                        raise ValueError(checked.message(i))
+
+                    n = occurrences.get(str(clave_raw), 0) + 1
+                    occurrences[str(clave_raw)] = n
+                    prev = previous.get((str(clave_raw), n))
+
+                    if prev is not None and (outdir / prev.files[0]) not in used:
+                        prev_path = outdir / prev.files[0]
+                        used.add(prev_path)
+                        if (
+                            prev.ean13 == ean13_digits
+                            and prev.options == options_id
+                            and all(
+                                _output_is_valid(outdir / file, sha)
+                                for file, sha in zip(prev.files, prev.sha256s)
+                            )
+                        ):
+                            # Sin cambios: se conservan los archivos existentes
+                            b.kept.append(replace(prev, line_no=line_no))
+                            b.ready.append(RowResult(line_no, str(clave_raw), str(ean13_raw), "skipped", path=prev_path))
+                            continue
+                        # Fila cambiada: se vuelve a rendir en los mismos archivos
+                        out_path = prev_path
+                    elif overwrite:
+                        out_path = primary_dir / f"{clave}{specs[0].suffix}"
+                        names.reserve(out_path)
+                    else:
+                        out_path = names.allocate(clave)
+                    used.add(out_path)
 
-                out_path = barcodes_dir / f"{clave}.png"
-                if out_path.exists() and not overwrite:
-                    out_path = unique_path(out_path)
+                    plan = _PlannedRow(line_no, str(clave_raw), str(ean13_raw), n, ean13_digits, out_path)
+                    if cache is not None:
+                        plan.cache_keys = [render_cache_key(ean13_digits, ctx) for ctx in ctxs]
+                        paths = [cache.lookup(key, OUTPUT_FORMATS[ctx.format]) for key, ctx in zip(plan.cache_keys, ctxs)]
+                        if all(path is not None for path in paths):
+                            plan.cache_paths = paths
+                    if plan.cache_paths is None and ean13_digits not in b.to_render:
+                        b.to_render[ean13_digits] = len(b.to_render)
+                    b.planned.append(plan)
 
-                barcode_obj = EAN13(base12, writer=ImageWriter())
+                except Exception as e:
+                    b.ready.append(RowResult(
+                        line_no, str(clave_raw), str(ean13_raw), "error",
+                        message=str(e), category=error_category(str(e)),
+                    ))
+            timings["validación"].add(time.perf_counter_ns() - t0, len(b.rows))
+            return b
 
-                tmp_base = barcodes_dir / f"__tmp__{ean13_digits}"
-                barcode_obj.save(str(tmp_base), options=writer_options)
-                tmp_png = Path(str(tmp_base) + ".png")
+        def render_batch(b: _Batch) -> _Batch:
+            if raw_images:
+                b.rendered = _render_codes(list(b.to_render), ctxs, pool, job=_rasterize_job)
+                b.encoded = True  # no hay etapa de codificación
+                for _, _, raster_ns, _ in b.rendered:
+                    timings["render"].add(raster_ns)
+            # Con procesos (o sin pipeline) cada trabajo rinde y codifica de una vez
+            elif pool is not None or not pipeline:
+                b.rendered = session.render_jobs(list(b.to_render), pool)
+                b.encoded = True
+                for _, _, raster_ns, encode_ns in b.rendered:
+                    timings["render"].add(raster_ns)
+                    timings["codificación"].add(encode_ns)
+            else:
+                b.rendered = [_rasterize_job(code, ctxs) for code in b.to_render]
+                for _, _, raster_ns, _ in b.rendered:
+                    timings["render"].add(raster_ns)
+            return b
 
-                resize_and_pad_to_exact(tmp_png, out_path, width, height)
+        def encode_batch(b: _Batch) -> _Batch:
+            if not b.encoded:
+                b.rendered = [_encode_job(job, ctxs) for job in b.rendered]
+                b.encoded = True
+                for _, _, _, encode_ns in b.rendered:
+                    timings["codificación"].add(encode_ns)
+            return b
 
+        def write_batch(b: _Batch) -> _Batch:
+            # Un solo escritor, en orden del CSV (con overwrite gana la última fila)
+            nonlocal bytes_written
+            for entry in b.kept:
+                manifest[entry.line_no] = entry
+
+            written: Set[str] = set()
+            for plan in b.planned:
+                t0 = time.perf_counter_ns()
+                names_out = [spec.name_for(plan.out_path.stem) for spec in specs]
+                hit: Optional[bool] = None
                 try:
-                    tmp_png.unlink(missing_ok=True)
-                except Exception:
-                    pass
+                    datas: Optional[List[bytes]] = None
+                    if plan.cache_paths is not None:
+                        try:
+                            datas = [path.read_bytes() for path in plan.cache_paths]
+                        except FileNotFoundError:
+                            datas = None  # desalojada entre la consulta y el uso
+                        if datas is not None:
+                            for name, path, data in zip(names_out, plan.cache_paths, datas):
+                                if not sink.link(name, path):
+                                    sink.write(name, data)
+                        hit = datas is not None
+
+                    if datas is None:
+                        if plan.digits in b.to_render:
+                            datas, error, _, _ = b.rendered[b.to_render[plan.digits]]
+                        else:
+                            datas, error, _, _ = (_rasterize_job if raw_images else _render_job)(plan.digits, ctxs)
+                        if datas is None:
+                            b.ready.append(RowResult(
+                                plan.line_no, plan.clave, plan.ean13, "error",
+                                message=error or "", category="Render",
+                            ))
+                            continue
+                        for name, data in zip(names_out, datas):
+                            if raw_images:
+                                sink.write_image(name, data)
+                            else:
+                                sink.write(name, data)
+                        if cache is not None:
+                            # Repetido dentro del lote: ya se rindió para otra fila
+                            hit = plan.digits in written
+                            for key, ctx, data in zip(plan.cache_keys, ctxs, datas):
+                                cache.store(key, data, OUTPUT_FORMATS[ctx.format])
+                    written.add(plan.digits)
+
+                except OSError as e:
+                    b.ready.append(RowResult(
+                        plan.line_no, plan.clave, plan.ean13, "error",
+                        message=str(e), category="Escritura",
+                    ))
+                    continue
+
+                files: List[str] = []
+                for name in names_out:
+                    if sink.directory is not None:
+                        path = sink.directory / name
+                        try:
+                            files.append(path.relative_to(outdir).as_posix())
+                        except ValueError:
+                            files.append(str(path))
+                    else:
+                        files.append(sink.location(name))
+
+                entry = ManifestEntry(
+                    line_no=plan.line_no,
+                    clave=plan.clave,
+                    n=plan.n,
+                    ean13=plan.digits,
+                    options=options_id,
+                    file=MANIFEST_SEP.join(files),
+                    # En una hoja no hay archivo propio que verificar: sha256 vacío
+                    sha256=MANIFEST_SEP.join("" if raw_images else hashlib.sha256(data).hexdigest() for data in datas),
+                )
+                manifest[plan.line_no] = entry
+                mw.writerow(entry.row())
+                if not raw_images:
+                    bytes_written += sum(len(data) for data in datas)
+                timings["escritura"].add(time.perf_counter_ns() - t0)
+                b.ready.append(RowResult(
+                    plan.line_no, plan.clave, plan.ean13, "generated",
+                    path=(sink.directory / names_out[0] if sink.directory is not None else None), cache_hit=hit,
+                ))
+            mf.flush()
+            b.ready.sort(key=lambda r: r.line_no)
+            return b
+
+        if pipeline:
+            # Cada etapa en su hilo con colas acotadas: el disco y Pillow se solapan
+            # y el ritmo lo marca la etapa más lenta, no la suma de todas
+            stages = [plan_batch, render_batch, encode_batch, write_batch]
+            done: Iterator[_Batch] = run_pipeline(read_batches(), stages, depth=queue_depth, name="barcodes")
+        else:
+            done = (write_batch(render_batch(plan_batch(b))) for b in read_batches())
+        # Si el consumidor deja de iterar, los hilos paran antes de cerrar los archivos
+        stack.callback(done.close)
+
+        for b in done:
+            for r in b.ready:
+                rows_done += 1
+                if r.status == "generated":
+                    generated += 1
+                    if r.cache_hit is True:
+                        cache_hits += 1
+                    elif r.cache_hit is False:
+                        cache_misses += 1
+                elif r.status == "skipped":
+                    skipped += 1
+                else:
+                    errsink.add(RowError(r.line_no, r.clave, r.ean13, r.message, r.category))
+                yield r
+            errsink.flush()
+
+            if on_progress is not None:
+                on_progress(Progress(
+                    rows=rows_done,
+                    generated=generated,
+                    skipped=skipped,
+                    errors=errsink.count,
+                    bytes_read=b.bytes_read,
+                    total_bytes=total_bytes,
+                ))
+
+        if errsink.count:
+            lf.write("\n")
+        if cancelled:
+            lf.write(f"CANCELADO tras {rows_done} filas\n")
+        if raw_images:
+            lf.write(f"Generados: {generated} (compuestos en {sink.describe()})\n")
+        else:
+            lf.write(f"Generados: {generated} ({bytes_written:,} bytes)\n")
+        if resume:
+            lf.write(f"Sin cambios (omitidos): {skipped}\n")
+        if cache_dir is not None and cache is None:
+            lf.write("Caché: no se usa al componer hojas\n")
+        if cache is not None:
+            lf.write(f"Caché: {cache_hits} aciertos / {cache_misses} fallos ({cache.root})\n")
+        lf.write(f"Errores: {errsink.count}\n")
+        for category, count in sorted(errsink.summary.items(), key=lambda kv: -kv[1]):
+            lf.write(f"  {category}: {count}\n")
+
+        elapsed = time.perf_counter() - started
+        lf.write(f"Tiempo total: {elapsed:.2f} s\n")
+        lf.write("Tiempos por etapa:\n")
+        for line in format_timings(timings):
+            lf.write(f"  {line}\n")
+
+    # Compactar el manifiesto (solo la versión vigente de cada fila). Si se
+    # canceló, las filas que no se alcanzaron conservan su renglón anterior: sus
+    # archivos siguen en disco y la próxima corrida con resume=True los reutiliza.
+    entries = list(manifest.values())
+    if cancelled:
+        reached = {(e.clave, e.n) for e in entries}
+        files = {e.files[0] for e in entries}
+        entries += [e for key, e in previous.items() if key not in reached and e.files[0] not in files]
+    _write_manifest(manifest_path, entries)
+
+    if part is not None:
+        try:
+            rel_barcodes = barcodes_dir.relative_to(outdir).as_posix()
+        except ValueError:
+            rel_barcodes = str(barcodes_dir)
+        (logs_dir / SHARD_INFO).write_text(json.dumps({
+            "shard": str(shard),
+            "index": shard.index,
+            "count": shard.count,
+            "csv": str(csv_path),
+            "csv_size": csv_path.stat().st_size,
+            "first_line": part.first_line,
+            "rows": part.rows,
+            "bytes": [part.start, part.end],
+            "options": options_id,
+            "barcodes_dir": rel_barcodes,
+            "generated": generated,
+            "errors": errsink.count,
+            "elapsed_s": round(elapsed, 3),
+            "cancelled": cancelled,
+        }, indent=2), encoding="utf-8")
+
+    if cache is not None:
+        cache.prune()
+
+    return RunResult(
+        generated=generated,
+        errors=errsink.errors,
+        delimiter=delimiter,
+        outdir=outdir,
+        barcodes_dir=barcodes_dir,
+        log_file=run_log,
+        errors_csv=(errors_csv if errsink.count else None),
+        cache_hits=cache_hits,
+        cache_misses=cache_misses,
+        skipped=skipped,
+        manifest=manifest_path,
+        cancelled=cancelled,
+        output=sink.describe(),
+        bytes_written=bytes_written,
+        elapsed=elapsed,
+        timings=timings,
+        error_count=errsink.count,
+        error_summary=dict(errsink.summary),
+        encoding=encoding,
+    )
+
+
+def generate_barcodes_from_csv(
+    csv_path: Path,
+    outdir: Path,
+    *,
+    delimiter: Optional[str] = None,
+    encoding: Optional[str] = "auto",
+    width: int = 450,
+    height: int = 300,
+    no_text: bool = False,
+    overwrite: bool = False,
+    engine: str = DEFAULT_ENGINE,
+    workers: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    resume: bool = False,
+    max_errors: Optional[int] = DEFAULT_MAX_ERRORS,
+    png: PngProfile = PngProfile(),
+    format: str = "png",
+    outputs: Optional[Sequence[OutputSpec]] = None,
+    sink: Optional[OutputSink] = None,
+    pipeline: bool = False,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    pool: Optional[ProcessPoolExecutor] = None,
+    shard: Optional[Shard] = None,
+    session: Optional[BarcodeSession] = None,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> RunResult:
+    rows = iter_generate(
+        csv_path,
+        outdir,
+        delimiter=delimiter,
+        encoding=encoding,
+        width=width,
+        height=height,
+        no_text=no_text,
+        overwrite=overwrite,
+        engine=engine,
+        workers=workers,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes,
+        resume=resume,
+        max_errors=max_errors,
+        png=png,
+        format=format,
+        outputs=outputs,
+        sink=sink,
+        pipeline=pipeline,
+        queue_depth=queue_depth,
+        pool=pool,
+        shard=shard,
+        session=session,
+        on_progress=on_progress,
+        cancel=cancel,
+    )
+    while True:
+        try:
+            next(rows)
+        except StopIteration as stop:
+            return stop.value
+
+
+# ---- Corridas por fragmentos (--shard): unir salidas ----
 
-                generated += 1
+@dataclass
+class MergeResult:
+    shards: int
+    generated: int
+    error_count: int
+    error_summary: dict[str, int]
+    renamed: int  # filas cuyo archivo cambió de nombre por colisión entre fragmentos
+    outdir: Path
+    barcodes_dir: Path
+    log_file: Path
+    errors_csv: Path | None
+    manifest: Path
+
+
+def _load_shard_info(shard_dir: Path) -> dict:
+    path = shard_dir / "logs" / SHARD_INFO
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValueError(f"{shard_dir} no es la salida de una corrida con --shard (falta logs/{SHARD_INFO})") from None
 
-            except Exception as e:
-                errors.append(RowError(line_no, str(clave_raw), str(ean13_raw), str(e)))
 
-    # ---- Guardar log de ejecución ----
+def merge_shards(shard_dirs: Sequence[Path], outdir: Path, *, overwrite: bool = False) -> MergeResult:
+    """
+    Une en `outdir` las salidas de todos los fragmentos de un CSV como si fuera
+    una sola corrida: barcodes/, errors.csv, logs/run_log.txt y
+    logs/manifest.csv, en orden de line_no.
+
+    Cada fragmento nombró sus archivos sin ver a los demás (K1.png en el 1/8 y
+    también en el 2/8); aquí los nombres se reasignan en orden del CSV con las
+    reglas de la corrida completa (_2, _3...; con `overwrite` gana la última
+    fila), así el resultado no depende de cuántos fragmentos hubo. Los archivos
+    se enlazan (hardlink) o copian; los fragmentos no se modifican.
+    """
+    started = time.perf_counter()
+    if not shard_dirs:
+        raise ValueError("No se indicaron carpetas de fragmentos")
+    shards = sorted(
+        ((_load_shard_info(Path(d)), Path(d)) for d in shard_dirs),
+        key=lambda item: item[0]["index"],
+    )
+    first, first_dir = shards[0]
+    count = first["count"]
+    for info, d in shards:
+        if (info["count"], info["csv_size"], info["options"]) != (count, first["csv_size"], first["options"]):
+            raise ValueError(
+                f"{d} no es un fragmento de la misma corrida que {first_dir} "
+                "(cambia el CSV, el número de fragmentos o las opciones de salida)"
+            )
+        if info["cancelled"]:
+            raise ValueError(f"El fragmento {info['shard']} ({d}) no terminó: reanúdalo con --resume antes de unir")
+    indexes = [info["index"] for info, _ in shards]
+    repeated = sorted({i for i in indexes if indexes.count(i) > 1})
+    if repeated:
+        raise ValueError(f"Fragmentos repetidos: {', '.join(f'{i}/{count}' for i in repeated)}")
+    missing = [i for i in range(1, count + 1) if i not in indexes]
+    if missing:
+        raise ValueError(f"Faltan fragmentos: {', '.join(f'{i}/{count}' for i in missing)}")
+
+    outdir = Path(outdir)
+    logs_dir = outdir / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    sink = DirectorySink(outdir / "barcodes")
+    names: Optional[NameIndex] = None
+    occurrences: dict[str, int] = {}
+    manifest: List[ManifestEntry] = []
+    renamed: List[str] = []
+
+    # Imágenes y manifiesto: fragmentos en orden = filas en orden del CSV
+    for info, d in shards:
+        shard_barcodes = d / info["barcodes_dir"]
+        entries = sorted(load_manifest(d / "logs" / "manifest.csv").values(), key=lambda e: e.line_no)
+        for entry in entries:
+            srcs = [d / file for file in entry.files]
+            old = [src.relative_to(shard_barcodes).as_posix() for src in srcs]
+            primary = Path(old[0])
+            if names is None:
+                # Con varias salidas el nombre lo decide la principal, como en la corrida
+                names = NameIndex(sink.directory / primary.parent, suffix=primary.suffix, scan=True)
+
+            stem = sanitize_filename(entry.clave)
+            if overwrite:
+                target = names.directory / f"{stem}{names.suffix}"
+                names.reserve(target)
+            else:
+                target = names.allocate(stem)
+            new = [(Path(name).parent / f"{target.stem}{Path(name).suffix}").as_posix() for name in old]
+
+            for src, name in zip(srcs, new):
+                if not sink.link(name, src):
+                    raise ValueError(f"Falta {src} (fragmento {info['shard']}): vuelve a correr ese fragmento")
+            if new[0] != old[0]:
+                renamed.append(f"{entry.line_no} | {entry.clave} | {info['shard']}: {old[0]} -> {new[0]}")
+
+            n = occurrences.get(entry.clave, 0) + 1
+            occurrences[entry.clave] = n
+            manifest.append(replace(
+                entry,
+                n=n,
+                file=MANIFEST_SEP.join((sink.directory / name).relative_to(outdir).as_posix() for name in new),
+            ))
+
+    manifest_path = logs_dir / "manifest.csv"
+    _write_manifest(manifest_path, manifest)
+
     run_log = logs_dir / "run_log.txt"
+    errors_csv = outdir / "errors.csv"
     with run_log.open("w", encoding="utf-8") as lf:
-        lf.write(f"CSV: {csv_path}\n")
+        lf.write(f"CSV: {first['csv']}\n")
         lf.write(f"Salida: {outdir}\n")
-        lf.write(f"Delimitador: {delimiter}\n")
-        lf.write(f"Generados: {generated}\n")
-        lf.write(f"Errores: {len(errors)}\n\n")
+        lf.write(f"Fragmentos: {count}\n")
+        for info, d in shards:
+            last = info["first_line"] + info["rows"] - 1
+            lf.write(
+                f"  {info['shard']}: líneas {info['first_line']}-{last} | {info['generated']} generados | "
+                f"{info['errors']} errores | {info['elapsed_s']:.2f} s | {d}\n"
+            )
+        lf.write(f"Destino: {sink.describe()}\n\n")
 
-        if errors:
-            lf.write("Errores (line_no | Clave | EAN-13 | motivo):\n")
-            for e in errors:
-                lf.write(f"{e.line_no} | {e.clave} | {e.ean13} | {e.message}\n")
+        # Los errores no cambian: se concatenan en orden de fragmento
+        errsink = _ErrorSink(errors_csv, lf, max_in_memory=0)
+        try:
+            for _, d in shards:
+                path = d / "errors.csv"
+                if not path.exists():
+                    continue
+                with path.open("r", encoding="utf-8", newline="") as ef:
+                    for row in csv.DictReader(ef):
+                        message = row["motivo"]
+                        errsink.add(RowError(int(row["line_no"]), row["Clave"], row["EAN-13"], message, error_category(message)))
+        finally:
+            errsink.close()
 
-    errors_csv = outdir / "errors.csv"
+        if errsink.count:
+            lf.write("\n")
+        lf.write(f"Renombrados por colisión entre fragmentos: {len(renamed)}\n")
+        for line in renamed:
+            lf.write(f"  {line}\n")
+        lf.write(f"Generados: {len(manifest)}\n")
+        lf.write(f"Errores: {errsink.count}\n")
+        for category, n_errors in sorted(errsink.summary.items(), key=lambda kv: -kv[1]):
+            lf.write(f"  {category}: {n_errors}\n")
+        lf.write(f"Tiempo total (suma de fragmentos): {sum(info['elapsed_s'] for info, _ in shards):.2f} s\n")
+        lf.write(f"Tiempo de unión: {time.perf_counter() - started:.2f} s\n")
 
-    if errors:
-        with errors_csv.open("w", encoding="utf-8", newline="") as ef:
-            w = csv.writer(ef)
-            w.writerow(["line_no", "Clave", "EAN-13", "motivo"])
-            for e in errors:
-                w.writerow([e.line_no, e.clave, e.ean13, e.message])
-    else:
-        if errors_csv.exists():
-            try:
-                errors_csv.unlink()
-            except Exception:
-                pass
-    return RunResult(generated=generated, errors=errors, delimiter=delimiter, outdir=outdir, barcodes_dir=barcodes_dir, log_file=run_log, errors_csv=(errors_csv if errors else None))
+    return MergeResult(
+        shards=count,
+        generated=len(manifest),
+        error_count=errsink.count,
+        error_summary=dict(errsink.summary),
+        renamed=len(renamed),
+        outdir=outdir,
+        barcodes_dir=sink.directory,
+        log_file=run_log,
+        errors_csv=(errors_csv if errsink.count else None),
+        manifest=manifest_path,
+    )
+
+
+# ---- Modo validación ("lint"): sin render ----
+
+DUPLICATES_CSV_COLS = ["tipo", "Clave", "EAN-13", "archivo", "filas", "line_nos"]
+CHECK_BATCH_ROWS = 10_000
+
+
+@dataclass
+class CheckResult:
+    rows: int
+    valid: int
+    errors: List[RowError]
+    error_count: int
+    error_summary: dict[str, int]
+    duplicates: int
+    delimiter: str
+    encoding: str
+    outdir: Path
+    log_file: Path
+    errors_csv: Path | None
+    duplicates_csv: Path | None
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0 and self.duplicates == 0
+
+
+def _clave_problem(clave_raw: str, clave: str) -> Optional[tuple[str, str]]:
+    raw = "" if clave_raw is None else str(clave_raw).strip()
+    if not raw:
+        return "Clave vacía", f"Clave vacía (se guardaría como '{clave}')"
+    # "/" -> "_" es la regla documentada; cualquier otro cambio es un carácter prohibido
+    if clave != raw.replace("/", "_"):
+        return "Clave inválida", f"Clave con caracteres no válidos para nombre de archivo (se guardaría como '{clave}')"
+    return None
+
+
+def check_csv(
+    csv_path: Path,
+    outdir: Path,
+    *,
+    delimiter: Optional[str] = None,
+    encoding: Optional[str] = "auto",
+    max_errors: Optional[int] = DEFAULT_MAX_ERRORS,
+) -> CheckResult:
+    """
+    Valida el CSV sin generar imágenes: columnas requeridas, checksum EAN-13,
+    Claves vacías o con caracteres prohibidos y filas duplicadas. Escribe
+    logs/check_errors.csv (mismo formato que el errors.csv de la generación, que
+    no se toca) y duplicates.csv. Las colisiones de nombre siguen la misma prueba
+    de mayúsculas que la generación en outdir/barcodes.
+    """
+    csv_path = Path(csv_path)
+    outdir = Path(outdir)
+    logs_dir = outdir / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    encoding = resolve_encoding(csv_path, encoding)
+    if delimiter is None:
+        delimiter = detect_delimiter(csv_path, encoding=encoding)
+
+    rows_done = 0
+    valid = 0
+    # archivo de salida -> {(Clave, EAN): [line_no, ...]}
+    by_file: dict[str, dict[tuple[str, str], List[int]]] = {}
+
+    log_file = logs_dir / "check_log.txt"
+    # Aparte del errors.csv de la generación: validar una carpeta ya generada no lo pisa
+    errors_csv = logs_dir / "check_errors.csv"
+    duplicates_csv = outdir / "duplicates.csv"
+    case_insensitive = is_case_insensitive(outdir / "barcodes")
+
+    with ExitStack() as stack:
+        f = stack.enter_context(csv_path.open("r", encoding=encoding, newline=""))
+        reader = csv.DictReader(f, delimiter=delimiter)
+
+        missing = [c for c in REQUIRED_COLS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(
+                f"Faltan columnas: {missing}\nColumnas encontradas: {reader.fieldnames}"
+            )
+
+        lf = stack.enter_context(log_file.open("w", encoding="utf-8"))
+        lf.write(f"CSV: {csv_path}\n")
+        lf.write(f"Delimitador: {delimiter!r}\n")
+        lf.write(f"Encoding: {encoding}\n\n")
+
+        sink = _ErrorSink(errors_csv, lf, max_errors)
+        stack.callback(sink.close)
+
+        rows = enumerate(reader, start=2)
+        while True:
+            batch = list(islice(rows, CHECK_BATCH_ROWS))
+            if not batch:
+                break
+
+            checked = validate_ean13_batch(row.get("EAN-13", "") for _, row in batch)
+            for i, (line_no, row) in enumerate(batch):
+                rows_done += 1
+                clave_raw = str(row.get("Clave", "") or "")
+                ean13_raw = str(row.get("EAN-13", "") or "")
+                clave = sanitize_filename(clave_raw)
+
+                row_ok = True
+                problem = _clave_problem(clave_raw, clave)
+                if problem is not None:
+                    category, message = problem
+                    sink.add(RowError(line_no, clave_raw, ean13_raw, message, category))
+                    row_ok = False
+
+                if checked.status[i] != EAN_OK:
+                    message = checked.message(i)
+                    sink.add(RowError(line_no, clave_raw, ean13_raw, message, error_category(message)))
+                    row_ok = False
+
+                valid += row_ok
+                if checked.status[i] != EAN_OK:
+                    # Ya está en check_errors.csv y nunca se escribiría: no cuenta para duplicados ni colisiones
+                    continue
+                key = f"{clave}.png".casefold() if case_insensitive else f"{clave}.png"
+                by_file.setdefault(key, {}).setdefault((clave_raw, checked.digits[i]), []).append(line_no)
+
+        # ---- Duplicados ----
+        duplicates = 0
+        if duplicates_csv.exists():
+            duplicates_csv.unlink()
+
+        dup_file = None
+        for pairs in by_file.values():
+            groups: List[tuple[str, tuple[str, str], List[int]]] = []
+            for pair, lines in pairs.items():
+                if len(lines) > 1:
+                    groups.append(("Clave+EAN repetidos", pair, lines))
+            if len(pairs) > 1:
+                # Mismo archivo de salida con datos distintos: generaría _2, _3...
+                for pair, lines in pairs.items():
+                    groups.append(("Mismo archivo, EAN/Clave distintos", pair, lines))
+
+            for kind, (clave_raw, digits), lines in groups:
+                if dup_file is None:
+                    dup_file = stack.enter_context(duplicates_csv.open("w", encoding="utf-8", newline=""))
+                    dw = csv.writer(dup_file)
+                    dw.writerow(DUPLICATES_CSV_COLS)
+                name = f"{sanitize_filename(clave_raw)}.png"
+                dw.writerow([kind, clave_raw, digits, name, len(lines), ";".join(map(str, lines))])
+                duplicates += 1
+
+        if sink.count:
+            lf.write("\n")
+        lf.write(f"Filas: {rows_done}\n")
+        lf.write(f"Válidas: {valid}\n")
+        lf.write(f"Errores: {sink.count}\n")
+        for category, count in sorted(sink.summary.items(), key=lambda kv: -kv[1]):
+            lf.write(f"  {category}: {count}\n")
+        lf.write(f"Duplicados: {duplicates}\n")
+
+    return CheckResult(
+        rows=rows_done,
+        valid=valid,
+        errors=sink.errors,
+        error_count=sink.count,
+        error_summary=dict(sink.summary),
+        duplicates=duplicates,
+        delimiter=delimiter,
+        encoding=encoding,
+        outdir=outdir,
+        log_file=log_file,
+        errors_csv=(errors_csv if sink.count else None),
+        duplicates_csv=(duplicates_csv if duplicates else None),
+    )
@@ -4,11 +4,39 @@ from barcode_tool import __version__
 import os
 import subprocess
 import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
+from typing import TYPE_CHECKING
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from .core import generate_barcodes_from_csv
+from .profiling import profile_run
+
+# core (y con él Pillow) se importa después de mostrar la ventana, ver _preload
+if TYPE_CHECKING:  # pragma: no cover
+    from .core import CancelToken
+
+# Intervalo mínimo entre refrescos de la barra de progreso
+PROGRESS_INTERVAL_S = 0.1
+
+# Errores que se muestran en pantalla; el detalle completo queda en errors.csv
+GUI_MAX_ERRORS = 200
+
+# Perfilado oculto para soporte: Ctrl+Shift+P o esta variable de entorno en "1"
+PROFILE_ENV = "BARCODE_TOOL_PROFILE"
+
+# Espera tras abrir la ventana antes de cargar el motor de render en segundo plano
+PRELOAD_DELAY_MS = 100
+
+
+def _preload_render_stack():
+    try:
+        from . import core  # noqa: F401
+        from PIL import Image, ImageDraw, ImageFont, PngImagePlugin  # noqa: F401
+    except Exception:
+        # El error real aparece (y se muestra) al generar
+        pass
 
 
 class BarcodeApp(tk.Tk):
@@ -27,11 +55,34 @@ class BarcodeApp(tk.Tk):
         self.status_var = tk.StringVar(value="Listo.")
         self.last_output_dir: Path | None = None
         self.last_barcodes_dir: Path | None = None
-
+        self.progress_var = tk.DoubleVar(value=0.0)
+        self.cancel_token: CancelToken | None = None
+        self.profile_var = tk.BooleanVar(value=os.environ.get(PROFILE_ENV) == "1")
 
         self._apply_style()
         self._build_ui()
 
+        self.bind_all("<Control-Shift-P>", self._toggle_profile)
+        self.bind_all("<Control-Shift-p>", self._toggle_profile)
+        if self.profile_var.get():
+            self._log_profile_state()
+
+        # La ventana se dibuja primero; el primer "Generar" ya no paga la importación
+        self.after(PRELOAD_DELAY_MS, self._preload)
+
+    def _preload(self):
+        threading.Thread(target=_preload_render_stack, daemon=True).start()
+
+    def _toggle_profile(self, _event=None):
+        self.profile_var.set(not self.profile_var.get())
+        self._log_profile_state()
+
+    def _log_profile_state(self):
+        if self.profile_var.get():
+            self._append_log("Perfilado activado: se guardará en logs/ de la carpeta de salida.")
+        else:
+            self._append_log("Perfilado desactivado.")
+
     def _apply_style(self):
         style = ttk.Style(self)
 
@@ -114,9 +165,20 @@ class BarcodeApp(tk.Tk):
         self.open_btn = ttk.Button(frm_actions, text="Abrir carpeta…", command=self.open_output, state="disabled")
         self.open_btn.grid(row=0, column=0, sticky="w")
 
+        # Progreso + cancelar (solo activo durante una corrida)
+        self.progress = ttk.Progressbar(frm_actions, variable=self.progress_var, maximum=1.0, length=240)
+        self.progress.grid(row=0, column=1, sticky="e", padx=(0, 10))
+
+        self.cancel_btn = ttk.Button(frm_actions, text="Cancelar", command=self.cancel, state="disabled")
+        self.cancel_btn.grid(row=0, column=2, sticky="e", padx=(0, 10))
+
+        # Validar sin generar imágenes
+        self.check_btn = ttk.Button(frm_actions, text="Validar", command=self.check)
+        self.check_btn.grid(row=0, column=3, sticky="e", padx=(0, 10))
+
         # Botón principal
         self.run_btn = ttk.Button(frm_actions, text="Generar", style="Primary.TButton", command=self.run)
-        self.run_btn.grid(row=0, column=1, sticky="e")
+        self.run_btn.grid(row=0, column=4, sticky="e")
 
 
 
@@ -162,8 +224,12 @@ class BarcodeApp(tk.Tk):
             self.out_dir.set(path)
 
     def _append_log(self, msg: str):
+        self._append_lines([msg])
+
+    def _append_lines(self, lines):
+        # Un solo insert para muchas líneas: Tk se mantiene fluido
         self.log_box.configure(state="normal")
-        self.log_box.insert("end", msg + "\n")
+        self.log_box.insert("end", "".join(f"{line}\n" for line in lines))
         self.log_box.see("end")
         self.log_box.configure(state="disabled")
 
@@ -184,6 +250,8 @@ class BarcodeApp(tk.Tk):
                 messagebox.showerror("No se pudo abrir la carpeta", str(e))
 
     def run(self):
+        from .core import CancelToken, generate_barcodes_from_csv
+
         csv_p = self.csv_path.get().strip()
         out_d = self.out_dir.get().strip()
 
@@ -204,31 +272,136 @@ class BarcodeApp(tk.Tk):
             return
 
         self.run_btn.configure(state="disabled")
+        self.check_btn.configure(state="disabled")
         self.open_btn.configure(state="disabled")
+        self.cancel_btn.configure(state="normal")
         self.last_output_dir = None
         self.last_barcodes_dir = None
+        self.progress_var.set(0.0)
 
         self.status_var.set("Procesando…")
         self._append_log("== Iniciando generación ==")
 
+        token = CancelToken()
+        self.cancel_token = token
+        last_update = [0.0]
+
+        def on_progress(p):
+            # Se llama desde el hilo de trabajo: limitar refrescos y delegar a Tk
+            now = time.monotonic()
+            if now - last_update[0] < PROGRESS_INTERVAL_S:
+                return
+            last_update[0] = now
+            self.after(0, lambda p=p: self._on_progress(p))
+
+        profiler = nullcontext()
+        if self.profile_var.get():
+            profiler = profile_run(
+                Path(out_d) / "logs",
+                context={"Origen": "GUI", "Tamaño": f"{w}x{h}", "Sin texto": bool(self.no_text_var.get())},
+            )
+
         def task():
             try:
-                result = generate_barcodes_from_csv(
-                    csv_path=Path(csv_p),
-                    outdir=Path(out_d),
-                    width=w,
-                    height=h,
-                    overwrite=bool(self.overwrite_var.get()),
-                    no_text=bool(self.no_text_var.get()),
-                )
+                # El perfil se toma en este hilo, que es el que corre la generación
+                with profiler as prof:
+                    result = generate_barcodes_from_csv(
+                        csv_path=Path(csv_p),
+                        outdir=Path(out_d),
+                        width=w,
+                        height=h,
+                        overwrite=bool(self.overwrite_var.get()),
+                        no_text=bool(self.no_text_var.get()),
+                        on_progress=on_progress,
+                        cancel=token,
+                    )
                 self.after(0, lambda r=result: self._on_success(r))
+                if prof is not None:
+                    self.after(0, lambda p=prof: self._append_log(f"Perfil: {', '.join(str(f) for f in p.files)}"))
+            except Exception as e:
+                self.after(0, lambda e=e: self._on_error(e))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def check(self):
+        from .core import check_csv
+
+        csv_p = self.csv_path.get().strip()
+        out_d = self.out_dir.get().strip()
+
+        if not csv_p:
+            messagebox.showerror("Falta CSV", "Selecciona un archivo CSV.")
+            return
+        if not out_d:
+            messagebox.showerror("Falta carpeta", "Selecciona una carpeta de salida.")
+            return
+
+        self.run_btn.configure(state="disabled")
+        self.check_btn.configure(state="disabled")
+        self.status_var.set("Validando…")
+        self._append_log("== Validando CSV ==")
+
+        def task():
+            try:
+                result = check_csv(csv_path=Path(csv_p), outdir=Path(out_d))
+                self.after(0, lambda r=result: self._on_check(r))
             except Exception as e:
                 self.after(0, lambda e=e: self._on_error(e))
 
         threading.Thread(target=task, daemon=True).start()
 
+    def _on_check(self, result):
+        lines = [
+            f"Delimitador usado: {result.delimiter!r}",
+            f"Encoding usado: {result.encoding}",
+            f"Filas: {result.rows} | Válidas: {result.valid} | Errores: {result.error_count} | Duplicados: {result.duplicates}",
+        ]
+        lines += [f"  {category}: {count}" for category, count in result.error_summary.items()]
+        shown = result.errors[:GUI_MAX_ERRORS]
+        lines += [f"L{e.line_no} | {e.clave} | {e.ean13} | {e.message}" for e in shown]
+        if result.error_count > len(shown):
+            lines.append(f"… y {result.error_count - len(shown)} más (ver {result.errors_csv})")
+        if result.errors_csv:
+            lines.append(f"Errors CSV: {result.errors_csv}")
+        if result.duplicates_csv:
+            lines.append(f"Duplicados CSV: {result.duplicates_csv}")
+        self._append_lines(lines)
+
+        self.last_output_dir = result.outdir
+        self.last_barcodes_dir = None
+        self.open_btn.configure(state="normal")
+        self._finish_run()
+
+        if result.ok:
+            self.status_var.set("CSV válido.")
+            messagebox.showinfo("Validación", f"CSV válido: {result.rows} filas.")
+        else:
+            self.status_var.set("El CSV tiene problemas.")
+            messagebox.showwarning(
+                "Validación",
+                f"Filas: {result.rows}\nErrores: {result.error_count}\nDuplicados: {result.duplicates}",
+            )
+
+    def cancel(self):
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_btn.configure(state="disabled")
+            self.status_var.set("Cancelando…")
+
+    def _on_progress(self, p):
+        self.progress_var.set(p.fraction)
+        if self.cancel_token is not None and not self.cancel_token.cancelled:
+            self.status_var.set(f"Procesando… {p.rows} filas ({p.generated} generados, {p.errors} errores)")
+
+    def _finish_run(self):
+        self.cancel_token = None
+        self.cancel_btn.configure(state="disabled")
+        self.run_btn.configure(state="normal")
+        self.check_btn.configure(state="normal")
+
     def _on_success(self, result):
-        self._append_log(f"Delimitador usado: {result.delimiter}")
+        self._append_log(f"Delimitador usado: {result.delimiter!r}")
+        self._append_log(f"Encoding usado: {result.encoding}")
         self._append_log(f"Generados: {result.generated}")
 
         # Guardar rutas para abrir carpeta
@@ -244,24 +417,35 @@ class BarcodeApp(tk.Tk):
             self._append_log(f"Errors CSV: {result.errors_csv}")
 
 
-        if result.errors:
-            self._append_log(f"Errores: {len(result.errors)}")
-            self._append_log("--- Detalle ---")
-            for e in result.errors:
-                self._append_log(f"L{e.line_no} | {e.clave} | {e.ean13} | {e.message}")
+        if result.error_count:
+            lines = [f"Errores: {result.error_count}"]
+            lines += [f"  {category}: {count}" for category, count in result.error_summary.items()]
+            lines.append("--- Detalle ---")
+            shown = result.errors[:GUI_MAX_ERRORS]
+            lines += [f"L{e.line_no} | {e.clave} | {e.ean13} | {e.message}" for e in shown]
+            if result.error_count > len(shown):
+                lines.append(f"… y {result.error_count - len(shown)} más (ver errors.csv)")
+            self._append_lines(lines)
         else:
             self._append_log("Sin errores.")
 
-        self.status_var.set("Listo.")
-        self.run_btn.configure(state="normal")
+        self._finish_run()
         self.open_btn.configure(state="normal")
 
-        messagebox.showinfo("Completado", f"Generados: {result.generated}\nErrores: {len(result.errors)}")
+        if result.cancelled:
+            self._append_log("== Cancelado ==")
+            self.status_var.set("Cancelado.")
+            messagebox.showinfo("Cancelado", f"Generados antes de cancelar: {result.generated}\nErrores: {result.error_count}")
+            return
+
+        self.progress_var.set(1.0)
+        self.status_var.set("Listo.")
+        messagebox.showinfo("Completado", f"Generados: {result.generated}\nErrores: {result.error_count}")
 
     def _on_error(self, e: Exception):
         self._append_log(f"[ERROR] {e}")
         self.status_var.set("Error.")
-        self.run_btn.configure(state="normal")
+        self._finish_run()
         messagebox.showerror("Error", str(e))
 
 
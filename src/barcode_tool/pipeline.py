@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+
+DEFAULT_QUEUE_DEPTH = 4
+
+# Fin de la corriente: cada etapa lo reenvía a la siguiente y termina
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    stages: Sequence[Callable[[Any], Any]],
+    *,
+    depth: int = DEFAULT_QUEUE_DEPTH,
+    name: str = "etapa",
+) -> Iterator[Any]:
+    """
+    Corre `source` y cada etapa en su propio hilo, unidos por colas acotadas
+    (`depth` elementos): una etapa lenta frena a las anteriores en vez de
+    acumular memoria. Los elementos salen en el mismo orden en que entraron.
+
+    Un error en cualquier etapa se relanza aquí. Si el consumidor deja de
+    iterar (break, close, excepción), todos los hilos se detienen.
+    """
+    if depth < 1:
+        raise ValueError(f"La profundidad de cola debe ser >= 1, llegó: {depth}")
+
+    abort = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: queue.Queue) -> Any:
+        while not abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def feed() -> None:
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+        except BaseException as e:
+            put(queues[0], _Failure(e))
+            return
+        put(queues[0], _END)
+
+    def work(fn: Callable[[Any], Any], q_in: queue.Queue, q_out: queue.Queue) -> None:
+        while True:
+            item = get(q_in)
+            if item is _END or isinstance(item, _Failure):
+                put(q_out, item)
+                return
+            try:
+                result = fn(item)
+            except BaseException as e:
+                put(q_out, _Failure(e))
+                return
+            if not put(q_out, result):
+                return
+
+    threads = [threading.Thread(target=feed, name=f"{name}-0", daemon=True)]
+    for i, fn in enumerate(stages):
+        threads.append(threading.Thread(
+            target=work, args=(fn, queues[i], queues[i + 1]), name=f"{name}-{i + 1}", daemon=True,
+        ))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        abort.set()
+        for t in threads:
+            t.join()
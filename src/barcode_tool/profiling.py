@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+# Funciones / líneas que se listan en los reportes de texto
+DEFAULT_TOP = 40
+
+# Profundidad de pila que guarda tracemalloc por asignación (más = más lento)
+_TRACE_FRAMES = 1
+
+
+@dataclass
+class ProfileReport:
+    """
+    Archivos que deja profile_run en logs/; se llenan al salir del bloque.
+    """
+
+    pstats: Optional[Path] = None
+    hotspots: Optional[Path] = None
+    memory: Optional[Path] = None
+    elapsed: float = 0.0
+    peak_traced: int = 0  # bytes, memoria de Python según tracemalloc
+
+    @property
+    def files(self) -> List[Path]:
+        return [p for p in (self.pstats, self.hotspots, self.memory) if p is not None]
+
+
+def peak_rss(*, children: bool = False) -> Optional[int]:
+    """
+    Pico de memoria residente en bytes de este proceso (o del mayor de sus hijos
+    ya terminados). None si la plataforma no lo expone.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        # Linux reporta KiB, macOS bytes
+        return resource.getrusage(who).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+    if sys.platform == "win32" and not children:
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+
+    return None
+
+
+def _mb(n: Optional[int]) -> str:
+    return "n/d" if n is None else f"{n / 1024 / 1024:.1f} MB"
+
+
+def _header(context: Dict[str, object], elapsed: float) -> List[str]:
+    import platform
+
+    from . import __version__
+
+    try:
+        import PIL
+        pillow = PIL.__version__
+    except Exception:
+        pillow = "?"
+
+    lines = [
+        f"barcode_tool {__version__} | Python {platform.python_version()} | Pillow {pillow}",
+        f"Sistema: {platform.platform()} | Núcleos: {os.cpu_count()}",
+        f"Tiempo total (con perfilado): {elapsed:.2f} s",
+    ]
+    lines += [f"{key}: {value}" for key, value in context.items()]
+    return lines
+
+
+@contextmanager
+def profile_run(
+    logs_dir: Path,
+    *,
+    top: int = DEFAULT_TOP,
+    context: Optional[Dict[str, object]] = None,
+) -> Iterator[ProfileReport]:
+    """
+    Perfila el bloque con cProfile y tracemalloc y escribe en `logs_dir`:
+    profile.pstats (para snakeviz / pstats), profile.txt (funciones más
+    costosas) y memory.txt (picos de memoria y dónde se asigna).
+
+    Solo se mide el hilo que entra al bloque: con --workers el render corre
+    en otros procesos y con --pipeline en otros hilos, y no aparece.
+    Los archivos se escriben aunque el bloque termine con error.
+    """
+    # Se importan aquí: el CLI y la GUI cargan este módulo aunque no perfilen
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    logs_dir = Path(logs_dir)
+    context = dict(context or {})
+    report = ProfileReport()
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(_TRACE_FRAMES)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+
+    t0 = time.perf_counter()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        report.elapsed = time.perf_counter() - t0
+        current, report.peak_traced = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if not was_tracing:
+            tracemalloc.stop()
+
+        logs_dir.mkdir(parents=True, exist_ok=True)
+        header = _header(context, report.elapsed)
+
+        report.pstats = logs_dir / "profile.pstats"
+        profiler.dump_stats(str(report.pstats))
+
+        buf = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buf).strip_dirs()
+        buf.write(f"==== Top {top} por tiempo acumulado ====\n")
+        stats.sort_stats("cumulative").print_stats(top)
+        buf.write(f"==== Top {top} por tiempo propio ====\n")
+        stats.sort_stats("tottime").print_stats(top)
+        report.hotspots = logs_dir / "profile.txt"
+        report.hotspots.write_text("\n".join(header) + "\n\n" + buf.getvalue(), encoding="utf-8")
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        lines = header + [
+            "",
+            f"Pico de memoria de Python (tracemalloc): {_mb(report.peak_traced)}",
+            f"Memoria de Python al terminar: {_mb(current)}",
+            f"Pico de memoria del proceso (RSS): {_mb(peak_rss())}",
+            f"Pico de memoria de procesos de trabajo (RSS): {_mb(peak_rss(children=True))}",
+            "",
+            "tracemalloc solo ve memoria asignada por Python; los píxeles de Pillow",
+            "y los búferes de zlib cuentan en el RSS pero no aquí.",
+            "",
+            f"==== Top {top} líneas con más memoria viva al terminar ====",
+        ]
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"{_mb(stat.size):>10} en {stat.count:>7} bloques  {frame.filename}:{frame.lineno}")
+        report.memory = logs_dir / "memory.txt"
+        report.memory.write_text("\n".join(lines) + "\n", encoding="utf-8")
@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import threading
+import time
+import zipfile
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .cache import DEFAULT_MEMORY_CACHE_BYTES, MemoryCache
+from .core import (
+    DEFAULT_ENGINE,
+    BarcodeSession,
+    EAN_OK,
+    ENGINES,
+    ERRORS_CSV_COLS,
+    OUTPUT_FORMATS,
+    NameIndex,
+    OutputSpec,
+    PngProfile,
+    check_output,
+    detect_delimiter_lines,
+    detect_encoding_bytes,
+    parse_output_spec,
+    render_cache_key,
+    resolve_workers,
+    sanitize_filename,
+    validate_ean13_batch,
+)
+from .version import __version__
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Límites por solicitud: el servidor es local, pero un tamaño absurdo no debe tumbarlo
+MAX_SIDE_PX = 10_000
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# Filas por tanda en /batch: se rinden juntas y se escriben al ZIP antes de leer más
+BATCH_CHUNK = 64
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+_TRUE = ("1", "true", "si", "sí", "yes")
+
+# (salidas por OutputSpec o None, error, salió del LRU)
+_Rendered = Tuple[Optional[List[bytes]], Optional[str], bool]
+
+
+class RenderService:
+    """
+    Estado compartido del servidor: procesos de render ya calientes y un LRU
+    en memoria de los renders recientes. Seguro entre hilos.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        engine: str = DEFAULT_ENGINE,
+        lru_max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de render desconocido: {engine!r} (opciones: {', '.join(ENGINES)})")
+        self.engine = engine
+        self.workers = resolve_workers(workers)
+        self.lru = MemoryCache(lru_max_bytes)
+        self.pool = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._sessions: Dict[Tuple[Tuple[OutputSpec, ...], str], BarcodeSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, specs: Sequence[OutputSpec], engine: Optional[str] = None) -> BarcodeSession:
+        # Opciones del writer y token de caché se arman una vez por combinación, no por solicitud
+        key = (tuple(specs), engine or self.engine)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = BarcodeSession(key[0], engine=key[1])
+            return session
+
+    def warm_up(self) -> None:
+        """
+        Rinde un código en cada proceso: la primera solicitud real no paga
+        la importación de Pillow ni la carga de la fuente.
+        """
+        self.session([OutputSpec()]).warm_up(self.pool)
+
+    def render_many(self, codes: Sequence[str], session: BarcodeSession) -> List[_Rendered]:
+        """
+        (salidas, error, desde_lru) por código ya validado, en el mismo orden. Lo
+        que está en el LRU no se vuelve a rendir; los repetidos se rinden una vez.
+        """
+        ctxs = session.contexts
+        results: Dict[str, _Rendered] = {}
+        missing: List[str] = []
+        for code in codes:
+            if code in results:
+                continue
+            datas = [self.lru.get(render_cache_key(code, ctx)) for ctx in ctxs]
+            if all(d is not None for d in datas):
+                results[code] = (datas, None, True)
+            else:
+                missing.append(code)
+                results[code] = (None, None, False)
+
+        for code, (datas, error, _, _) in zip(missing, session.render_jobs(missing, self.pool)):
+            if datas is not None:
+                for ctx, data in zip(ctxs, datas):
+                    self.lru.put(render_cache_key(code, ctx), data)
+            results[code] = (datas, error, False)
+        return [results[code] for code in codes]
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+def _parse_specs(
+    query: Dict[str, List[str]],
+    *,
+    fmt: Optional[str] = None,
+    default_engine: str = DEFAULT_ENGINE,
+) -> Tuple[List[OutputSpec], Optional[str]]:
+    """
+    Opciones de la URL con los mismos nombres que el CLI: width, height, notext,
+    format, png_mode, png_level, png_optimize, engine y output (repetible, solo /batch).
+    Opciones que el render rechazaría (p. ej. un ancho menor a 95 px con el
+    motor nativo) son ValueError aquí, así responden 400 y no 500.
+    """
+    def one(name: str, default: Optional[str] = None) -> Optional[str]:
+        values = query.get(name)
+        return values[-1] if values else default
+
+    def number(name: str, default: int) -> int:
+        value = one(name)
+        try:
+            return default if value is None else int(value)
+        except ValueError:
+            raise ValueError(f"'{name}' debe ser un número entero, llegó: '{value}'")
+
+    png = PngProfile(
+        mode=one("png_mode", "rgb"),
+        compress_level=number("png_level", 6),
+        optimize=(one("png_optimize", "1").lower() in _TRUE),
+    )
+    if query.get("output"):
+        specs = [parse_output_spec(text, png=png) for text in query["output"]]
+    else:
+        specs = [OutputSpec(
+            width=number("width", 450),
+            height=number("height", 300),
+            no_text=(one("notext", "0").lower() in _TRUE),
+            format=fmt or one("format", "png"),
+            png=png,
+        )]
+    for spec in specs:
+        if spec.width > MAX_SIDE_PX or spec.height > MAX_SIDE_PX:
+            raise ValueError(f"Tamaño máximo por lado: {MAX_SIDE_PX} px")
+
+    engine = one("engine")
+    if engine is not None and engine not in ENGINES:
+        raise ValueError(f"Motor de render desconocido: {engine!r} (opciones: {', '.join(ENGINES)})")
+    for spec in specs:
+        check_output(spec, engine or default_engine)
+    return specs, engine
+
+
+def _parse_rows(body: bytes, content_type: str, delimiter: Optional[str]) -> Iterator[Tuple[int, str, str]]:
+    """
+    (línea, Clave, EAN-13) del cuerpo de /batch: CSV con las columnas de siempre
+    (solo Clave y EAN-13 son obligatorias) o JSON [{"Clave": ..., "EAN-13": ...}].
+    """
+    if content_type.startswith("application/json"):
+        items = json.loads(body.decode("utf-8-sig"))
+        if not isinstance(items, list):
+            raise ValueError("El JSON debe ser una lista de objetos con 'Clave' y 'EAN-13'")
+        for i, item in enumerate(items, start=1):
+            if not isinstance(item, dict):
+                raise ValueError(f"Elemento {i} del JSON no es un objeto")
+            yield i, str(item.get("Clave", "") or ""), str(item.get("EAN-13", "") or "")
+        return
+
+    text = body.decode(detect_encoding_bytes(body[:64 * 1024]), errors="replace")
+    if delimiter is None:
+        delimiter = detect_delimiter_lines(text[:64 * 1024].splitlines()[:50])
+    reader = csv.DictReader(io.StringIO(text, newline=""), delimiter=delimiter)
+    missing = [c for c in ("Clave", "EAN-13") if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Faltan columnas: {missing}\nColumnas encontradas: {reader.fieldnames}")
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, str(row.get("Clave", "") or ""), str(row.get("EAN-13", "") or "")
+
+
+class _ChunkedWriter:
+    """
+    Cuerpo HTTP/1.1 con Transfer-Encoding: chunked. Acumula hasta `size` bytes
+    por trozo; zipfile escribe encabezados pequeños que no conviene mandar sueltos.
+    """
+
+    def __init__(self, wfile, size: int = 64 * 1024) -> None:
+        self._wfile = wfile
+        self._size = size
+        self._buf = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        if len(self._buf) >= self._size:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self._buf:
+            self._wfile.write(f"{len(self._buf):x}\r\n".encode("ascii") + bytes(self._buf) + b"\r\n")
+            self._buf.clear()
+        self._wfile.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._wfile.write(b"0\r\n\r\n")
+        self._wfile.flush()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = f"barcode_tool/{__version__}"
+
+    @property
+    def service(self) -> RenderService:
+        return self.server.service  # type: ignore[attr-defined]
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, (message + "\n").encode("utf-8"), "text/plain; charset=utf-8")
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == "/health":
+                body = {
+                    "version": __version__,
+                    "engine": self.service.engine,
+                    "workers": self.service.workers,
+                    "lru": self.service.lru.stats(),
+                }
+                self._send(HTTPStatus.OK, json.dumps(body).encode("utf-8"), "application/json")
+            elif url.path.startswith("/ean13/"):
+                self._render_one(unquote(url.path[len("/ean13/"):]), query)
+            else:
+                self._error(HTTPStatus.NOT_FOUND, "Rutas: GET /ean13/<código>[.png|.jpg|.webp|.svg|.pdf], POST /batch, GET /health")
+        except ValueError as e:
+            self._error(HTTPStatus.BAD_REQUEST, str(e))
+
+    do_HEAD = do_GET
+
+    def _render_one(self, name: str, query: Dict[str, List[str]]) -> None:
+        # La extensión, si viene, decide el formato: /ean13/4006381333931.svg
+        fmt = None
+        stem, dot, ext = name.rpartition(".")
+        if dot:
+            fmt = next((f for f, suffix in OUTPUT_FORMATS.items() if suffix == f".{ext.lower()}"), None)
+            if fmt is None:
+                raise ValueError(f"Extensión no soportada: '.{ext}' (usa {', '.join(OUTPUT_FORMATS.values())})")
+            name = stem
+
+        if "output" in query:
+            raise ValueError("'output' solo se acepta en /batch")
+        specs, engine = _parse_specs(query, fmt=fmt, default_engine=self.service.engine)
+
+        checked = validate_ean13_batch([name])
+        if checked.status[0] != EAN_OK:
+            raise ValueError(checked.message(0))
+        code13 = checked.digits[0]
+
+        session = self.service.session(specs, engine)
+        (datas, error, cached), = self.service.render_many([code13], session)
+        if datas is None:
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, error or "Error de render")
+            return
+        self._send(HTTPStatus.OK, datas[0], CONTENT_TYPES[specs[0].format], {
+            # Mismo código + mismas opciones = mismos bytes
+            "Cache-Control": "public, max-age=86400, immutable",
+            "X-Cache": "hit" if cached else "miss",
+        })
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/batch":
+            self._error(HTTPStatus.NOT_FOUND, "Rutas: GET /ean13/<código>, POST /batch, GET /health")
+            self.close_connection = True  # el cuerpo no se leyó
+            return
+
+        query = parse_qs(url.query)
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Cuerpo máximo: {MAX_BODY_BYTES // (1024 * 1024)} MB con Content-Length")
+            self.close_connection = True
+            return
+        body = self.rfile.read(length)
+
+        try:
+            specs, engine = _parse_specs(query, default_engine=self.service.engine)
+            delimiter = query.get("delimiter", [None])[-1]
+            rows = list(_parse_rows(body, self.headers.get("Content-Type", ""), delimiter))
+            session = self.service.session(specs, engine)
+        except ValueError as e:
+            self._error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        # A partir de aquí ya no hay vuelta atrás: el ZIP sale conforme se rinde
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", 'attachment; filename="barcodes.zip"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        out = _ChunkedWriter(self.wfile)
+        try:
+            self._write_zip(out, rows, session)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        out.close()
+
+    def _write_zip(self, out: _ChunkedWriter, rows, session: BarcodeSession) -> None:
+        # Nombres con las mismas reglas que en la carpeta: Clave saneada, _2, _3...
+        specs = session.specs
+        names = NameIndex(Path("."), suffix=specs[0].suffix, scan=False)
+        errors: List[list] = []
+        stamp = time.localtime()[:6]
+
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for start in range(0, len(rows), BATCH_CHUNK):
+                chunk = rows[start:start + BATCH_CHUNK]
+                checked = validate_ean13_batch(ean for _, _, ean in chunk)
+                valid = [i for i in range(len(chunk)) if checked.status[i] == EAN_OK]
+                rendered = self.service.render_many([checked.digits[i] for i in valid], session)
+
+                results = dict(zip(valid, rendered))
+                for i, (line_no, clave, ean) in enumerate(chunk):
+                    if i not in results:
+                        errors.append([line_no, clave, ean, checked.message(i)])
+                        continue
+                    datas, error, _ = results[i]
+                    if datas is None:
+                        errors.append([line_no, clave, ean, error])
+                        continue
+                    stem = names.allocate(sanitize_filename(clave)).name[:-len(specs[0].suffix)]
+                    for spec, data in zip(specs, datas):
+                        info = zipfile.ZipInfo(spec.name_for(stem), date_time=stamp)
+                        zf.writestr(info, data)
+                out.flush()
+
+            if errors:
+                buf = io.StringIO()
+                w = csv.writer(buf)
+                w.writerow(ERRORS_CSV_COLS)
+                w.writerows(errors)
+                zf.writestr(zipfile.ZipInfo("errors.csv", date_time=stamp), buf.getvalue().encode("utf-8"))
+
+
+def make_server(host: str, port: int, service: RenderService) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    return server
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    *,
+    workers: Optional[int] = None,
+    engine: str = DEFAULT_ENGINE,
+    lru_max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+) -> None:
+    """
+    Atiende hasta Ctrl+C. Por defecto solo en localhost: no tiene autenticación.
+    """
+    service = RenderService(workers=workers, engine=engine, lru_max_bytes=lru_max_bytes)
+    try:
+        service.warm_up()
+        with make_server(host, port, service) as server:
+            print(f"Sirviendo en http://{host}:{server.server_address[1]} (motor {engine}, {service.workers} proceso(s)); Ctrl+C para salir")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        service.close()
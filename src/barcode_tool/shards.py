@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+
+
+# Metadatos que deja cada fragmento en logs/ y que lee merge_shards
+SHARD_INFO = "shard.json"
+
+_BLANK_LINES = (b"\n", b"\r\n")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    Fragmento `index` de `count` (1..count) de un CSV, p. ej. 3/8.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self) -> None:
+        if self.count < 1 or not 1 <= self.index <= self.count:
+            raise ValueError(f"Fragmento inválido: {self.index}/{self.count} (se espera K/N con 1 <= K <= N)")
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(text: str) -> Shard:
+    """
+    Lee "K/N" (p. ej. "3/8").
+    """
+    try:
+        index, count = (int(v) for v in str(text).strip().split("/"))
+    except ValueError:
+        raise ValueError(f"Fragmento inválido '{text}': se esperaba K/N, p. ej. 3/8") from None
+    return Shard(index, count)
+
+
+@dataclass(frozen=True)
+class ShardRange:
+    """
+    Bytes [start, end) del CSV que procesa un fragmento, siempre en límites de
+    registro. `first_line` es el line_no (de la corrida completa) de su primera
+    fila y `rows` cuántas filas tiene.
+    """
+
+    header: bytes
+    start: int
+    end: int
+    first_line: int
+    rows: int
+
+    @property
+    def size(self) -> int:
+        return len(self.header) + self.end - self.start
+
+
+def shard_range(csv_path: Path, shard: Shard) -> ShardRange:
+    """
+    Parte los bytes de datos del CSV en `count` tramos iguales y mueve cada corte
+    al inicio del registro siguiente, así cada fila cae en un solo fragmento y
+    todas las máquinas calculan los mismos cortes sin coordinarse.
+
+    Recorre el archivo en binario hasta el final del tramo contando registros
+    (como csv.DictReader: un salto de línea dentro de comillas no corta, las
+    líneas vacías no cuentan) para conservar los line_no originales. Sirve para
+    encodings donde '"' y '\\n' son un solo byte (utf-8, cp1252, latin-1).
+    """
+    size = Path(csv_path).stat().st_size
+    with Path(csv_path).open("rb") as f:
+        header = b""
+        in_quote = False
+        for line in f:
+            header += line
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            if not in_quote:
+                break
+
+        data_start = len(header)
+        lo = data_start + (size - data_start) * (shard.index - 1) // shard.count
+        hi = data_start + (size - data_start) * shard.index // shard.count
+
+        pos = data_start
+        records = 0  # filas antes de la posición actual
+        start = first = None
+        end = size
+        in_quote = False
+        for line in f:
+            if not in_quote:
+                # `pos` es el inicio de un registro
+                if start is None and pos >= lo:
+                    start, first = pos, records
+                if pos >= hi:
+                    end = pos
+                    break
+                if line not in _BLANK_LINES:
+                    records += 1
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            pos += len(line)
+
+    if start is None:
+        start, first = end, records
+    # Fila 1 = encabezado
+    return ShardRange(header=header, start=start, end=end, first_line=first + 2, rows=records - first)
+
+
+class ShardReader(io.RawIOBase):
+    """
+    Flujo binario con el encabezado del CSV seguido solo de los bytes del
+    fragmento; se envuelve en TextIOWrapper como el archivo completo.
+    """
+
+    def __init__(self, csv_path: Path, part: ShardRange) -> None:
+        super().__init__()
+        self._f = Path(csv_path).open("rb")
+        self._f.seek(part.start)
+        self._head = memoryview(part.header)
+        self._left = part.end - part.start
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        if self._head:
+            n = min(len(view), len(self._head))
+            view[:n] = self._head[:n]
+            self._head = self._head[n:]
+        else:
+            n = self._f.readinto(view[:min(len(view), self._left)]) if self._left > 0 else 0
+            self._left -= n
+        self._pos += n
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._f.close()
+        super().close()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import io
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, List, Optional, Tuple
+
+from .sinks import OutputSink
+
+# Pillow se carga al abrir la primera hoja (el CLI importa este módulo siempre)
+if TYPE_CHECKING:  # pragma: no cover
+    from PIL import Image
+
+
+# Tamaños de hoja en mm (ancho, alto) en orientación vertical
+PAGE_SIZES = {
+    "A4": (210.0, 297.0),
+    "Letter": (215.9, 279.4),
+}
+
+SHEET_FORMATS = (".pdf", ".tif", ".tiff")
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """
+    Rejilla de etiquetas N-up sobre una hoja: filas x columnas dentro de los
+    márgenes, con `gap_mm` de separación entre celdas.
+    """
+
+    page: str = "A4"
+    rows: int = 8
+    cols: int = 3
+    margin_mm: float = 10.0
+    gap_mm: float = 2.0
+    dpi: int = 300
+    landscape: bool = False
+
+    def __post_init__(self) -> None:
+        if self.page not in PAGE_SIZES:
+            raise ValueError(f"Hoja no soportada: '{self.page}' (usa {', '.join(PAGE_SIZES)})")
+        if self.rows < 1 or self.cols < 1:
+            raise ValueError("La hoja necesita al menos 1 fila y 1 columna")
+        if self.dpi < 72:
+            raise ValueError(f"DPI demasiado bajo: {self.dpi}")
+        w, h = self.cell_size_px
+        if w < 1 or h < 1:
+            raise ValueError("Márgenes/separación no dejan espacio para las etiquetas")
+
+    @property
+    def per_page(self) -> int:
+        return self.rows * self.cols
+
+    @property
+    def page_mm(self) -> Tuple[float, float]:
+        w, h = PAGE_SIZES[self.page]
+        return (h, w) if self.landscape else (w, h)
+
+    def _px(self, mm: float) -> int:
+        return int(round(mm * self.dpi / 25.4))
+
+    @property
+    def page_size_px(self) -> Tuple[int, int]:
+        w, h = self.page_mm
+        return self._px(w), self._px(h)
+
+    @property
+    def cell_size_px(self) -> Tuple[int, int]:
+        """
+        Tamaño de cada etiqueta en px; render a este tamaño evita reescalar.
+        """
+        w, h = self.page_mm
+        cell_w = (w - 2 * self.margin_mm - (self.cols - 1) * self.gap_mm) / self.cols
+        cell_h = (h - 2 * self.margin_mm - (self.rows - 1) * self.gap_mm) / self.rows
+        return self._px(cell_w), self._px(cell_h)
+
+    def cell_origin_px(self, index: int) -> Tuple[int, int]:
+        """
+        Esquina superior izquierda de la celda `index` (0 = arriba a la izquierda, por filas).
+        """
+        row, col = divmod(index, self.cols)
+        w, h = self.page_mm
+        cell_w = (w - 2 * self.margin_mm - (self.cols - 1) * self.gap_mm) / self.cols
+        cell_h = (h - 2 * self.margin_mm - (self.rows - 1) * self.gap_mm) / self.rows
+        x = self.margin_mm + col * (cell_w + self.gap_mm)
+        y = self.margin_mm + row * (cell_h + self.gap_mm)
+        return self._px(x), self._px(y)
+
+
+class _PdfWriter:
+    """
+    PDF mínimo escrito página por página: cada hoja es una imagen en gris
+    (FlateDecode). Solo se guardan los offsets de los objetos; el árbol de
+    páginas y la tabla xref se escriben al cerrar.
+    """
+
+    # 1 = catálogo, 2 = árbol de páginas (ambos se escriben al final)
+    _CATALOG = 1
+    _PAGES = 2
+
+    def __init__(self, path: Path, page_mm: Tuple[float, float]) -> None:
+        self._fh: BinaryIO = Path(path).open("wb")
+        self._offsets: dict[int, int] = {}
+        self._pages: List[int] = []
+        self._next = 3
+        self._w_pt = page_mm[0] / 25.4 * 72
+        self._h_pt = page_mm[1] / 25.4 * 72
+        self._fh.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _obj(self, num: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self._offsets[num] = self._fh.tell()
+        self._fh.write(f"{num} 0 obj\n".encode("ascii"))
+        self._fh.write(body)
+        if stream is not None:
+            self._fh.write(b"\nstream\n")
+            self._fh.write(stream)
+            self._fh.write(b"\nendstream")
+        self._fh.write(b"\nendobj\n")
+
+    def _alloc(self) -> int:
+        num = self._next
+        self._next += 1
+        return num
+
+    def add_page(self, page: Image.Image) -> None:
+        page = page.convert("L")
+        w, h = page.size
+        data = zlib.compress(page.tobytes(), 6)
+        img, content, page_obj = self._alloc(), self._alloc(), self._alloc()
+
+        self._obj(img, (
+            f"<< /Type /XObject /Subtype /Image /Width {w} /Height {h} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>"
+        ).encode("ascii"), data)
+
+        ops = f"q {self._w_pt:.3f} 0 0 {self._h_pt:.3f} 0 0 cm /Im0 Do Q".encode("ascii")
+        self._obj(content, f"<< /Length {len(ops)} >>".encode("ascii"), ops)
+
+        self._obj(page_obj, (
+            f"<< /Type /Page /Parent {self._PAGES} 0 R "
+            f"/MediaBox [0 0 {self._w_pt:.3f} {self._h_pt:.3f}] "
+            f"/Resources << /XObject << /Im0 {img} 0 R >> >> /Contents {content} 0 R >>"
+        ).encode("ascii"))
+        self._pages.append(page_obj)
+
+    def close(self) -> None:
+        kids = " ".join(f"{n} 0 R" for n in self._pages)
+        self._obj(self._PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode("ascii"))
+        self._obj(self._CATALOG, f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode("ascii"))
+
+        xref = self._fh.tell()
+        size = self._next
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for num in range(1, size):
+            lines.append(f"{self._offsets[num]:010d} 00000 n \n")
+        self._fh.write("".join(lines).encode("ascii"))
+        self._fh.write(
+            f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+        )
+        self._fh.close()
+
+
+class _TiffWriter:
+    """TIFF multipágina, una hoja a la vez (deflate, con DPI en la cabecera)."""
+
+    def __init__(self, path: Path, dpi: int) -> None:
+        from PIL.TiffImagePlugin import AppendingTiffWriter
+
+        self._tf = AppendingTiffWriter(str(path), new=True)
+        self._dpi = dpi
+
+    def add_page(self, page: Image.Image) -> None:
+        page.save(self._tf, format="TIFF", compression="tiff_deflate", dpi=(self._dpi, self._dpi))
+        self._tf.newFrame()
+
+    def close(self) -> None:
+        self._tf.close()
+
+
+class SheetSink(OutputSink):
+    """
+    Compone las etiquetas en hojas N-up y las escribe como PDF o TIFF
+    multipágina. Solo la hoja en curso vive en memoria: al llenarse se
+    escribe y se empieza otra.
+    """
+
+    def __init__(self, path: Path, layout: SheetLayout) -> None:
+        self.path = Path(path)
+        self.layout = layout
+        suffix = self.path.suffix.lower()
+        if suffix not in SHEET_FORMATS:
+            raise ValueError(f"Formato de hoja no soportado: '{path}' (usa .pdf, .tif o .tiff)")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if suffix == ".pdf":
+            self._writer = _PdfWriter(self.path, layout.page_mm)
+        else:
+            self._writer = _TiffWriter(self.path, layout.dpi)
+
+        self._page: Optional[Image.Image] = None
+        self._slot = 0
+        self.pages = 0
+        self.labels = 0
+        self._last: Tuple[str, str] = ("", "")
+
+    def _flush_page(self) -> None:
+        if self._page is None:
+            return
+        self._writer.add_page(self._page)
+        self._page = None
+        self._slot = 0
+        self.pages += 1
+
+    accepts_images = True
+
+    def write(self, name: str, data: bytes) -> None:
+        from PIL import Image
+
+        # Bytes ya codificados (uso como librería): se decodifican desde memoria
+        with Image.open(io.BytesIO(data)) as im:
+            self.write_image(name, im)
+
+    def write_image(self, name: str, image: Image.Image) -> None:
+        from PIL import Image
+
+        if self._page is None:
+            self._page = Image.new("L", self.layout.page_size_px, 255)
+
+        im = image
+        cell_w, cell_h = self.layout.cell_size_px
+        if im.size[0] > cell_w or im.size[1] > cell_h:
+            im = im.convert("L")
+            im.thumbnail((cell_w, cell_h), Image.Resampling.LANCZOS)
+        x, y = self.layout.cell_origin_px(self._slot)
+        x += (cell_w - im.size[0]) // 2
+        y += (cell_h - im.size[1]) // 2
+        self._page.paste(im, (x, y))
+
+        row, col = divmod(self._slot, self.layout.cols)
+        self._last = (name, f"{self.path.name}#p{self.pages + 1}-f{row + 1}c{col + 1}")
+        self.labels += 1
+        self._slot += 1
+        if self._slot == self.layout.per_page:
+            self._flush_page()
+
+    def location(self, name: str) -> str:
+        if self._last[0] == name:
+            return self._last[1]
+        return f"{self.path.name}/{name}"
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    def close(self) -> None:
+        self._flush_page()
+        self._writer.close()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class OutputSink:
+    """
+    Destino de las imágenes generadas. Recibe (nombre, bytes ya codificados)
+    en orden del CSV, siempre desde un solo hilo.
+    """
+
+    # Carpeta real de salida si el destino es un directorio (permite reanudar,
+    # sobrescribir y enlazar desde la caché); None para archivos y memoria
+    directory: Optional[Path] = None
+
+    # True si el destino compone las imágenes (hojas): recibe la imagen sin
+    # codificar en write_image y nunca hay un archivo suelto que registrar
+    accepts_images: bool = False
+
+    def write(self, name: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def write_image(self, name: str, image) -> None:
+        """
+        Recibe la imagen ya renderizada (PIL.Image); solo si accepts_images.
+        """
+        raise NotImplementedError
+
+    def link(self, name: str, src: Path) -> bool:
+        """
+        Copia `src` como `name` sin pasar por memoria si el destino lo permite.
+        """
+        return False
+
+    def location(self, name: str) -> str:
+        return name
+
+    def describe(self) -> str:
+        return type(self).__name__
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """Un PNG por fila en una carpeta (comportamiento original)."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._dirs = {self.directory}
+
+    def _target(self, name: str) -> Path:
+        # `name` puede incluir subcarpetas (p. ej. "thumb/K1.jpg"); se crean una vez
+        path = self.directory / name
+        if path.parent not in self._dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path.parent)
+        return path
+
+    def write(self, name: str, data: bytes) -> None:
+        path = self._target(name)
+        # Nunca escribir dentro de un archivo existente: podría ser un hardlink a la caché
+        path.unlink(missing_ok=True)
+        path.write_bytes(data)
+
+    def link(self, name: str, src: Path) -> bool:
+        dst = self._target(name)
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            # Otro volumen / sistema de archivos sin hardlinks
+            try:
+                shutil.copyfile(src, dst)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def location(self, name: str) -> str:
+        return str(self.directory / name)
+
+    def describe(self) -> str:
+        return str(self.directory)
+
+
+class ZipSink(OutputSink):
+    """ZIP escrito en streaming; los PNG ya van comprimidos, así que se guardan sin recomprimir."""
+
+    def __init__(self, path: Path, *, compression: int = zipfile.ZIP_STORED) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(self.path, "w", compression=compression, allowZip64=True)
+
+    def write(self, name: str, data: bytes) -> None:
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = self._zip.compression
+        self._zip.writestr(info, data)
+
+    def location(self, name: str) -> str:
+        return f"{self.path.name}/{name}"
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class TarSink(OutputSink):
+    """TAR escrito en streaming (`.tar`, o `.tar.gz` / `.tgz` comprimido)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        gz = self.path.name.endswith((".tar.gz", ".tgz"))
+        self._tar = tarfile.open(self.path, "w:gz" if gz else "w")
+
+    def write(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def location(self, name: str) -> str:
+        return f"{self.path.name}/{name}"
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+class MemorySink(OutputSink):
+    """Guarda las imágenes en un dict {nombre: bytes}, para uso como librería."""
+
+    def __init__(self) -> None:
+        self.files: Dict[str, bytes] = {}
+
+    def write(self, name: str, data: bytes) -> None:
+        self.files[name] = data
+
+    def describe(self) -> str:
+        return "memoria"
+
+
+def open_archive_sink(path: Path) -> OutputSink:
+    """
+    Elige ZipSink o TarSink según la extensión (.zip, .tar, .tar.gz, .tgz).
+    """
+    name = Path(path).name.lower()
+    if name.endswith(".zip"):
+        return ZipSink(path)
+    if name.endswith((".tar", ".tar.gz", ".tgz")):
+        return TarSink(path)
+    raise ValueError(f"Formato de archivo no soportado: '{path}' (usa .zip, .tar o .tar.gz)")
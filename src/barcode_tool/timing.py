@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Orden y nombres de las etapas que se reportan
+STAGES = ("lectura", "validación", "render", "codificación", "escritura")
+
+# Histograma logarítmico: cada cubeta es un 5 % más ancha que la anterior, así
+# p50/p95 salen con ~5 % de error y memoria fija sin importar cuántas filas haya
+_GROWTH = 1.05
+_LOG_GROWTH = math.log(_GROWTH)
+
+
+def _bucket(ns: float) -> int:
+    return int(math.log(ns) / _LOG_GROWTH) if ns >= 1 else 0
+
+
+@dataclass
+class StageStats:
+    """
+    Tiempos de una etapa: total, cantidad, y p50/p95/máximo por fila
+    (por EAN distinto en render/codificación: los repetidos no se vuelven a rendir).
+
+    Render y codificación se miden por código, también dentro de los procesos.
+    Lectura y validación se miden por lote: sus percentiles son del promedio
+    por fila de cada lote (`per_batch`), no de filas individuales.
+    """
+
+    count: int = 0
+    samples: int = 0  # mediciones; menos que `count` si se registraron lotes
+    total_ns: int = 0
+    max_ns: float = 0
+    _buckets: Dict[int, int] = field(default_factory=dict, repr=False)
+
+    def add(self, ns: int, n: int = 1) -> None:
+        """
+        Registra `ns` nanosegundos para `n` filas (etapas por lote se reparten por igual).
+        """
+        if n <= 0:
+            return
+        self.count += n
+        self.samples += 1
+        self.total_ns += ns
+        per_row = ns / n
+        if per_row > self.max_ns:
+            self.max_ns = per_row
+        b = _bucket(per_row)
+        self._buckets[b] = self._buckets.get(b, 0) + n
+
+    def merge(self, other: "StageStats") -> None:
+        self.count += other.count
+        self.samples += other.samples
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        for b, n in other._buckets.items():
+            self._buckets[b] = self._buckets.get(b, 0) + n
+
+    def percentile(self, q: float) -> float:
+        """
+        Percentil `q` (0-1) en segundos, aproximado por el histograma.
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for b in sorted(self._buckets):
+            seen += self._buckets[b]
+            if seen >= target:
+                # Centro geométrico de la cubeta, nunca mayor al máximo real
+                return min(_GROWTH ** (b + 0.5), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    @property
+    def per_batch(self) -> bool:
+        return self.samples < self.count
+
+    @property
+    def total(self) -> float:
+        return self.total_ns / 1e9
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(0.50)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(0.95)
+
+    @property
+    def max(self) -> float:
+        return self.max_ns / 1e9
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "samples": self.samples,
+            # "batch_avg": p50/p95/máx son del promedio por fila de cada lote
+            "percentiles": "batch_avg" if self.per_batch else "row",
+            "total_s": round(self.total, 6),
+            "p50_ms": round(self.p50 * 1000, 4),
+            "p95_ms": round(self.p95 * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+
+def new_timings() -> Dict[str, StageStats]:
+    return {stage: StageStats() for stage in STAGES}
+
+
+def format_timings(timings: Dict[str, StageStats]) -> List[str]:
+    """
+    Líneas legibles para run_log.txt / consola, solo de etapas con datos.
+    """
+    lines = []
+    for stage, st in timings.items():
+        if not st.count:
+            continue
+        if st.per_batch:
+            head = f"{stage}: {st.count} veces en {st.samples} lotes, total {st.total:.3f} s, promedio por fila de cada lote: "
+        else:
+            head = f"{stage}: {st.count} veces, total {st.total:.3f} s, "
+        lines.append(
+            head + f"p50 {st.p50 * 1000:.3f} ms, p95 {st.p95 * 1000:.3f} ms, máx {st.max * 1000:.3f} ms"
+        )
+    return lines
+
+
+def write_timings_json(path: Path, timings: Dict[str, StageStats], *, extra: Optional[dict] = None) -> None:
+    data = dict(extra or {})
+    data["stages"] = {stage: st.as_dict() for stage, st in timings.items()}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
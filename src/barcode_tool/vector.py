@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+VECTOR_FORMATS = ("svg", "pdf")
+
+# Versión de la salida vectorial: cambiarla invalida la caché de SVG/PDF
+VECTOR_ENGINE_VERSION = "1"
+
+
+# ---- Contornos de los dígitos desde el TTF incluido ----
+
+@dataclass(frozen=True)
+class _Glyph:
+    advance: int
+    # Comandos en unidades de la fuente (y hacia arriba):
+    # ("M", x, y) / ("L", x, y) / ("Q", cx, cy, x, y) / ("Z",)
+    commands: tuple
+
+
+@dataclass(frozen=True)
+class _DigitFont:
+    units_per_em: int
+    descender: int  # negativo, como en hhea
+    glyphs: Dict[str, _Glyph]
+
+
+def _tables(data: bytes) -> Dict[str, Tuple[int, int]]:
+    num_tables = struct.unpack_from(">H", data, 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag.decode("latin-1")] = (offset, length)
+    return tables
+
+
+def _cmap_lookup(data: bytes, cmap_offset: int, chars: str) -> Dict[str, int]:
+    """
+    Busca los glifos en la subtabla Unicode BMP (formato 4) del cmap.
+    """
+    num = struct.unpack_from(">H", data, cmap_offset + 2)[0]
+    sub = None
+    for i in range(num):
+        platform, encoding, offset = struct.unpack_from(">HHI", data, cmap_offset + 4 + 8 * i)
+        if (platform, encoding) in ((3, 1), (0, 3)) and struct.unpack_from(">H", data, cmap_offset + offset)[0] == 4:
+            sub = cmap_offset + offset
+            break
+    if sub is None:
+        raise ValueError("La fuente no tiene un cmap Unicode (formato 4)")
+
+    seg_count = struct.unpack_from(">H", data, sub + 6)[0] // 2
+    ends = sub + 14
+    starts = ends + 2 * seg_count + 2
+    deltas = starts + 2 * seg_count
+    range_offsets = deltas + 2 * seg_count
+
+    found = {}
+    for ch in chars:
+        code = ord(ch)
+        for seg in range(seg_count):
+            end = struct.unpack_from(">H", data, ends + 2 * seg)[0]
+            if code > end:
+                continue
+            start = struct.unpack_from(">H", data, starts + 2 * seg)[0]
+            if code < start:
+                break
+            delta = struct.unpack_from(">h", data, deltas + 2 * seg)[0]
+            ro_pos = range_offsets + 2 * seg
+            ro = struct.unpack_from(">H", data, ro_pos)[0]
+            if ro == 0:
+                gid = (code + delta) & 0xFFFF
+            else:
+                gid = struct.unpack_from(">H", data, ro_pos + ro + 2 * (code - start))[0]
+                gid = (gid + delta) & 0xFFFF if gid else 0
+            found[ch] = gid
+            break
+    return found
+
+
+def _glyph_points(data: bytes, offset: int) -> Tuple[List[int], List[Tuple[int, int, bool]]]:
+    """
+    Lee un glifo simple del glyf: fin de cada contorno y puntos (x, y, sobre_curva).
+    """
+    n_contours = struct.unpack_from(">h", data, offset)[0]
+    if n_contours < 0:
+        raise ValueError("Glifo compuesto no soportado")
+    pos = offset + 10
+    end_pts = list(struct.unpack_from(f">{n_contours}H", data, pos))
+    pos += 2 * n_contours
+    n_points = end_pts[-1] + 1 if end_pts else 0
+    instr_len = struct.unpack_from(">H", data, pos)[0]
+    pos += 2 + instr_len
+
+    flags: List[int] = []
+    while len(flags) < n_points:
+        flag = data[pos]
+        pos += 1
+        flags.append(flag)
+        if flag & 0x08:
+            flags.extend([flag] * data[pos])
+            pos += 1
+
+    def coords(short_bit: int, same_bit: int) -> List[int]:
+        nonlocal pos
+        values, v = [], 0
+        for flag in flags:
+            if flag & short_bit:
+                d = data[pos]
+                pos += 1
+                v += d if flag & same_bit else -d
+            elif not flag & same_bit:
+                v += struct.unpack_from(">h", data, pos)[0]
+                pos += 2
+            values.append(v)
+        return values
+
+    xs = coords(0x02, 0x10)
+    ys = coords(0x04, 0x20)
+    return end_pts, [(x, y, bool(f & 0x01)) for x, y, f in zip(xs, ys, flags)]
+
+
+def _contour_commands(points: List[Tuple[int, int, bool]]) -> list:
+    # Puntos de control cuadráticos (TrueType): entre dos puntos fuera de la
+    # curva hay un punto implícito sobre la curva en el medio
+    if not points:
+        return []
+    if points[0][2]:
+        start = points[0]
+        rest = points[1:] + [points[0]]
+    elif points[-1][2]:
+        start = points[-1]
+        rest = points
+    else:
+        start = ((points[0][0] + points[-1][0]) / 2, (points[0][1] + points[-1][1]) / 2, True)
+        rest = points + [start]
+
+    cmds: list = [("M", start[0], start[1])]
+    control: Optional[Tuple[float, float]] = None
+    for x, y, on in rest:
+        if on:
+            if control is None:
+                cmds.append(("L", x, y))
+            else:
+                cmds.append(("Q", control[0], control[1], x, y))
+                control = None
+        else:
+            if control is not None:
+                mx, my = (control[0] + x) / 2, (control[1] + y) / 2
+                cmds.append(("Q", control[0], control[1], mx, my))
+            control = (x, y)
+    cmds.append(("Z",))
+    return cmds
+
+
+@lru_cache(maxsize=4)
+def _load_digit_font(font_path: str) -> _DigitFont:
+    """
+    Extrae del TTF solo lo necesario para dibujar 0-9 como trazos.
+    """
+    data = Path(font_path).read_bytes()
+    tables = _tables(data)
+    head, hhea, hmtx = tables["head"][0], tables["hhea"][0], tables["hmtx"][0]
+    loca, glyf = tables["loca"][0], tables["glyf"][0]
+
+    units_per_em = struct.unpack_from(">H", data, head + 18)[0]
+    long_loca = struct.unpack_from(">h", data, head + 50)[0] == 1
+    descender = struct.unpack_from(">h", data, hhea + 6)[0]
+    n_hmetrics = struct.unpack_from(">H", data, hhea + 34)[0]
+
+    glyphs = {}
+    for ch, gid in _cmap_lookup(data, tables["cmap"][0], "0123456789").items():
+        advance = struct.unpack_from(">H", data, hmtx + 4 * min(gid, n_hmetrics - 1))[0]
+        if long_loca:
+            start, end = struct.unpack_from(">II", data, loca + 4 * gid)
+        else:
+            start, end = (2 * v for v in struct.unpack_from(">HH", data, loca + 2 * gid))
+
+        commands: list = []
+        if end > start:
+            end_pts, points = _glyph_points(data, glyf + start)
+            first = 0
+            for last in end_pts:
+                commands.extend(_contour_commands(points[first:last + 1]))
+                first = last + 1
+        glyphs[ch] = _Glyph(advance, tuple(commands))
+
+    return _DigitFont(units_per_em, descender, glyphs)
+
+
+# ---- Geometría (en mm, sin redondeo a píxeles) ----
+
+@dataclass(frozen=True)
+class _Layout:
+    width_mm: float
+    height_mm: float
+    module_mm: float
+    x0: float
+    y0: float
+    bar_h: float
+    text_y: float  # línea del descendente del texto (como anchor="md" del render nativo)
+    font_mm: float
+
+
+def _layout(width: int, height: int, writer_options: dict, write_text: bool) -> _Layout:
+    """
+    Mismas proporciones que render_ean13_native, pero con el módulo exacto en
+    vez de redondeado a píxeles enteros. width/height se interpretan a `dpi`.
+    """
+    dpi = writer_options.get("dpi", 300)
+    width_mm = width * 25.4 / dpi
+    height_mm = height * 25.4 / dpi
+
+    module = writer_options["module_width"]
+    quiet = writer_options["quiet_zone"]
+    bars = writer_options["module_height"]
+    margin = 1.0
+    font = writer_options["font_size"] * 0.352777 if write_text else 0.0
+    text_dist = writer_options.get("text_distance", 0) if write_text else 0.0
+
+    ref_w = 2 * quiet + 95 * module
+    ref_h = 2 * margin + bars + (text_dist + font / 2)
+    scale = min(width_mm / ref_w, height_mm / ref_h)
+
+    module_mm = module * scale
+    bar_h = bars * scale
+    content_h = 2 * margin * scale + bar_h + (text_dist + font / 2) * scale
+    x0 = (width_mm - 95 * module_mm) / 2
+    y0 = (height_mm - content_h) / 2 + margin * scale
+    return _Layout(
+        width_mm=width_mm,
+        height_mm=height_mm,
+        module_mm=module_mm,
+        x0=x0,
+        y0=y0,
+        bar_h=bar_h,
+        text_y=y0 + bar_h + text_dist * scale,
+        font_mm=font * scale,
+    )
+
+
+def _bar_runs(modules: bytes) -> List[Tuple[int, int]]:
+    """
+    Barras contiguas como (módulo inicial, ancho en módulos).
+    """
+    runs = []
+    i = 0
+    n = len(modules)
+    while i < n:
+        if modules[i]:
+            j = i
+            while j < n and modules[j]:
+                j += 1
+            runs.append((i, j - i))
+            i = j
+        else:
+            i += 1
+    return runs
+
+
+def _n(v: float) -> str:
+    s = f"{v:.4f}".rstrip("0").rstrip(".")
+    return s if s not in ("", "-0") else "0"
+
+
+def _text_origin(code13: str, layout: _Layout, font: _DigitFont) -> Tuple[float, float, float]:
+    """
+    Escala (mm por unidad de fuente), x inicial y línea base del texto centrado.
+    """
+    s = layout.font_mm / font.units_per_em
+    text_w = sum(font.glyphs[ch].advance for ch in code13) * s
+    x = layout.x0 + 95 * layout.module_mm / 2 - text_w / 2
+    baseline = layout.text_y + font.descender * s  # descender < 0: la base queda arriba
+    return s, x, baseline
+
+
+def _svg_path(commands: tuple) -> str:
+    parts = []
+    for cmd in commands:
+        parts.append(cmd[0] + " ".join(_n(v) for v in cmd[1:]))
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4)
+def _svg_glyphs(font_path: str) -> Dict[str, str]:
+    font = _load_digit_font(font_path)
+    return {ch: _svg_path(g.commands) for ch, g in font.glyphs.items()}
+
+
+def render_ean13_svg(code13: str, modules: bytes, width: int, height: int, writer_options: dict) -> bytes:
+    """
+    SVG con la geometría exacta de los módulos (unidades en mm) y el texto
+    como trazos de DejaVuSans, sin depender de fuentes instaladas.
+    """
+    write_text = bool(writer_options.get("write_text", True)) and bool(writer_options.get("font_path"))
+    layout = _layout(width, height, writer_options, write_text)
+    background = writer_options.get("background", "white")
+    foreground = writer_options.get("foreground", "black")
+
+    m = layout.module_mm
+    bars = "".join(
+        f"M{_n(layout.x0 + start * m)} {_n(layout.y0)}h{_n(run * m)}v{_n(layout.bar_h)}h{_n(-run * m)}z"
+        for start, run in _bar_runs(modules)
+    )
+    out = [
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{_n(layout.width_mm)}mm" height="{_n(layout.height_mm)}mm" '
+        f'viewBox="0 0 {_n(layout.width_mm)} {_n(layout.height_mm)}">',
+        f'<rect width="100%" height="100%" fill="{background}"/>',
+        f'<path fill="{foreground}" d="{bars}"/>',
+    ]
+
+    if write_text and layout.font_mm > 0:
+        font_path = str(writer_options["font_path"])
+        font = _load_digit_font(font_path)
+        glyphs = _svg_glyphs(font_path)
+        s, x, baseline = _text_origin(code13, layout, font)
+        out.append(f'<g fill="{foreground}">')
+        for ch in code13:
+            out.append(f'<path transform="matrix({_n(s)} 0 0 {_n(-s)} {_n(x)} {_n(baseline)})" d="{glyphs[ch]}"/>')
+            x += font.glyphs[ch].advance * s
+        out.append("</g>")
+
+    out.append("</svg>\n")
+    return "\n".join(out).encode("utf-8")
+
+
+def _pdf_color(value: str, op: str) -> str:
+    from PIL import ImageColor
+
+    r, g, b = ImageColor.getrgb(value)[:3]
+    return f"{_n(r / 255)} {_n(g / 255)} {_n(b / 255)} {op}"
+
+
+def _pdf_path(commands: tuple) -> str:
+    # PDF solo tiene Bézier cúbicas: cada cuadrática se eleva de grado
+    parts = []
+    cx = cy = 0.0
+    for cmd in commands:
+        op = cmd[0]
+        if op == "M":
+            cx, cy = cmd[1], cmd[2]
+            parts.append(f"{_n(cx)} {_n(cy)} m")
+        elif op == "L":
+            cx, cy = cmd[1], cmd[2]
+            parts.append(f"{_n(cx)} {_n(cy)} l")
+        elif op == "Q":
+            qx, qy, x, y = cmd[1:]
+            c1x, c1y = cx + 2 / 3 * (qx - cx), cy + 2 / 3 * (qy - cy)
+            c2x, c2y = x + 2 / 3 * (qx - x), y + 2 / 3 * (qy - y)
+            parts.append(f"{_n(c1x)} {_n(c1y)} {_n(c2x)} {_n(c2y)} {_n(x)} {_n(y)} c")
+            cx, cy = x, y
+        else:
+            parts.append("h")
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=4)
+def _pdf_glyphs(font_path: str) -> Dict[str, str]:
+    font = _load_digit_font(font_path)
+    return {ch: _pdf_path(g.commands) for ch, g in font.glyphs.items()}
+
+
+def _pdf_document(content: bytes, width_pt: float, height_pt: float) -> bytes:
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_n(width_pt)} {_n(height_pt)}] "
+         f"/Contents 4 0 R /Resources << >> >>").encode("ascii"),
+        f"<< /Length {len(content)} >>\nstream\n".encode("ascii") + content + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(out)
+
+
+def render_ean13_pdf(code13: str, modules: bytes, width: int, height: int, writer_options: dict) -> bytes:
+    """
+    PDF de una página del tamaño físico de la etiqueta; barras como rectángulos
+    y texto como trazos de DejaVuSans (sin incrustar la fuente).
+    """
+    write_text = bool(writer_options.get("write_text", True)) and bool(writer_options.get("font_path"))
+    layout = _layout(width, height, writer_options, write_text)
+    pt = 72 / 25.4
+    h = layout.height_mm
+
+    ops = [
+        _pdf_color(writer_options.get("background", "white"), "rg"),
+        f"0 0 {_n(layout.width_mm * pt)} {_n(h * pt)} re f",
+        _pdf_color(writer_options.get("foreground", "black"), "rg"),
+    ]
+    m = layout.module_mm
+    # PDF tiene y hacia arriba: la barra va de (h - y0 - bar_h) a (h - y0)
+    bar_y = (h - layout.y0 - layout.bar_h) * pt
+    for start, run in _bar_runs(modules):
+        ops.append(f"{_n((layout.x0 + start * m) * pt)} {_n(bar_y)} {_n(run * m * pt)} {_n(layout.bar_h * pt)} re")
+    ops.append("f")
+
+    if write_text and layout.font_mm > 0:
+        font_path = str(writer_options["font_path"])
+        font = _load_digit_font(font_path)
+        glyphs = _pdf_glyphs(font_path)
+        s, x, baseline = _text_origin(code13, layout, font)
+        for ch in code13:
+            ops.append(f"q {_n(s * pt)} 0 0 {_n(s * pt)} {_n(x * pt)} {_n((h - baseline) * pt)} cm {glyphs[ch]} f Q")
+            x += font.glyphs[ch].advance * s
+
+    return _pdf_document("\n".join(ops).encode("ascii"), layout.width_mm * pt, h * pt)
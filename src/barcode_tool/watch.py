@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import shutil
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .core import CancelToken, RunResult, generate_barcodes_from_csv, resolve_workers, unique_path
+
+
+DEFAULT_INTERVAL_S = 2.0
+
+# Un CSV se toma solo si su tamaño y fecha no cambiaron durante este tiempo:
+# en un recurso compartido el archivo puede seguir copiándose
+DEFAULT_SETTLE_S = 2.0
+
+PROCESSING_DIR = "processing"
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+WATCH_LOG = "watch_log.txt"
+
+
+@dataclass
+class WatchJob:
+    """
+    Un CSV tomado de la bandeja: su nombre original, dónde quedó mientras se
+    procesa y la carpeta de salida propia del trabajo.
+    """
+
+    name: str
+    path: Path  # en processing/
+    outdir: Path
+    queued: float = field(default_factory=time.time)
+
+
+def _ignore_sigint() -> None:
+    # Ctrl+C llega a todo el grupo de procesos: solo el principal lo atiende y
+    # cancela los trabajos; si no, los procesos de render mueren a medio lote
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class FolderWatcher:
+    """
+    Vigila `inbox` y procesa cada CSV nuevo con generate_barcodes_from_csv,
+    hasta `concurrency` a la vez, en el mismo proceso (Pillow, fuentes y procesos
+    de render quedan cargados entre archivos).
+
+    Cada trabajo escribe en `outroot/<fecha>_<nombre>/` (barcodes/, logs/...).
+    El CSV pasa a `inbox/processing/` al tomarse y a `inbox/done/` o
+    `inbox/failed/` al terminar, con el mismo prefijo de fecha. Filas con EAN
+    inválido no hacen fallar el trabajo (quedan en su errors.csv); sí un error
+    que impida procesar el archivo (columnas faltantes, encoding...).
+    """
+
+    def __init__(
+        self,
+        inbox: Path,
+        outroot: Path,
+        *,
+        concurrency: int = 1,
+        interval: float = DEFAULT_INTERVAL_S,
+        settle: float = DEFAULT_SETTLE_S,
+        workers: Optional[int] = None,
+        options: Optional[dict] = None,
+        log: Callable[[str], None] = partial(print, flush=True),
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"La concurrencia debe ser >= 1, llegó: {concurrency}")
+        self.inbox = Path(inbox)
+        self.outroot = Path(outroot)
+        self.processing = self.inbox / PROCESSING_DIR
+        self.done = self.inbox / DONE_DIR
+        self.failed = self.inbox / FAILED_DIR
+        for d in (self.inbox, self.outroot, self.processing, self.done, self.failed):
+            d.mkdir(parents=True, exist_ok=True)
+
+        self.concurrency = concurrency
+        self.interval = interval
+        self.settle = settle
+        self.workers = resolve_workers(workers)
+        self.options = dict(options or {})
+        self._log = log
+        self._log_lock = threading.Lock()
+        self._seen: Dict[Path, Tuple[int, float, float]] = {}  # ruta -> (tamaño, mtime, visto desde)
+        self._running: Dict[Future, Tuple[WatchJob, CancelToken]] = {}
+        self.stop_event = threading.Event()
+
+    # ---- Registro ----
+
+    def log(self, message: str) -> None:
+        line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} | {message}"
+        with self._log_lock:
+            self._log(line)
+            with (self.outroot / WATCH_LOG).open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    # ---- Bandeja ----
+
+    def recover(self) -> None:
+        """
+        CSV que quedaron en processing/ (corte de luz, proceso terminado) vuelven
+        a la bandeja para procesarse de nuevo.
+        """
+        for path in sorted(self.processing.glob("*.csv")):
+            # Se quita el prefijo de fecha que se agregó al tomarlo
+            original = path.name.split("_", 1)[-1]
+            target = unique_path(self.inbox / original)
+            shutil.move(str(path), str(target))
+            self.log(f"{original} | recuperado de {PROCESSING_DIR}/, vuelve a la cola")
+
+    def scan(self) -> list[Path]:
+        """
+        CSV de la bandeja listos para tomarse: mismo tamaño y fecha por al
+        menos `settle` segundos. Ignora archivos temporales de Excel (~$...).
+        """
+        now = time.monotonic()
+        ready = []
+        present = set()
+        for path in sorted(self.inbox.glob("*.csv"), key=lambda p: p.name):
+            if path.name.startswith(("~$", ".")) or not path.is_file():
+                continue
+            present.add(path)
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            prev = self._seen.get(path)
+            if prev is None or prev[:2] != (st.st_size, st.st_mtime):
+                self._seen[path] = (st.st_size, st.st_mtime, now)
+                if self.settle > 0:
+                    continue
+                prev = self._seen[path]
+            if now - prev[2] >= self.settle:
+                ready.append(path)
+        for path in list(self._seen):
+            if path not in present:
+                del self._seen[path]
+        return ready
+
+    def claim(self, path: Path) -> Optional[WatchJob]:
+        """
+        Mueve el CSV a processing/ (ya no se vuelve a tomar) y arma su trabajo.
+        """
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        target = unique_path(self.processing / f"{stamp}_{path.name}")
+        try:
+            shutil.move(str(path), str(target))
+        except OSError as e:
+            # Todavía abierto por quien lo copia (Windows): se intenta en la próxima vuelta
+            self.log(f"{path.name} | no se pudo tomar ({e}), se reintenta")
+            return None
+        self._seen.pop(path, None)
+        outdir = unique_path(self.outroot / f"{stamp}_{path.stem}")
+        return WatchJob(name=path.name, path=target, outdir=outdir)
+
+    # ---- Trabajos ----
+
+    def run_job(self, job: WatchJob, cancel: CancelToken, pool=None) -> Optional[RunResult]:
+        self.log(f"{job.name} | inicia -> {job.outdir}")
+        t0 = time.perf_counter()
+        try:
+            result = generate_barcodes_from_csv(
+                job.path, job.outdir, pool=pool, cancel=cancel, **self.options,
+            )
+        except Exception as e:
+            job.outdir.mkdir(parents=True, exist_ok=True)
+            (job.outdir / "error.txt").write_text(traceback.format_exc(), encoding="utf-8")
+            shutil.move(str(job.path), str(unique_path(self.failed / job.path.name)))
+            reason = " ".join(str(e).split())
+            self.log(f"{job.name} | FALLÓ en {time.perf_counter() - t0:.1f} s: {reason} (ver {job.outdir / 'error.txt'})")
+            return None
+
+        if result.cancelled:
+            # A medias: vuelve a la bandeja y se rehace completo en la próxima corrida
+            shutil.move(str(job.path), str(unique_path(self.inbox / job.name)))
+            self.log(f"{job.name} | cancelado, vuelve a la bandeja")
+            return result
+
+        shutil.move(str(job.path), str(unique_path(self.done / job.path.name)))
+        self.log(
+            f"{job.name} | OK en {result.elapsed:.1f} s: {result.generated} generados, "
+            f"{result.error_count} errores | {job.outdir}"
+        )
+        return result
+
+    def run(self) -> None:
+        """
+        Vigila hasta `stop_event` (o Ctrl+C). Al detenerse cancela los trabajos
+        en curso, que vuelven a la bandeja, y espera a que terminen.
+        """
+        pool = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Un solo grupo de procesos para todos los trabajos: ya calientes entre archivos
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_sigint)
+
+        self.recover()
+        self.log(
+            f"Vigilando {self.inbox} (hasta {self.concurrency} a la vez, {self.workers} proceso(s) de render); "
+            f"salida en {self.outroot}"
+        )
+        jobs = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="watch")
+        queued: list[WatchJob] = []
+        try:
+            while not self.stop_event.is_set():
+                for fut in [f for f in self._running if f.done()]:
+                    del self._running[fut]
+
+                for path in self.scan():
+                    job = self.claim(path)
+                    if job is not None:
+                        queued.append(job)
+                        self.log(f"{job.name} | en cola")
+
+                # La cola espera aquí (no en el ThreadPool) para poder devolverla al detenerse
+                while queued and len(self._running) < self.concurrency:
+                    job = queued.pop(0)
+                    token = CancelToken()
+                    self._running[jobs.submit(self.run_job, job, token, pool)] = (job, token)
+
+                self.stop_event.wait(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            for job in queued:
+                shutil.move(str(job.path), str(unique_path(self.inbox / job.name)))
+            for _, token in self._running.values():
+                token.cancel()
+            jobs.shutdown(wait=True)
+            if pool is not None:
+                pool.shutdown()
+            self.log("Vigilancia detenida")
+
+    def stop(self) -> None:
+        self.stop_event.set()